@@ -62,6 +62,7 @@ class EmployeeAdmin(admin.ModelAdmin):
     list_display = ['first_name', 'last_name', 'email_address', 'department', 'position', 'hire_date']
     search_fields = ['first_name', 'last_name', 'email_address']
     list_filter = ['department', 'position', 'hire_date']
+    readonly_fields = ['last_evaluation', 'last_evaluation_date']  # maintained from the evaluations
 
 class UserAccountAdminForm(forms.ModelForm):
     password = forms.CharField(
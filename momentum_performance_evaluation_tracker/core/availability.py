@@ -0,0 +1,66 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from .models import Employee, UserAccount
+from .team_cache import bump_versions, get_version
+
+# Per-process sets of every taken username and email, lowercased, behind the live
+# availability checks of the registration and create-user forms. A value missing from
+# its set is answered "free" without a query; a hit is confirmed through the LOWER()
+# indexes. Writes bump VERSION_KEY (see core.signals) in the default cache, which every
+# worker shares (see core.checks), and each process reloads on its next
+# check. A process also reloads once its sets are AVAILABILITY_RELOAD_SECONDS old, which
+# bounds how long a lost bump can hide an account; the forms check the database again on submit.
+VERSION_KEY = 'availability:version'
+AVAILABILITY_RELOAD_SECONDS = getattr(settings, 'AVAILABILITY_RELOAD_SECONDS', 60)
+
+_taken = {'version': None, 'loaded_at': None, 'usernames': frozenset(), 'emails': frozenset()}
+_taken_lock = threading.Lock()
+
+
+def taken_values():
+    """The current sets of taken usernames and emails, reloaded when the version has moved or they are too old"""
+    version = get_version(VERSION_KEY)
+    if is_stale(version):
+        with _taken_lock:
+            if is_stale(version):
+                # Tagged with the version read before loading, so a write racing the load forces another reload
+                loaded_at = time.monotonic()
+                _taken.update(
+                    usernames=frozenset(UserAccount.objects.values_list(Lower('username'), flat=True)),
+                    emails=frozenset(Employee.objects.values_list(Lower('email_address'), flat=True)),
+                    version=version,
+                    loaded_at=loaded_at,
+                )
+    return _taken
+
+
+def is_stale(version):
+    # No version means no cache to hear bumps through (DummyCache), so the sets are never trusted
+    return (
+        version is None
+        or _taken['loaded_at'] is None
+        or _taken['version'] != version
+        or time.monotonic() - _taken['loaded_at'] >= AVAILABILITY_RELOAD_SECONDS
+    )
+
+
+def username_taken(username):
+    if username.lower() not in taken_values()['usernames']:
+        return False
+    return UserAccount.username_exists(username)
+
+
+def email_taken(email):
+    if email.lower() not in taken_values()['emails']:
+        return False
+    return Employee.email_exists(email)
+
+
+def invalidate_availability():
+    """Make every process reload its sets, once the current transaction commits"""
+    transaction.on_commit(lambda: bump_versions([VERSION_KEY]))
@@ -1,19 +1,58 @@
+import copy
+import threading
+import time
+
+from django.conf import settings
 from django.contrib.auth.backends import BaseBackend
 from .models import UserAccount
 
+# Per-process cache of loaded principals: user_id -> (expires_at, user).
+# Disabled when PRINCIPAL_CACHE_TIMEOUT is 0; entries are dropped by core.signals on
+# password/role changes and deletes, and the short TTL bounds staleness across workers.
+_principal_cache = {}
+_principal_cache_lock = threading.Lock()
+
+
+def load_principal(user_id):
+    """Load a user with role and employee joined in one query"""
+    return UserAccount.objects.select_related('role', 'employee').get(pk=user_id)
+
+
+def forget_principal(user_id=None):
+    """Drop one cached principal, or all of them when user_id is None"""
+    with _principal_cache_lock:
+        if user_id is None:
+            _principal_cache.clear()
+        else:
+            _principal_cache.pop(user_id, None)
+
+
 class CustomUserBackend(BaseBackend): # Custom authentication backend
     def authenticate(self, request, username=None, password=None, **kwargs): # Authenticate user
         try:
-            user = UserAccount.objects.get(username=username)
+            user = UserAccount.objects.select_related('role', 'employee').get(username=username)
             if user.check_password(password):
                 return user
         except UserAccount.DoesNotExist:
             return None
 
     def get_user(self, user_id): # Retrieve user by ID
+        timeout = getattr(settings, 'PRINCIPAL_CACHE_TIMEOUT', 0)
         try:
-            return UserAccount.objects.get(pk=user_id)
-        except UserAccount.DoesNotExist:
-            return None
+            if not timeout:
+                return load_principal(user_id)
 
+            user_id = int(user_id)
+            now = time.monotonic()
+            with _principal_cache_lock:
+                cached = _principal_cache.get(user_id)
+            if cached and cached[0] > now:
+                # Every request gets its own copy so views can modify request.user safely
+                return copy.deepcopy(cached[1])
 
+            user = load_principal(user_id)
+            with _principal_cache_lock:
+                _principal_cache[user_id] = (now + timeout, copy.deepcopy(user))
+            return user
+        except UserAccount.DoesNotExist:
+            return None
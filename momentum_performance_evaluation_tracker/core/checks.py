@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PER_PROCESS_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Team data, ETags and username availability are versioned in the default cache, which every worker must share"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if settings.DEBUG or backend not in PER_PROCESS_CACHES:
+        return []
+    return [Warning(
+        f"The default cache ({backend}) is not shared between worker processes.",
+        hint="Fine for a single process; with several workers use the database cache "
+             "(the default, after `manage.py createcachetable`) or a shared backend such as Redis "
+             "via CACHE_BACKEND/CACHE_LOCATION.",
+        id='core.W001',
+    )]
@@ -0,0 +1,154 @@
+"""
+Per-employee daily running totals (DailyCounter).
+
+Each row holds an employee's attendance and task counts from the beginning
+through one day. A write on day D adds its difference to the row for D and
+every later row; a read over [start, end] is two indexed lookups, the last row
+on or before end and the last row before start, and a subtraction, however
+long the range.
+
+Tasks count on the day they were created, and tasks_accepted counts those of
+them accepted by now, which is how the evaluation compliance rates define a
+period's tasks.
+"""
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+
+from .models import AttendanceRecord, BacklogItem, DailyCounter
+
+DAILY_COUNTERS = ['total_days', 'present_days', 'late_days', 'absent_days', 'tasks_created', 'tasks_accepted']
+
+ATTENDANCE_STATUS_COUNTERS = {'Present': 'present_days', 'Late': 'late_days', 'Absent': 'absent_days'}
+
+
+def as_date(value):
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def attendance_daily_counts(record):
+    """(day, counters) one attendance record contributes"""
+    counts = {'total_days': 1}
+    if record['status'] in ATTENDANCE_STATUS_COUNTERS:
+        counts[ATTENDANCE_STATUS_COUNTERS[record['status']]] = 1
+    return as_date(record['date']), counts
+
+
+def task_daily_counts(task):
+    """(day, counters) one backlog item contributes"""
+    accepted = 1 if 'Accepted' in (task['status'], task['review_status']) else 0
+    return as_date(task['created_date']), {'tasks_created': 1, 'tasks_accepted': accepted}
+
+
+def apply_daily_counts(employee_ids, day, counts, create_missing=True):
+    """Add the same counter deltas to each employee's running totals from day on"""
+    counts = {name: delta for name, delta in counts.items() if delta}
+    if not counts or not employee_ids:
+        return
+
+    # Part of the caller's transaction, if any: a savepoint would only add two round trips to every write
+    with transaction.atomic(savepoint=False):
+        if create_missing:
+            create_day_rows(employee_ids, day)
+        DailyCounter.objects.filter(
+            employee_id__in=employee_ids,
+            date__gte=day
+        ).update(**{name: F(name) + delta for name, delta in counts.items()})
+
+
+def create_day_rows(employee_ids, day):
+    """
+    Give each employee a row for day, starting from their totals through the day before.
+
+    A concurrent first write of the same day may insert the row after the check;
+    the insert then skips it and the caller's F() increment lands on that row.
+    """
+    missing = set(employee_ids) - set(DailyCounter.objects.filter(
+        employee_id__in=employee_ids,
+        date=day
+    ).values_list('employee_id', flat=True))
+    if not missing:
+        return
+    latest_before = DailyCounter.objects.filter(
+        employee_id=OuterRef('employee_id'),
+        date__lt=day
+    ).order_by('-date').values('id')[:1]
+    previous = {
+        row.employee_id: row
+        for row in DailyCounter.objects.filter(employee_id__in=missing, id=Subquery(latest_before))
+    }
+    DailyCounter.objects.bulk_create([
+        DailyCounter(
+            employee_id=employee_id,
+            date=day,
+            **{name: getattr(previous.get(employee_id), name, 0) for name in DAILY_COUNTERS}
+        )
+        for employee_id in missing
+    ], ignore_conflicts=True)
+
+
+def get_totals_through(employee_id, day):
+    """Running totals through the end of day: one lookup on (employee, date)"""
+    row = DailyCounter.objects.filter(
+        employee_id=employee_id,
+        date__lte=day
+    ).order_by('-date').values(*DAILY_COUNTERS).first()
+    return row or dict.fromkeys(DAILY_COUNTERS, 0)
+
+
+def get_window_totals(employee_id, start, end):
+    """Counts for days start..end inclusive; start None means from the beginning"""
+    totals = get_totals_through(employee_id, end)
+    if start is None:
+        return totals
+    before = get_totals_through(employee_id, start - timedelta(days=1))
+    return {name: totals[name] - before[name] for name in DAILY_COUNTERS}
+
+
+def rebuild_daily_counters(employee_ids):
+    """
+    Recompute the DailyCounter rows of these employees from the raw tables.
+
+    One INSERT ... SELECT: the ORM builds the per-day attendance and task
+    counts, and the database sums them into running totals per employee,
+    so no row passes through Python.
+    """
+    employee_ids = list(employee_ids)
+    attendance_days = AttendanceRecord.objects.filter(
+        employee_id__in=employee_ids
+    ).values('employee_id', day=F('date')).annotate(
+        total_days=Count('attendance_id'),
+        **{name: Count('attendance_id', filter=Q(status=status)) for status, name in ATTENDANCE_STATUS_COUNTERS.items()},
+        tasks_created=Value(0),
+        tasks_accepted=Value(0)
+    ).order_by().values_list('employee_id', 'day', *DAILY_COUNTERS)
+    task_days = BacklogItem.objects.filter(
+        employee_id__in=employee_ids
+    ).values('employee_id', day=F('created_date')).annotate(
+        **{name: Value(0) for name in ['total_days', *ATTENDANCE_STATUS_COUNTERS.values()]},
+        tasks_created=Count('backlog_id'),
+        tasks_accepted=Count('backlog_id', filter=Q(status='Accepted') | Q(review_status='Accepted'))
+    ).order_by().values_list('employee_id', 'day', *DAILY_COUNTERS)
+    daily_sql, params = attendance_days.union(task_days, all=True).query.sql_with_params()
+
+    qn = connection.ops.quote_name
+    opts = DailyCounter._meta
+    columns = [opts.get_field('employee').column, opts.get_field('date').column, *DAILY_COUNTERS]
+    running_totals = ', '.join(
+        f"SUM({qn(name)}) OVER (PARTITION BY {qn('employee_id')} ORDER BY {qn('day')})" for name in DAILY_COUNTERS
+    )
+    daily_totals = ', '.join(f"SUM({qn(name)}) AS {qn(name)}" for name in DAILY_COUNTERS)
+    sql = (
+        f"INSERT INTO {qn(opts.db_table)} ({', '.join(qn(column) for column in columns)}) "
+        f"SELECT {qn('employee_id')}, {qn('day')}, {running_totals} FROM ("
+        f"SELECT {qn('employee_id')}, {qn('day')}, {daily_totals} FROM ({daily_sql}) per_source "
+        f"GROUP BY {qn('employee_id')}, {qn('day')}"
+        f") daily"
+    )
+
+    with transaction.atomic():
+        DailyCounter.objects.filter(employee_id__in=employee_ids).delete()
+        if employee_ids:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
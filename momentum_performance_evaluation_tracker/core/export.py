@@ -0,0 +1,125 @@
+"""
+Streaming exports of team performance and evaluation history.
+
+Rows are generated from querysets read with .iterator(chunk_size=...), which
+is a server-side cursor on PostgreSQL, and written out one line at a time, so
+an export of the whole organisation over several years holds one chunk in
+memory rather than every row. Performance rows come from the EmployeeMetrics
+counters (core.utils.get_metrics_for_employees), not from the raw tables.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from .models import Evaluation, EvaluationKPI
+from .utils import get_metrics_for_employees, get_performance_status
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+PERFORMANCE_COLUMNS = [
+    'employee_id', 'name', 'department', 'position', 'performance_score',
+    'attendance_rate', 'compliance_rate', 'backlog_count', 'status',
+]
+EVALUATION_COLUMNS = [
+    'evaluation_id', 'employee_id', 'employee_name', 'evaluation_date', 'period', 'evaluated_by',
+    'attendance_rate', 'compliance_rate', 'overall_performance', 'kpi_scores', 'notes',
+]
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def performance_rows(employees, chunk_size=EXPORT_CHUNK_SIZE):
+    """One row per employee of the queryset, with their current dashboard rates"""
+    employees = employees.only('id', 'first_name', 'last_name', 'department', 'position').order_by('id')
+    for chunk in chunks(employees.iterator(chunk_size=chunk_size), chunk_size):
+        metrics = get_metrics_for_employees([employee.id for employee in chunk])
+        for employee in chunk:
+            row = metrics[employee.id]
+            yield {
+                'employee_id': employee.id,
+                'name': f"{employee.first_name} {employee.last_name}",
+                'department': employee.department or 'Not specified',
+                'position': employee.position or 'Not specified',
+                'performance_score': row.performance_score,
+                'attendance_rate': row.attendance_rate,
+                'compliance_rate': row.compliance_rate,
+                'backlog_count': row.open_backlog,
+                'status': get_performance_status(row.performance_score),
+            }
+
+
+def evaluation_rows(employee_ids, since=None, until=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    The evaluations of these employees (a list or an id subquery), oldest first,
+    each with its KPI scores; since/until bound the evaluation date
+    """
+    evaluations = Evaluation.objects.filter(employee_id__in=employee_ids)
+    if since:
+        evaluations = evaluations.filter(evaluation_date__gte=since)
+    if until:
+        evaluations = evaluations.filter(evaluation_date__lte=until)
+    # With chunk_size, the KPI scores are prefetched once per chunk
+    evaluations = evaluations.select_related('employee', 'created_by').prefetch_related(
+        Prefetch('kpi_scores', queryset=EvaluationKPI.objects.select_related('kpi').order_by('eval_kpi_id'))
+    ).order_by('employee_id', 'evaluation_date', 'evaluation_id')
+
+    for evaluation in evaluations.iterator(chunk_size=chunk_size):
+        employee = evaluation.employee
+        yield {
+            'evaluation_id': evaluation.evaluation_id,
+            'employee_id': employee.id,
+            'employee_name': f"{employee.first_name} {employee.last_name}",
+            'evaluation_date': evaluation.evaluation_date,
+            'period': evaluation.period,
+            'evaluated_by': evaluation.created_by.username,
+            'attendance_rate': evaluation.attendance_rate,
+            'compliance_rate': evaluation.compliance_rate,
+            'overall_performance': evaluation.overall_performance,
+            'kpi_scores': [
+                {'kpi': score.kpi.name, 'value': score.value, 'target': score.target}
+                for score in evaluation.kpi_scores.all()
+            ],
+            'notes': evaluation.notes or '',
+        }
+
+
+class Echo:
+    """File-like object whose write() returns the line, for csv.writer in a generator"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        if 'kpi_scores' in row:
+            # One cell per evaluation: "Quality=80/100; Speed=7/10"
+            row = {**row, 'kpi_scores': '; '.join(
+                f"{score['kpi']}={score['value']:g}/{score['target']:g}" for score in row['kpi_scores']
+            )}
+        yield writer.writerow([row[column] for column in columns])
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(export_format, columns, rows):
+    """The export as an iterator of text lines; export_format is a key of EXPORT_FORMATS"""
+    if export_format == 'csv':
+        return csv_lines(columns, rows)
+    return ndjson_lines(rows)
@@ -176,17 +176,8 @@ class AdminCreateUserForm(forms.Form):
 
     def clean(self):
         cleaned_data = super().clean()
-        print(f"DEBUG: Form cleaned data: {cleaned_data}")  # Add this
-        
-        # Check email
-        email = cleaned_data.get('email')
-        if email and Employee.email_exists(email):
-            self.add_error('email', 'Email address already in use.')
-        
-        # Check username
-        username = cleaned_data.get('username')
-        if username and UserAccount.username_exists(username):
-            self.add_error('username', 'Username already exists.')
+
+        # Email and username uniqueness are already checked by clean_email / clean_username
         
         # Check password match
         password = cleaned_data.get('password')
@@ -0,0 +1,129 @@
+import json
+import statistics
+import time
+import tracemalloc
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import UserAccount
+from core.utils import (
+    calculate_attendance_rate,
+    calculate_compliance_rate,
+    calculate_evaluation_metrics,
+    calculate_performance_score,
+    get_team_kpis,
+    get_team_performance_data,
+)
+from dashboard.models import TeamMember
+
+# Functions under test; each gets the seeded supervisor and one of their employees
+TARGETS = [
+    ('calculate_attendance_rate', lambda manager, employee, today: calculate_attendance_rate(employee)),
+    ('calculate_compliance_rate', lambda manager, employee, today: calculate_compliance_rate(employee)),
+    ('calculate_performance_score', lambda manager, employee, today: calculate_performance_score(employee)),
+    ('get_team_performance_data', lambda manager, employee, today: get_team_performance_data(manager)),
+    ('get_team_kpis', lambda manager, employee, today: get_team_kpis(manager)),
+    ('calculate_evaluation_metrics', lambda manager, employee, today: calculate_evaluation_metrics(employee, today)),
+]
+
+
+def int_list(value):
+    try:
+        return [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise CommandError(f"Expected a comma separated list of numbers, got '{value}'")
+
+
+class Command(BaseCommand):
+    help = "Time the core.utils metric functions across team sizes and history lengths"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--team-sizes', default='10,100,1000,5000', help="Comma separated team sizes")
+        parser.add_argument('--days', default='30,365,1825', help="Comma separated days of history")
+        parser.add_argument('--tasks', type=float, default=5, help="Average backlog items per employee")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per function; the median is reported")
+        parser.add_argument('--seed', type=int, default=42, help="seed_momentum seed")
+        parser.add_argument('--function', action='append', dest='functions', help="Only this function (repeatable)")
+        parser.add_argument('--output', help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        team_sizes = int_list(options['team_sizes'])
+        day_counts = int_list(options['days'])
+        targets = [target for target in TARGETS if not options['functions'] or target[0] in options['functions']]
+        if not targets:
+            raise CommandError(f"Unknown --function; choose from {', '.join(name for name, run in TARGETS)}")
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1")
+
+        results = []
+        for team_size in team_sizes:
+            for days in day_counts:
+                results.extend(self.run_case(team_size, days, targets, options))
+
+        self.write_table(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'results': results}, f, indent=2)
+                f.write('\n')
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def run_case(self, team_size, days, targets, options):
+        """Seed one team, measure every target against it, then roll the seeded rows back"""
+        self.stderr.write(f"Seeding a team of {team_size} with {days} days of history...")
+        prefix = f'bench{team_size}x{days}'
+        results = []
+        with transaction.atomic():
+            call_command(
+                'seed_momentum', employees=team_size, fanout=team_size, days=days, tasks=options['tasks'],
+                admins=0, seed=options['seed'], prefix=prefix, stdout=StringIO()
+            )
+            manager = UserAccount.objects.get(username=f'{prefix}-manager0')
+            employee = TeamMember.objects.filter(manager=manager).select_related('employee').first().employee
+            today = timezone.now().date()
+
+            for name, run in targets:
+                run(manager, employee, today)  # warm-up, so connection and import costs are not timed
+
+                timings = []
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    run(manager, employee, today)
+                    timings.append((time.perf_counter() - start) * 1000)
+
+                with CaptureQueriesContext(connection) as queries:
+                    run(manager, employee, today)
+
+                tracemalloc.start()
+                try:
+                    run(manager, employee, today)
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+
+                results.append({
+                    'function': name,
+                    'team_size': team_size,
+                    'days': days,
+                    'median_ms': round(statistics.median(timings), 3),
+                    'min_ms': round(min(timings), 3),
+                    'queries': len(queries),
+                    'peak_kb': round(peak / 1024, 1),
+                })
+
+            transaction.set_rollback(True)
+        return results
+
+    def write_table(self, results):
+        header = f"{'function':<30} {'team':>6} {'days':>6} {'median ms':>10} {'min ms':>10} {'queries':>8} {'peak KB':>10}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in sorted(results, key=lambda row: (row['function'], row['team_size'], row['days'])):
+            self.stdout.write(
+                f"{row['function']:<30} {row['team_size']:>6} {row['days']:>6} {row['median_ms']:>10.3f} "
+                f"{row['min_ms']:>10.3f} {row['queries']:>8} {row['peak_kb']:>10.1f}"
+            )
@@ -0,0 +1,60 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core.snapshots import GRANULARITIES, SHARD_SIZE, SNAPSHOT_CHUNK_SIZE, build_snapshots, get_period_starts
+
+
+class Command(BaseCommand):
+    help = "Compute every employee's PerformanceSnapshot for a day, week or month (or a range of them)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--granularity', choices=GRANULARITIES, default='month')
+        parser.add_argument('--date', help="A day in the period to snapshot, as YYYY-MM-DD (defaults to today)")
+        parser.add_argument('--since', help="Also snapshot every period from this day up to --date, as YYYY-MM-DD")
+        parser.add_argument('--shard-by', choices=['id', 'department'], default='id', help="Split employees into id ranges or departments")
+        parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help="Employees per shard when sharding by id")
+        parser.add_argument('--workers', type=int, default=1, help="Processes computing shards in parallel")
+        parser.add_argument('--chunk-size', type=int, default=SNAPSHOT_CHUNK_SIZE, help="Employees counted and written per round")
+
+    def parse_date(self, options, name):
+        try:
+            return datetime.strptime(options[name], '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f"--{name} must be YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        last_day = self.parse_date(options, 'date') if options['date'] else timezone.now().date()
+        first_day = self.parse_date(options, 'since') if options['since'] else last_day
+        if first_day > last_day:
+            raise CommandError("--since must not be after --date")
+
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            # SQLite takes one writer at a time; parallel shards would only fail with "database is locked"
+            self.stderr.write(self.style.WARNING("SQLite allows a single writer; computing shards in this process"))
+            workers = 1
+
+        granularity = options['granularity']
+        starts = get_period_starts(first_day, last_day, granularity)
+        started = time.perf_counter()
+        total = 0
+        for shard, written in build_snapshots(
+            starts,
+            granularity,
+            shard_by=options['shard_by'],
+            workers=workers,
+            chunk_size=options['chunk_size'],
+            shard_size=options['shard_size']
+        ):
+            total += written
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{shard[0]} {' - '.join(str(part) for part in shard[1:])}: {written} snapshots")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {total} {granularity} snapshots for {len(starts)} period(s) "
+            f"from {starts[0]} in {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import UserAccount
+from core.utils import create_evaluations_batch
+from dashboard.models import TeamMember
+
+
+class Command(BaseCommand):
+    help = "Evaluate a supervisor's whole team, or a list of employees, for one period"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--manager', help="Username of the supervisor whose active team is evaluated")
+        parser.add_argument('--employee', type=int, action='append', dest='employee_ids', help="Employee id to evaluate (repeatable)")
+        parser.add_argument('--created-by', help="Username recorded as the evaluator (defaults to --manager)")
+        parser.add_argument('--date', help="Evaluation date as YYYY-MM-DD (defaults to today)")
+        parser.add_argument('--period', default='', help="Period label, e.g. 'Q1 2026'")
+        parser.add_argument('--notes', default='', help="Notes added to every evaluation")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Employees evaluated per transaction")
+
+    def handle(self, *args, **options):
+        if not options['manager'] and not options['employee_ids']:
+            raise CommandError("Pass --manager and/or --employee")
+
+        employee_ids = list(options['employee_ids'] or [])
+        manager = None
+        if options['manager']:
+            manager = UserAccount.get_by_username(options['manager'])
+            if not manager:
+                raise CommandError(f"No user named {options['manager']}")
+            employee_ids += TeamMember.objects.filter(
+                manager=manager,
+                is_active=True
+            ).order_by('employee_id').values_list('employee_id', flat=True)
+
+        created_by = manager
+        if options['created_by']:
+            created_by = UserAccount.get_by_username(options['created_by'])
+            if not created_by:
+                raise CommandError(f"No user named {options['created_by']}")
+        if not created_by:
+            raise CommandError("Pass --created-by when evaluating employees without --manager")
+
+        if options['date']:
+            try:
+                evaluation_date = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--date must be YYYY-MM-DD")
+        else:
+            evaluation_date = timezone.now().date()
+
+        employee_ids = list(dict.fromkeys(employee_ids))
+        chunk_size = options['chunk_size']
+        evaluated = []
+        for i in range(0, len(employee_ids), chunk_size):
+            evaluated += create_evaluations_batch(
+                employee_ids[i:i + chunk_size],
+                created_by=created_by,
+                evaluation_date=evaluation_date,
+                period=options['period'],
+                notes=options['notes']
+            )
+
+        for summary in evaluated:
+            self.stdout.write(
+                f"{summary['employee_name']}: overall {summary['overall_performance']}%, "
+                f"attendance {summary['attendance_rate']}% ({summary['days_evaluated']} days), "
+                f"compliance {summary['compliance_rate']}% ({summary['tasks_evaluated']} tasks)"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Created {len(evaluated)} evaluations for {evaluation_date}"))
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.export import (
+    EVALUATION_COLUMNS, EXPORT_CHUNK_SIZE, EXPORT_FORMATS, PERFORMANCE_COLUMNS,
+    evaluation_rows, export_lines, performance_rows
+)
+from core.models import Employee, UserAccount
+from dashboard.models import TeamMember
+
+
+class Command(BaseCommand):
+    help = "Stream team performance or evaluation history (with KPI scores) as CSV or NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['performance', 'evaluations'], help="Current rates per employee, or every evaluation")
+        parser.add_argument('--manager', help="Username of the supervisor whose active team is exported (defaults to every employee)")
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv', dest='export_format')
+        parser.add_argument('--since', help="First evaluation date as YYYY-MM-DD (evaluations only)")
+        parser.add_argument('--until', help="Last evaluation date as YYYY-MM-DD (evaluations only)")
+        parser.add_argument('--output', help="File to write (defaults to stdout)")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help="Rows read per database round trip")
+
+    def handle(self, *args, **options):
+        employees = Employee.objects.all()
+        if options['manager']:
+            manager = UserAccount.get_by_username(options['manager'])
+            if not manager:
+                raise CommandError(f"No user named {options['manager']}")
+            employees = employees.filter(id__in=TeamMember.objects.filter(
+                manager=manager,
+                is_active=True
+            ).values('employee_id'))
+
+        dates = {}
+        for option in ('since', 'until'):
+            try:
+                dates[option] = datetime.strptime(options[option], '%Y-%m-%d').date() if options[option] else None
+            except ValueError:
+                raise CommandError(f"--{option} must be YYYY-MM-DD")
+
+        if options['kind'] == 'performance':
+            columns, rows = PERFORMANCE_COLUMNS, performance_rows(employees, chunk_size=options['chunk_size'])
+        else:
+            columns, rows = EVALUATION_COLUMNS, evaluation_rows(
+                employees.values('id'), chunk_size=options['chunk_size'], **dates
+            )
+
+        lines = export_lines(options['export_format'], columns, rows)
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                count = self.write_lines(output, lines)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {count} lines to {options['output']}"))
+        else:
+            self.write_lines(self.stdout, lines, ending='')
+
+    def write_lines(self, output, lines, **kwargs):
+        count = 0
+        for line in lines:
+            output.write(line, **kwargs)
+            count += 1
+        return count
@@ -0,0 +1,252 @@
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, SESSION_KEY
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.urls import reverse
+
+from core.models import UserAccount
+from core.pagination import encode_cursor
+from dashboard.models import TeamMember
+
+# Endpoint name, role that calls it, relative weight within that role, and how to build its path.
+# Role weights are the sums of their endpoints, so simulated users split 50/45/5 employee/supervisor/admin.
+TRAFFIC_MIX = [
+    ('employee_dashboard', 303, 40, lambda actor, rng: reverse('dashboard:home')),
+    ('employee_tasks', 303, 10, lambda actor, rng: reverse('dashboard:employee_tasks')),
+    ('team_tasks', 302, 25, lambda actor, rng: reverse('dashboard:team_tasks')),
+    ('employee_performance_modal', 302, 15, lambda actor, rng: reverse(
+        'dashboard:employee_performance_modal', args=[rng.choice(actor.team)]
+    )),
+    ('supervisor_dashboard', 302, 5, lambda actor, rng: reverse('dashboard:home')),
+    # core.urls is mounted at / and /core/; the front end uses /core/ for the admin APIs
+    ('all_users', 301, 5, lambda actor, rng: '/core' + reverse('core:user_directory_api') + f'?after={rng.choice(actor.cursors)}'),
+]
+
+QUERY_COUNT = re.compile(r'desc="(\d+) queries"')
+
+
+class Actor:
+    """A logged-in account a simulated user makes requests as"""
+
+    def __init__(self, account, session_key, team=None, cursors=None):
+        self.account = account
+        self.session_key = session_key
+        self.team = team or []
+        self.cursors = cursors or ['']
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect here means a lost session or a failed view, so it is reported as an error
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def split_users(count, mix):
+    """Role of each simulated user, in proportion to the role's share of the mix and at least one per role"""
+    role_weights = defaultdict(int)
+    for name, role_id, weight, build_path in mix:
+        role_weights[role_id] += weight
+    total = sum(role_weights.values())
+    shares = {role_id: max(1, round(count * weight / total)) for role_id, weight in role_weights.items()}
+    # Rounding up the small roles can overshoot; take the excess from the biggest role
+    biggest = max(shares, key=shares.get)
+    shares[biggest] = max(1, shares[biggest] - (sum(shares.values()) - count))
+    return [role_id for role_id, share in sorted(shares.items()) for _ in range(share)]
+
+
+class Command(BaseCommand):
+    help = "Replay a mix of dashboard traffic with concurrent simulated users and report latency per endpoint as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help="Concurrent simulated users")
+        parser.add_argument('--duration', type=float, default=30, help="Seconds to run")
+        parser.add_argument('--requests', type=int, help="Stop after this many requests in total")
+        parser.add_argument('--think-time', type=float, default=0, help="Milliseconds each user waits between requests")
+        parser.add_argument('--url', help="Base URL of an already running server sharing this database (e.g. gunicorn); "
+                                          "by default a threaded server is started in-process")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed for user roles and request choices")
+        parser.add_argument('--seed-employees', type=int, help="Run seed_momentum with this many employees first")
+        parser.add_argument('--output', help="Also write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError("--users must be at least 1")
+        if options['seed_employees']:
+            call_command('seed_momentum', employees=options['seed_employees'], seed=options['seed'], stdout=self.stderr)
+
+        rng = random.Random(options['seed'])
+        actors = self.load_actors(options['users'])
+        mix = [entry for entry in TRAFFIC_MIX if actors[entry[1]]]
+        if not mix:
+            raise CommandError("No accounts to log in as; seed the database first (e.g. --seed-employees 1000)")
+        for role_id in {entry[1] for entry in TRAFFIC_MIX} - {entry[1] for entry in mix}:
+            self.stderr.write(self.style.WARNING(f"No accounts with role {role_id}; its traffic is skipped"))
+
+        server = None
+        base_url = options['url']
+        if not base_url:
+            server, base_url = self.start_server()
+
+        users = [
+            (rng.choice(actors[role_id]), random.Random(rng.random()))
+            for role_id in split_users(options['users'], mix)
+        ]
+
+        results = []
+        budget = {'remaining': options['requests']}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+        think_time = options['think_time'] / 1000
+
+        def take_request():
+            if time.perf_counter() >= deadline:
+                return False
+            if budget['remaining'] is None:
+                return True
+            with lock:
+                if budget['remaining'] <= 0:
+                    return False
+                budget['remaining'] -= 1
+                return True
+
+        def simulate(actor, user_rng):
+            opener = urllib.request.build_opener(NoRedirect)
+            actions = [entry for entry in mix if entry[1] == actor.account.role_id]
+            weights = [entry[2] for entry in actions]
+            while take_request():
+                name, role_id, weight, build_path = user_rng.choices(actions, weights=weights)[0]
+                results.append((name,) + self.fetch(opener, base_url + build_path(actor, user_rng), actor))
+                if think_time:
+                    time.sleep(think_time)
+
+        threads = [threading.Thread(target=simulate, args=user, daemon=True) for user in users]
+        started = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            if server:
+                server.shutdown()
+                server.server_close()
+        elapsed = time.perf_counter() - started
+
+        report = self.build_report(results, elapsed, options)
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
+
+    def load_actors(self, count):
+        """Up to count accounts per role, each with its own session, plus what its requests need"""
+        engine = import_module(settings.SESSION_ENGINE)
+
+        def login(account):
+            session = engine.SessionStore()
+            session[SESSION_KEY] = str(account.pk)
+            session[BACKEND_SESSION_KEY] = 'core.backends.CustomUserBackend'
+            session.create()
+            return session.session_key
+
+        accounts = {
+            role_id: list(UserAccount.objects.filter(role_id=role_id).order_by('pk')[:count])
+            for role_id in (301, 302, 303)
+        }
+
+        teams = defaultdict(list)
+        for manager_id, employee_id in TeamMember.objects.filter(
+            manager__in=accounts[302], is_active=True
+        ).values_list('manager_id', 'employee_id'):
+            teams[manager_id].append(employee_id)
+
+        # Cursors to the start of every user_directory_api page (20 users each), so admins jump to any depth
+        keys = UserAccount.objects.order_by('username', 'id').values_list('username', 'id')
+        cursors = [''] + [encode_cursor(key) for key in keys.iterator()][19::20]
+        return {
+            301: [Actor(account, login(account), cursors=cursors) for account in accounts[301]],
+            # Supervisors without a team have no modal to open
+            302: [Actor(account, login(account), team=teams[account.pk]) for account in accounts[302] if teams[account.pk]],
+            303: [Actor(account, login(account)) for account in accounts[303]],
+        }
+
+    def start_server(self):
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+        server.set_app(get_internal_wsgi_application())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address[:2]
+        return server, f'http://{host}:{port}'
+
+    def fetch(self, opener, url, actor):
+        """GET url as actor; returns (status, latency in seconds, query count or None)"""
+        request = urllib.request.Request(url, headers={'Cookie': f'{settings.SESSION_COOKIE_NAME}={actor.session_key}'})
+        start = time.perf_counter()
+        try:
+            with opener.open(request, timeout=60) as response:
+                response.read()
+                status, headers = response.status, response.headers
+        except urllib.error.HTTPError as e:
+            e.read()
+            status, headers = e.code, e.headers
+        except (urllib.error.URLError, OSError):
+            status, headers = 0, {}
+        latency = time.perf_counter() - start
+
+        match = QUERY_COUNT.search(headers.get('Server-Timing', '') or '')
+        return status, latency, int(match.group(1)) if match else None
+
+    def build_report(self, results, elapsed, options):
+        by_endpoint = defaultdict(list)
+        for name, status, latency, queries in results:
+            by_endpoint[name].append((status, latency, queries))
+
+        endpoints = {}
+        for name, samples in sorted(by_endpoint.items()):
+            latencies = sorted(latency * 1000 for status, latency, queries in samples)
+            query_counts = [queries for status, latency, queries in samples if queries is not None]
+            endpoints[name] = {
+                'requests': len(samples),
+                'errors': sum(1 for status, latency, queries in samples if not 200 <= status < 300),
+                'throughput_rps': round(len(samples) / elapsed, 2),
+                'mean_ms': round(sum(latencies) / len(latencies), 2),
+                'p50_ms': round(percentile(latencies, 50), 2),
+                'p95_ms': round(percentile(latencies, 95), 2),
+                'p99_ms': round(percentile(latencies, 99), 2),
+                'queries_per_request': round(sum(query_counts) / len(query_counts), 2) if query_counts else None,
+                'max_queries': max(query_counts) if query_counts else None,
+            }
+
+        return {
+            'users': options['users'],
+            'seconds': round(elapsed, 2),
+            'requests': len(results),
+            'errors': sum(endpoint['errors'] for endpoint in endpoints.values()),
+            'throughput_rps': round(len(results) / elapsed, 2) if elapsed else 0.0,
+            'endpoints': endpoints,
+        }
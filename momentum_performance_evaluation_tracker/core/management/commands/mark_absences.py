@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+
+from core.counters import apply_daily_counts, rebuild_daily_counters
+from core.models import AttendanceRecord, Employee
+from core.team_cache import invalidate_employee_teams
+from core.utils import rebuild_employee_metrics
+
+
+def insert_absences(employee_ids, day):
+    """
+    Record the employees Absent on day, skipping those with a record already, and return
+    the ids of the employees whose row this call inserted, or None if the database cannot say.
+
+    INSERT ... ON CONFLICT DO NOTHING RETURNING names exactly the rows the statement wrote,
+    so a row another transaction commits meanwhile (a late login) is never taken for ours.
+    Databases that cannot return rows from an insert get the rows in without the ids.
+    """
+    opts = AttendanceRecord._meta
+    fields = [opts.get_field(name) for name in ('employee', 'date', 'status', 'is_counted')]
+    if not connection.features.can_return_rows_from_bulk_insert:
+        AttendanceRecord.objects.bulk_create(
+            [AttendanceRecord(employee_id=employee_id, date=day, status='Absent') for employee_id in employee_ids],
+            ignore_conflicts=True
+        )
+        return None
+
+    qn = connection.ops.quote_name
+    returning, _ = connection.ops.return_insert_columns([opts.get_field('employee')])
+    row = f"({', '.join(['%s'] * len(fields))})"
+    sql = (
+        f"{connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)} {qn(opts.db_table)} "
+        f"({', '.join(qn(field.column) for field in fields)}) VALUES {{rows}} "
+        f"{connection.ops.on_conflict_suffix_sql(fields, OnConflict.IGNORE, None, None)} {returning}"
+    )
+    batch_size = connection.ops.bulk_batch_size(fields, employee_ids)
+    inserted = []
+    with connection.cursor() as cursor:
+        for i in range(0, len(employee_ids), batch_size):
+            batch = employee_ids[i:i + batch_size]
+            cursor.execute(
+                sql.format(rows=', '.join([row] * len(batch))),
+                [value for employee_id in batch for value in (employee_id, day, 'Absent', False)]
+            )
+            inserted.extend(employee_id for employee_id, in cursor.fetchall())
+    return inserted
+
+
+class Command(BaseCommand):
+    help = "Record employees with no attendance for a day as Absent (run nightly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Day to close as YYYY-MM-DD (defaults to yesterday)")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows inserted per batch")
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                day = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--date must be YYYY-MM-DD")
+        else:
+            day = timezone.localtime(timezone.now()).date() - timedelta(days=1)
+
+        # Attendance is only tracked for regular employees (role 303), as in mark_attendance
+        missing_ids = list(Employee.objects.filter(
+            accounts__role__role_id=303
+        ).exclude(
+            id__in=AttendanceRecord.objects.filter(date=day).values('employee_id')
+        ).distinct().order_by('id').values_list('id', flat=True))
+
+        chunk_size = options['chunk_size']
+        marked_count = 0
+        for i in range(0, len(missing_ids), chunk_size):
+            chunk = missing_ids[i:i + chunk_size]
+            with transaction.atomic():
+                # Rows written in the meantime (a late login, another run) are skipped and keep their own counts
+                marked = insert_absences(chunk, day)
+                # The insert skips the model signals
+                if marked is None:
+                    # Not knowing which rows were ours, recount the whole chunk rather than add to it
+                    marked = chunk
+                    rebuild_daily_counters(marked)
+                else:
+                    apply_daily_counts(marked, day, {'total_days': 1, 'absent_days': 1})
+                rebuild_employee_metrics(marked)
+                invalidate_employee_teams(marked)
+            marked_count += len(marked)
+
+        self.stdout.write(self.style.SUCCESS(f"Marked {marked_count} employees absent on {day}"))
@@ -0,0 +1,216 @@
+import json
+import re
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.models import UserAccount
+from dashboard.models import TeamMember
+
+# Request name, role that makes it, and how to build its path from the account and its team's employee ids
+REQUESTS = [
+    ('employee_dashboard', 303, lambda account, team: reverse('dashboard:home')),
+    ('employee_tasks', 303, lambda account, team: reverse('dashboard:employee_tasks')),
+    ('supervisor_dashboard', 302, lambda account, team: reverse('dashboard:home')),
+    ('team_members', 302, lambda account, team: reverse('dashboard:get_team_members')),
+    ('team_kpis', 302, lambda account, team: reverse('dashboard:team_kpi_api')),
+    ('team_tasks', 302, lambda account, team: reverse('dashboard:team_tasks')),
+    ('employee_performance_modal', 302, lambda account, team: reverse('dashboard:employee_performance_modal', args=[team[0]])),
+    ('employee_attendance_stats', 302, lambda account, team: reverse('dashboard:employee_attendance_stats', args=[team[0]])),
+    ('last_evaluation', 302, lambda account, team: reverse('dashboard:get_last_evaluation', args=[team[0]])),
+    ('evaluation_modal', 302, lambda account, team: reverse('dashboard:evaluation_modal', args=[team[0]])),
+    ('performance_trend', 302, lambda account, team: reverse('dashboard:performance_trend')),
+    # core.urls is mounted at / and /core/; the front end uses /core/ for the admin APIs
+    ('user_directory', 301, lambda account, team: '/core' + reverse('core:user_directory_api')),
+]
+
+# Lookup tables of a handful of rows, where reading the whole table is the cheapest plan
+SMALL_TABLES = ['core_role', 'core_kpi']
+
+# Django's table aliases: FROM "core_attendancerecord" U0, INNER JOIN "core_employee" T3
+TABLE_ALIAS = re.compile(r'"(\w+)" ([A-Z]\d+)\b')
+FIRST_TABLE = re.compile(r'FROM "(\w+)"')
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+def sqlite_scans(plan_rows, sql):
+    """
+    (kind, table, detail) of the problems in an EXPLAIN QUERY PLAN: 'scan' for a table
+    read in full (a scan through an index is not one), 'sort' for a temporary sort
+    an index could have delivered in order, put on the query's first table
+    """
+    aliases = {alias: table for table, alias in TABLE_ALIAS.findall(sql)}
+    first_table = FIRST_TABLE.search(sql)
+    problems = []
+    for row in plan_rows:
+        detail = row[-1]
+        match = SQLITE_SCAN.match(detail)
+        if match:
+            problems.append(('scan', aliases.get(match.group(1), match.group(1)), detail))
+        elif detail.startswith('USE TEMP B-TREE FOR ORDER BY') and first_table:
+            problems.append(('sort', first_table.group(1), detail))
+    return problems
+
+
+def postgresql_scans(plan):
+    """(kind, table, detail) of the Seq Scans and Sorts in an EXPLAIN (FORMAT JSON) plan"""
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    problems = []
+    nodes = [entry['Plan'] for entry in plan]
+    while nodes:
+        node = nodes.pop()
+        if node['Node Type'] == 'Seq Scan':
+            problems.append(('scan', node['Relation Name'], f"Seq Scan on {node['Relation Name']}"))
+        elif node['Node Type'] == 'Sort':
+            # A sort names no table; take the first one read beneath it
+            below = node.get('Plans', [])[:]
+            while below and 'Relation Name' not in below[0]:
+                below = below[0].get('Plans', []) + below[1:]
+            if below:
+                problems.append(('sort', below[0]['Relation Name'], f"Sort on {', '.join(node.get('Sort Key', []))}"))
+        nodes.extend(node.get('Plans', []))
+    return problems
+
+
+def explain_problems(sql, params):
+    """(kind, table, plan detail) of every full table scan ('scan') or explicit sort ('sort') in the plan of one query"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Seq scans and sorts stay in a plan only when no index can replace them, so a
+            # small table's cheap scan is not flagged and a large one's missing index is
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            return postgresql_scans(cursor.fetchone()[0])
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return sqlite_scans(cursor.fetchall(), sql)
+        if connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN ' + sql, params)
+            columns = [column[0] for column in cursor.description]
+            problems = []
+            for row in cursor.fetchall():
+                row = dict(zip(columns, row))
+                if row['type'] == 'ALL':
+                    problems.append(('scan', row['table'], f"type ALL on {row['table']}"))
+                if 'Using filesort' in (row['Extra'] or ''):
+                    problems.append(('sort', row['table'], 'Using filesort'))
+            return problems
+    raise CommandError(f"EXPLAIN is not supported on {connection.vendor}")
+
+
+class Command(BaseCommand):
+    help = "Make a representative set of dashboard requests, EXPLAIN every query they run and flag full table scans and sorts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed-employees', type=int, help="Run seed_momentum with this many employees first")
+        parser.add_argument('--seed', type=int, default=42, help="seed_momentum seed")
+        parser.add_argument('--analyze', action='store_true', help="Refresh the planner statistics (ANALYZE) first; SQLite may ignore new indexes until then")
+        parser.add_argument('--ignore-table', action='append', default=[], dest='ignore_tables',
+                            help=f"Do not flag this table (repeatable; {', '.join(SMALL_TABLES)} are always ignored)")
+        parser.add_argument('--fail-on-scan', action='store_true', help="Exit with an error when any full table scan is flagged")
+        parser.add_argument('--output', help="Also write the findings as JSON to this file")
+
+    def handle(self, *args, **options):
+        if options['seed_employees']:
+            call_command('seed_momentum', employees=options['seed_employees'], seed=options['seed'], stdout=self.stderr)
+        if options['analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        actors = self.load_actors()
+        requests = [entry for entry in REQUESTS if entry[1] in actors]
+        if not requests:
+            raise CommandError("No accounts to make requests as; seed the database first (e.g. --seed-employees 1000)")
+        for role_id in sorted({entry[1] for entry in REQUESTS} - set(actors)):
+            self.stderr.write(self.style.WARNING(f"No accounts with role {role_id}; its requests are skipped"))
+
+        ignored = set(SMALL_TABLES) | set(options['ignore_tables'])
+        known_tables = {model._meta.db_table for model in apps.get_models()}
+        findings = []
+        summary = []
+        # Logging in writes sessions; nothing the advisor does is kept
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=settings.ALLOWED_HOSTS + ['testserver']):
+            for name, role_id, build_path in requests:
+                account, team = actors[role_id]
+                status, queries = self.run_request(account, build_path(account, team))
+                flagged = {'scan': 0, 'sort': 0}
+                for sql, params in queries:
+                    for kind, table, detail in explain_problems(sql, params):
+                        if table in known_tables and table not in ignored:
+                            flagged[kind] += 1
+                            findings.append({'request': name, 'kind': kind, 'table': table, 'plan': detail, 'sql': sql})
+                summary.append({
+                    'request': name, 'status': status, 'queries': len(queries), 'scans': flagged['scan'], 'sorts': flagged['sort']
+                })
+            transaction.set_rollback(True)
+
+        self.write_report(summary, findings)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'requests': summary, 'findings': findings}, f, indent=2)
+                f.write('\n')
+            self.stdout.write(f"Findings written to {options['output']}")
+        scans = sum(row['scans'] for row in summary)
+        if scans and options['fail_on_scan']:
+            raise CommandError(f"{scans} full table scan(s) found")
+
+    def load_actors(self):
+        """{role_id: (account, team employee ids)} for the first account of each role; supervisors need a team"""
+        actors = {}
+        for role_id in (301, 302, 303):
+            accounts = UserAccount.objects.filter(role_id=role_id).order_by('pk')
+            if role_id == 302:
+                accounts = accounts.filter(managed_team__is_active=True).distinct()
+            account = accounts.first()
+            if account:
+                team = list(TeamMember.objects.filter(
+                    manager=account, is_active=True
+                ).order_by('employee_id').values_list('employee_id', flat=True))
+                actors[role_id] = (account, team)
+        return actors
+
+    def run_request(self, account, path):
+        """GET path as account; returns the status and the distinct (sql, params) of the SELECTs it ran"""
+        queries = {}
+
+        def collect(execute, sql, params, many, context):
+            if not many and sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                queries.setdefault(sql, params)
+            return execute(sql, params, many, context)
+
+        client = Client(raise_request_exception=False)
+        client.force_login(account, backend='core.backends.CustomUserBackend')
+        with connection.execute_wrapper(collect):
+            response = client.get(path)
+        return response.status_code, list(queries.items())
+
+    def write_report(self, summary, findings):
+        header = f"{'request':<30} {'status':>6} {'queries':>8} {'scans':>6} {'sorts':>6}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in summary:
+            self.stdout.write(
+                f"{row['request']:<30} {row['status']:>6} {row['queries']:>8} {row['scans']:>6} {row['sorts']:>6}"
+            )
+
+        if not findings:
+            self.stdout.write(self.style.SUCCESS("No full table scans or sorts"))
+            return
+        self.stdout.write('')
+        by_table = defaultdict(list)
+        for finding in findings:
+            by_table[(finding['table'], finding['kind'])].append(finding)
+        for (table, kind), table_findings in sorted(by_table.items()):
+            requests = ', '.join(sorted({finding['request'] for finding in table_findings}))
+            self.stdout.write(self.style.WARNING(f"{table}: {'scanned' if kind == 'scan' else 'sorted'} by {requests}"))
+            for finding in table_findings:
+                self.stdout.write(f"  {finding['plan']}  <- {finding['sql'][:160]}")
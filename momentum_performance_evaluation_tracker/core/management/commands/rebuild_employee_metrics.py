@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.counters import rebuild_daily_counters
+from core.models import Employee, EmployeeMetrics
+from core.utils import count_employee_metrics, rebuild_employee_metrics, refresh_last_evaluations
+
+COUNTER_FIELDS = ['present_days', 'total_days', 'accepted_tasks', 'total_tasks', 'open_backlog']
+
+
+class Command(BaseCommand):
+    help = "Rebuild the EmployeeMetrics and DailyCounter counters and last-evaluation pointers from the raw records, or verify EmployeeMetrics with --verify"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help="Compare stored counters with the raw tables without writing")
+        parser.add_argument('--employee', type=int, action='append', dest='employee_ids', help="Only this employee id (repeatable)")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Employees per batch")
+
+    def handle(self, *args, **options):
+        employee_ids = options['employee_ids'] or list(Employee.objects.order_by('id').values_list('id', flat=True))
+        chunk_size = options['chunk_size']
+        chunks = [employee_ids[i:i + chunk_size] for i in range(0, len(employee_ids), chunk_size)]
+
+        if not options['verify']:
+            for chunk in chunks:
+                rebuild_employee_metrics(chunk)
+                rebuild_daily_counters(chunk)
+                refresh_last_evaluations(chunk)
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt metrics, daily counters and last evaluations for {len(employee_ids)} employees"))
+            return
+
+        today = timezone.now().date()
+        mismatches = 0
+        for chunk in chunks:
+            expected = count_employee_metrics(chunk, today)
+            stored = {row.employee_id: row for row in EmployeeMetrics.objects.filter(employee_id__in=chunk)}
+
+            for employee_id in chunk:
+                row = stored.get(employee_id)
+                if row is None:
+                    # Missing rows are rebuilt on first read, so they are not drift
+                    continue
+                if row.counted_through != today:
+                    # Counted through an earlier day, so also rebuilt on first read
+                    continue
+                diffs = [
+                    f"{field}={getattr(row, field)} (expected {expected[employee_id][field]})"
+                    for field in COUNTER_FIELDS
+                    if getattr(row, field) != expected[employee_id][field]
+                ]
+                if diffs:
+                    mismatches += 1
+                    self.stdout.write(self.style.WARNING(f"Employee {employee_id}: " + ", ".join(diffs)))
+
+        if mismatches:
+            raise CommandError(f"{mismatches} of {len(employee_ids)} employees have out-of-sync metrics; run without --verify to rebuild")
+        self.stdout.write(self.style.SUCCESS(f"Metrics match the raw tables for {len(employee_ids)} employees"))
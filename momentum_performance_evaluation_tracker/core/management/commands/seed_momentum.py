@@ -0,0 +1,224 @@
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.counters import rebuild_daily_counters
+from core.models import AttendanceRecord, BacklogItem, Employee, Evaluation, Role, UserAccount
+from core.search import index_employees
+from core.utils import insert_rows, rebuild_employee_metrics, refresh_last_evaluations
+from dashboard.models import TeamMember
+
+FIRST_NAMES = ['Ana', 'Ben', 'Carla', 'Dan', 'Elena', 'Felix', 'Grace', 'Hugo', 'Ivy', 'Jon', 'Kara', 'Leo', 'Mia', 'Noel', 'Olga', 'Paul']
+LAST_NAMES = ['Reyes', 'Santos', 'Cruz', 'Garcia', 'Lim', 'Tan', 'Walker', 'Moore', 'Nguyen', 'Smith', 'Lopez', 'Khan']
+DEPARTMENTS = ['IT', 'HR', 'Finance', 'Operations', 'Sales']
+POSITIONS = ['Analyst', 'Associate', 'Specialist', 'Coordinator', 'Engineer']
+PRIORITIES = ['Low', 'Medium', 'High', 'Critical']
+
+ATTENDANCE_STATUSES = ['Present', 'Late', 'Absent']
+ATTENDANCE_WEIGHTS = [80, 12, 8]
+
+# (status, review_status) of a seeded task and how often it occurs
+TASK_STATES = [
+    ('Not Started', 'Pending Review'),
+    ('In Progress', 'Pending Review'),
+    ('Completed', 'Pending Review'),
+    ('Accepted', 'Accepted'),
+    ('In Progress', 'Rejected'),
+]
+TASK_WEIGHTS = [20, 25, 20, 30, 5]
+
+# created_date is auto_now_add, so it is set after insert as due_date minus this lead time
+TASK_LEAD = timedelta(days=14)
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with deterministic synthetic employees, teams, attendance, tasks and evaluations. "
+        "--employees 5000 --days 200 (a million attendance rows) takes about 30s on SQLite."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42, help="Random seed; the same seed and end date give the same data")
+        parser.add_argument('--employees', type=int, default=1000, help="Number of regular employees")
+        parser.add_argument('--fanout', type=int, default=10, help="Employees per supervisor")
+        parser.add_argument('--admins', type=int, default=1, help="Number of admin accounts")
+        parser.add_argument('--days', type=int, default=90, help="Days of attendance history per employee")
+        parser.add_argument('--tasks', type=float, default=5, help="Average backlog items per employee")
+        parser.add_argument('--evaluations', type=int, default=1, help="Past evaluations per employee, evenly spaced over the history")
+        parser.add_argument('--end-date', help="Last day of history as YYYY-MM-DD (defaults to yesterday)")
+        parser.add_argument('--prefix', default='seed', help="Prefix of seeded usernames and emails")
+        parser.add_argument('--password', default='password123', help="Password of every seeded account")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Rows inserted per batch")
+
+    def handle(self, *args, **options):
+        if options['employees'] < 1 or options['fanout'] < 1 or options['days'] < 0 or options['tasks'] < 0:
+            raise CommandError("--employees and --fanout must be positive, --days and --tasks not negative")
+        if options['end_date']:
+            try:
+                end_date = datetime.strptime(options['end_date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--end-date must be YYYY-MM-DD")
+        else:
+            end_date = timezone.localtime(timezone.now()).date() - timedelta(days=1)
+
+        prefix = options['prefix']
+        if UserAccount.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f"Accounts with prefix '{prefix}' already exist; pick another --prefix or flush the database")
+
+        self.rng = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        self.counts = {}
+        self.password_hash = make_password(options['password'])  # hashing is slow, so every account shares one
+        start = time.perf_counter()
+
+        roles = self.create_roles()
+        manager_count = math.ceil(options['employees'] / options['fanout'])
+        admins = self.create_accounts(prefix, 'admin', options['admins'], roles[301])
+        managers = self.create_accounts(prefix, 'manager', manager_count, roles[302])
+        employees = self.create_accounts(prefix, 'employee', options['employees'], roles[303])
+        employee_ids = [account.employee_id for account in employees]
+        # bulk_create skips the signals that keep the search index current
+        searchable_ids = [account.employee_id for account in admins + managers + employees]
+        for i in range(0, len(searchable_ids), self.chunk_size):
+            index_employees(searchable_ids[i:i + self.chunk_size])
+
+        # Employee i reports to manager i // fanout
+        manager_of = {
+            account.employee_id: managers[i // options['fanout']]
+            for i, account in enumerate(employees)
+        }
+        self.insert(TeamMember, (
+            TeamMember(manager=manager_of[employee_id], employee_id=employee_id)
+            for employee_id in employee_ids
+        ))
+
+        days = options['days']
+        start_date = end_date - timedelta(days=max(days - 1, 0))
+        evaluation_dates = [
+            start_date + timedelta(days=days * (n + 1) // (options['evaluations'] + 1))
+            for n in range(options['evaluations'])
+        ] if days else []
+        last_evaluation_date = evaluation_dates[-1] if evaluation_dates else None
+
+        self.insert(Evaluation, self.generate_evaluations(employee_ids, manager_of, evaluation_dates))
+        self.insert_rows(
+            AttendanceRecord, ['employee_id', 'date', 'status', 'is_counted'],
+            self.generate_attendance(employee_ids, start_date, days, last_evaluation_date)
+        )
+        self.insert(BacklogItem, self.generate_tasks(employee_ids, manager_of, start_date, end_date, options['tasks'], last_evaluation_date))
+
+        for i in range(0, len(employee_ids), self.chunk_size):
+            chunk = employee_ids[i:i + self.chunk_size]
+            BacklogItem.objects.filter(employee_id__in=chunk).update(created_date=F('due_date') - TASK_LEAD)
+            rebuild_employee_metrics(chunk)
+            rebuild_daily_counters(chunk)
+            refresh_last_evaluations(chunk)
+
+        elapsed = time.perf_counter() - start
+        summary = ', '.join(f"{count} {name}" for name, count in self.counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {summary} in {elapsed:.1f}s"))
+
+    def insert(self, model, objects):
+        """bulk_create objects from an iterable chunk by chunk, so big tables never sit in memory at once"""
+        batch = []
+        total = 0
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.chunk_size:
+                model.objects.bulk_create(batch, batch_size=self.chunk_size)
+                total += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch, batch_size=self.chunk_size)
+            total += len(batch)
+        self.counts[str(model._meta.verbose_name_plural).lower()] = total
+
+    def insert_rows(self, model, columns, rows):
+        """Like insert, for rows given as tuples of column values; see core.utils.insert_rows"""
+        total = insert_rows(model, columns, rows, batch_size=self.chunk_size)
+        self.counts[str(model._meta.verbose_name_plural).lower()] = total
+
+    def create_roles(self):
+        roles = {}
+        for role_id, role_name in [(301, 'Admin'), (302, 'Supervisor'), (303, 'Employee')]:
+            roles[role_id], _ = Role.objects.get_or_create(role_id=role_id, defaults={'role_name': role_name})
+        return roles
+
+    def create_accounts(self, prefix, kind, count, role):
+        """Create count Employee rows with one UserAccount each and return the accounts"""
+        with transaction.atomic():
+            employees = []
+            for i in range(count):
+                employees.append(Employee(
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                    department=self.rng.choice(DEPARTMENTS),
+                    position=self.rng.choice(POSITIONS) if kind == 'employee' else kind.title(),
+                    email_address=f'{prefix}-{kind}{i}@example.com',
+                ))
+            employees = Employee.objects.bulk_create(employees, batch_size=self.chunk_size)
+            accounts = UserAccount.objects.bulk_create([
+                UserAccount(
+                    employee=employee,
+                    username=f'{prefix}-{kind}{i}',
+                    password=self.password_hash,
+                    role=role,
+                    is_first_login=False
+                )
+                for i, employee in enumerate(employees)
+            ], batch_size=self.chunk_size)
+        self.counts[f'{kind}s'] = count
+        return accounts
+
+    def generate_evaluations(self, employee_ids, manager_of, evaluation_dates):
+        for employee_id in employee_ids:
+            for n, evaluation_date in enumerate(evaluation_dates, start=1):
+                attendance_rate = round(self.rng.uniform(60, 100), 2)
+                compliance_rate = round(self.rng.uniform(40, 100), 2)
+                yield Evaluation(
+                    employee_id=employee_id,
+                    created_by=manager_of[employee_id],
+                    evaluation_date=evaluation_date,
+                    period=f'Period {n}',
+                    notes='Seeded evaluation',
+                    attendance_rate=attendance_rate,
+                    compliance_rate=compliance_rate,
+                    overall_performance=round(attendance_rate * 0.4 + compliance_rate * 0.6, 2)
+                )
+
+    def generate_attendance(self, employee_ids, start_date, days, last_evaluation_date):
+        dates = [start_date + timedelta(days=offset) for offset in range(days)]
+        for employee_id in employee_ids:
+            statuses = self.rng.choices(ATTENDANCE_STATUSES, weights=ATTENDANCE_WEIGHTS, k=days)
+            for day, status in zip(dates, statuses):
+                # (employee_id, date, status, is_counted); days up to the last evaluation were already counted by it
+                yield employee_id, day, status, last_evaluation_date is not None and day <= last_evaluation_date
+
+    def generate_tasks(self, employee_ids, manager_of, start_date, end_date, density, last_evaluation_date):
+        span = (end_date - start_date).days
+        for employee_id in employee_ids:
+            task_count = self.rng.randint(0, round(density * 2))
+            for n in range(task_count):
+                created = start_date + timedelta(days=self.rng.randint(0, span))
+                status, review_status = self.rng.choices(TASK_STATES, weights=TASK_WEIGHTS)[0]
+                reviewed = review_status != 'Pending Review'
+                yield BacklogItem(
+                    employee_id=employee_id,
+                    task_description=f'Seeded task {n + 1}',
+                    due_date=created + TASK_LEAD,
+                    status=status,
+                    priority=self.rng.choice(PRIORITIES),
+                    completed_date=created + timedelta(days=self.rng.randint(1, 14)) if status in ('Completed', 'Accepted') else None,
+                    review_status=review_status,
+                    reviewed_by=manager_of[employee_id] if reviewed else None,
+                    reviewed_at=timezone.make_aware(datetime.combine(created + TASK_LEAD, datetime.min.time())) if reviewed else None,
+                    # Tasks created up to the last evaluation were already evaluated by it
+                    is_evaluated=last_evaluation_date is not None and created <= last_evaluation_date
+                )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.team_cache import get_team_cache_stats, reset_team_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters for the manager dashboard team cache (counted while TEAM_CACHE_STATS is on)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Reset the counters after printing them")
+
+    def handle(self, *args, **options):
+        stats = get_team_cache_stats()
+        self.stdout.write(f"Hits: {stats['hits']}")
+        self.stdout.write(f"Misses: {stats['misses']}")
+        self.stdout.write(f"Hit rate: {stats['hit_rate']}%")
+
+        if options['reset']:
+            reset_team_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset"))
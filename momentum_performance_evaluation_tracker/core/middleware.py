@@ -0,0 +1,132 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('momentum.request')
+
+# Timing of the request being handled on this thread/task
+current_timing = ContextVar('current_timing', default=None)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.view_time = None
+        self.start = time.perf_counter()
+
+    def time_query(self, execute, sql, params, many, context):
+        query_start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.db_time += time.perf_counter() - query_start
+
+    def timing_queries(self):
+        """Context manager counting the queries of every database connection into this timing"""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self.time_query))
+        return stack
+
+
+class ServerTimingMiddleware:
+    """
+    Per-request cost breakdown in a Server-Timing header.
+
+    Reports SQL query count and time, template render time, view time and
+    total time, so browser devtools show where a request spent its time.
+    With SERVER_TIMING_LOG on, the same numbers are logged as one JSON line
+    on the 'momentum.request' logger. Should be first in MIDDLEWARE so the
+    total covers the other middleware; the view time comes from
+    ViewTimingMiddleware and the template time from the TimedDjangoTemplates
+    backend (core.template_backends).
+
+    A streaming response sends its headers before the body is produced, so
+    its header only covers the work done up to then. Queries run while the
+    body streams are still counted, and the log line of a streaming response
+    is written once the body has been sent, with them included.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SERVER_TIMING_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.log_requests = getattr(settings, 'SERVER_TIMING_LOG', False)
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            with timing.timing_queries():
+                response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+
+        total_time = time.perf_counter() - timing.start
+        metrics = [
+            f'db;dur={timing.db_time * 1000:.1f};desc="{timing.query_count} queries"',
+            f'tpl;dur={timing.template_time * 1000:.1f}',
+        ]
+        if timing.view_time is not None:
+            metrics.append(f'view;dur={timing.view_time * 1000:.1f}')
+        metrics.append(f'total;dur={total_time * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(metrics)
+
+        if self.log_requests and logger.isEnabledFor(logging.INFO):
+            if response.streaming and not response.is_async:
+                response.streaming_content = self.timed_stream(response.streaming_content, request, response, timing)
+            else:
+                self.log(request, response, timing, total_time)
+
+        return response
+
+    def timed_stream(self, content, request, response, timing):
+        """Pass the streamed body through, counting its queries, and log the request once it is sent"""
+        with timing.timing_queries():
+            yield from content
+        self.log(request, response, timing, time.perf_counter() - timing.start)
+
+    def log(self, request, response, timing, total_time):
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'queries': timing.query_count,
+            'db_ms': round(timing.db_time * 1000, 1),
+            'template_ms': round(timing.template_time * 1000, 1),
+            'view_ms': round(timing.view_time * 1000, 1) if timing.view_time is not None else None,
+            'total_ms': round(total_time * 1000, 1),
+        }))
+
+
+class ViewTimingMiddleware:
+    """
+    Times the view for ServerTimingMiddleware. Should be last in MIDDLEWARE,
+    so the span it measures is URL resolution, the view and its template
+    response rendering, without any other middleware.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SERVER_TIMING_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = current_timing.get()
+        if timing is None:
+            return self.get_response(request)
+        start = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            timing.view_time = time.perf_counter() - start
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_attendancerecord_is_counted_backlogitem_is_evaluated_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeMetrics',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metrics', serialize=False, to='core.employee')),
+                ('attendance_start_date', models.DateField()),
+                ('present_days', models.IntegerField(default=0)),
+                ('total_days', models.IntegerField(default=0)),
+                ('accepted_tasks', models.IntegerField(default=0)),
+                ('total_tasks', models.IntegerField(default=0)),
+                ('open_backlog', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:16
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copies of the core.search helpers as they were when this migration was written,
+# so later changes to the live module cannot change what it builds
+WORD = re.compile(r'[a-z0-9]+')
+
+
+def words(text):
+    return WORD.findall((text or '').lower())
+
+
+def search_document(employee, usernames):
+    parts = [employee.first_name, employee.last_name, employee.email_address, employee.department, employee.position]
+    return ' '.join(dict.fromkeys(word for part in parts + list(usernames) for word in words(part)))
+
+
+def word_trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def document_trigrams(document):
+    return set().union(*(word_trigrams(word) for word in document.split()))
+
+
+def create_trigram_index(apps, schema_editor):
+    # The GIN index only exists on PostgreSQL; other databases search SearchTrigram instead
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX core_employeesearchindex_document_trgm '
+        'ON core_employeesearchindex USING gin (document gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS core_employeesearchindex_document_trgm')
+
+
+def index_existing_employees(apps, schema_editor):
+    Employee = apps.get_model('core', 'Employee')
+    UserAccount = apps.get_model('core', 'UserAccount')
+    EmployeeSearchIndex = apps.get_model('core', 'EmployeeSearchIndex')
+    SearchTrigram = apps.get_model('core', 'SearchTrigram')
+    db = schema_editor.connection.alias
+
+    usernames = {}
+    for employee_id, username in UserAccount.objects.using(db).values_list('employee_id', 'username'):
+        usernames.setdefault(employee_id, []).append(username)
+    documents = {
+        employee.id: search_document(employee, usernames.get(employee.id, []))
+        for employee in Employee.objects.using(db).iterator()
+    }
+    EmployeeSearchIndex.objects.using(db).bulk_create(
+        [EmployeeSearchIndex(employee_id=employee_id, document=document) for employee_id, document in documents.items()],
+        batch_size=5000
+    )
+    if schema_editor.connection.vendor != 'postgresql':
+        SearchTrigram.objects.using(db).bulk_create(
+            [
+                SearchTrigram(employee_id=employee_id, gram=gram)
+                for employee_id, document in documents.items()
+                for gram in document_trigrams(document)
+            ],
+            batch_size=5000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_backlogitem_updated_at_tombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeSearchIndex',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_index', serialize=False, to='core.employee')),
+                ('document', models.TextField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=3)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_trigrams', to='core.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['gram', 'employee'], name='core_search_gram_604927_idx')],
+            },
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.RunPython(index_existing_employees, migrations.RunPython.noop),
+    ]
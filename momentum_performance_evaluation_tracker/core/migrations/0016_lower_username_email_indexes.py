@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:23
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_employee_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(django.db.models.functions.text.Lower('email_address'), name='core_employee_email_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='useraccount',
+            index=models.Index(django.db.models.functions.text.Lower('username'), name='core_account_username_lower'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+STATUS_COUNTERS = {'Present': 'present_days', 'Late': 'late_days', 'Absent': 'absent_days'}
+COUNTERS = ['total_days', 'present_days', 'late_days', 'absent_days', 'tasks_created', 'tasks_accepted']
+
+
+def build_daily_counters(apps, schema_editor):
+    """Running daily totals for the existing attendance and tasks, one employee chunk at a time"""
+    using = schema_editor.connection.alias
+    Employee = apps.get_model('core', 'Employee')
+    AttendanceRecord = apps.get_model('core', 'AttendanceRecord')
+    BacklogItem = apps.get_model('core', 'BacklogItem')
+    DailyCounter = apps.get_model('core', 'DailyCounter')
+
+    employee_ids = list(Employee.objects.using(using).order_by('id').values_list('id', flat=True))
+    for i in range(0, len(employee_ids), 500):
+        chunk = employee_ids[i:i + 500]
+        daily = {}
+        for row in AttendanceRecord.objects.using(using).filter(employee_id__in=chunk).values('employee_id', 'date').annotate(
+            total_days=Count('attendance_id'),
+            **{name: Count('attendance_id', filter=Q(status=status)) for status, name in STATUS_COUNTERS.items()}
+        ).order_by():
+            daily.setdefault((row.pop('employee_id'), row.pop('date')), {}).update(row)
+        for row in BacklogItem.objects.using(using).filter(employee_id__in=chunk).values('employee_id', 'created_date').annotate(
+            tasks_created=Count('backlog_id'),
+            tasks_accepted=Count('backlog_id', filter=Q(status='Accepted') | Q(review_status='Accepted'))
+        ).order_by():
+            daily.setdefault((row.pop('employee_id'), row.pop('created_date')), {}).update(row)
+
+        rows = []
+        totals = {}
+        for (employee_id, day), counts in sorted(daily.items()):
+            running = totals.setdefault(employee_id, dict.fromkeys(COUNTERS, 0))
+            for name, value in counts.items():
+                running[name] += value
+            rows.append(DailyCounter(employee_id=employee_id, date=day, **running))
+        DailyCounter.objects.using(using).bulk_create(rows, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_lower_username_email_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total_days', models.IntegerField(default=0)),
+                ('present_days', models.IntegerField(default=0)),
+                ('late_days', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0)),
+                ('tasks_created', models.IntegerField(default=0)),
+                ('tasks_accepted', models.IntegerField(default=0)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_counters', to='core.employee')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('employee', 'date'), name='core_dailycounter_employee_date')],
+            },
+        ),
+        migrations.RunPython(build_daily_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_dailycounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancerecord',
+            index=models.Index(condition=models.Q(('is_counted', False)), fields=['employee', 'date', 'status'], name='core_attendance_uncounted'),
+        ),
+        migrations.AddIndex(
+            model_name='backlogitem',
+            index=models.Index(condition=models.Q(('is_evaluated', False)), fields=['employee', 'created_date'], name='core_backlog_unevaluated'),
+        ),
+        migrations.AddIndex(
+            model_name='backlogitem',
+            index=models.Index(fields=['employee', 'status', 'review_status'], name='core_backlog_status'),
+        ),
+        migrations.AddIndex(
+            model_name='evaluation',
+            index=models.Index(fields=['employee', '-evaluation_date'], name='core_evaluation_latest'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def set_last_evaluations(apps, schema_editor):
+    using = schema_editor.connection.alias
+    Employee = apps.get_model('core', 'Employee')
+    Evaluation = apps.get_model('core', 'Evaluation')
+    latest = Evaluation.objects.using(using).filter(employee_id=OuterRef('pk')).order_by('-evaluation_date', '-evaluation_id')
+    Employee.objects.using(using).update(
+        last_evaluation_id=Subquery(latest.values('evaluation_id')[:1]),
+        last_evaluation_date=Subquery(latest.values('evaluation_date')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='last_evaluation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.evaluation'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='last_evaluation_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(set_last_evaluations, migrations.RunPython.noop),
+    ]
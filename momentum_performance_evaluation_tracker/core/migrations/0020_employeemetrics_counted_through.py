@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_employee_last_evaluation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employeemetrics',
+            name='counted_through',
+            field=models.DateField(null=True),
+        ),
+    ]
@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.contrib.auth.hashers import make_password, check_password
 from django.core.exceptions import ValidationError
+from django.db.models.functions import Lower
 from cloudinary.models import CloudinaryField
 
 class Role(models.Model):
@@ -18,13 +20,69 @@ class Employee(models.Model):
     position = models.CharField(max_length=150, blank=True, null=True)
     hire_date = models.DateField(blank=True, null=True)
     email_address = models.EmailField(unique=True)
+    # Latest evaluation (by date, then id), kept in sync by core.signals so readers need not sort the evaluations
+    last_evaluation = models.ForeignKey('Evaluation', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_evaluation_date = models.DateField(null=True, blank=True)
+
+    class Meta:
+        # Case-insensitive lookups compare LOWER(email_address), which this index serves
+        indexes = [models.Index(Lower('email_address'), name='core_employee_email_lower')]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
     
     @classmethod
     def email_exists(cls, email):
-        return cls.objects.filter(email_address__iexact=email).exists()
+        return cls.objects.alias(email_lower=Lower('email_address')).filter(email_lower=email.lower()).exists()
+
+class EmployeeMetrics(models.Model):
+    """Running counters behind the real-time dashboard rates, kept in sync by core.signals"""
+    employee = models.OneToOneField(Employee, on_delete=models.CASCADE, primary_key=True, related_name='metrics')
+    attendance_start_date = models.DateField()  # attendance year the day counters belong to
+    counted_through = models.DateField(null=True)  # last day whose attendance the day counters include
+    present_days = models.IntegerField(default=0)
+    total_days = models.IntegerField(default=0)
+    accepted_tasks = models.IntegerField(default=0)
+    total_tasks = models.IntegerField(default=0)
+    open_backlog = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Metrics for {self.employee_id}"
+
+    @property
+    def attendance_rate(self):
+        return round((self.present_days / self.total_days) * 100, 2) if self.total_days > 0 else 0.0
+
+    @property
+    def compliance_rate(self):
+        return round((self.accepted_tasks / self.total_tasks) * 100, 2) if self.total_tasks > 0 else 0.0
+
+    @property
+    def performance_score(self):
+        return round((self.attendance_rate * 0.4) + (self.compliance_rate * 0.6), 2)
+
+class DailyCounter(models.Model):
+    """
+    An employee's running totals through the end of one day, kept in sync by core.signals.
+
+    There is a row for every day with attendance or new tasks, so the totals
+    for any date range are the last row on or before its end minus the last
+    row before its start (core.counters.get_window_totals).
+    """
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='daily_counters')
+    date = models.DateField()
+    total_days = models.IntegerField(default=0)
+    present_days = models.IntegerField(default=0)
+    late_days = models.IntegerField(default=0)
+    absent_days = models.IntegerField(default=0)
+    tasks_created = models.IntegerField(default=0)
+    tasks_accepted = models.IntegerField(default=0)  # of the tasks created, those accepted by now
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['employee', 'date'], name='core_dailycounter_employee_date')]
+
+    def __str__(self):
+        return f"Counters for {self.employee_id} on {self.date}"
 
 class UserAccount(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='accounts')
@@ -43,13 +101,19 @@ class UserAccount(models.Model):
     def check_password(self, raw_password):
         return check_password(raw_password, self.password)
 
+    class Meta:
+        # username__iexact compiles to UPPER(...) or LIKE, which no index serves; these lookups compare LOWER(username)
+        indexes = [models.Index(Lower('username'), name='core_account_username_lower')]
+
     @classmethod
     def username_exists(cls, username):
-        return cls.objects.filter(username__iexact=username).exists()
+        return cls.objects.alias(username_lower=Lower('username')).filter(username_lower=username.lower()).exists()
     
     @classmethod
     def get_by_username(cls, username):
-        return cls.objects.filter(username__iexact=username).first()
+        return cls.objects.select_related('role', 'employee').alias(
+            username_lower=Lower('username')
+        ).filter(username_lower=username.lower()).first()
     
     @classmethod
     def create_employee_user(cls, employee_data, username, password, role_id=303):
@@ -165,18 +229,24 @@ class Evaluation(models.Model):
     attendance_rate = models.FloatField(default=0.0)
     overall_performance = models.FloatField(default=0.0)
     
+    class Meta:
+        # Latest evaluation per employee: an index seek instead of sorting their evaluations
+        indexes = [models.Index(fields=['employee', '-evaluation_date'], name='core_evaluation_latest')]
+
     def __str__(self):
         return f"Evaluation {self.evaluation_id}"
     
-    def save(self, *args, **kwargs):
-        # Calculate rates if not already set
-        if (self.compliance_rate == 0.0 or self.attendance_rate == 0.0) and not kwargs.get('update_fields'):
+    def save(self, *args, calculate_metrics=True, **kwargs):
+        # Calculate rates if not already set (callers that computed them pass calculate_metrics=False)
+        if calculate_metrics and (self.compliance_rate == 0.0 or self.attendance_rate == 0.0) and not kwargs.get('update_fields'):
             from .utils import calculate_evaluation_metrics
             metrics = calculate_evaluation_metrics(self.employee, self.evaluation_date)
             self.compliance_rate = metrics['compliance_rate']
             self.attendance_rate = metrics['attendance_rate']
             self.overall_performance = metrics['overall_performance']
-        super().save(*args, **kwargs)
+        # One transaction with the employee's last-evaluation pointer, which core.signals updates on post_save
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
 
 class EvaluationKPI(models.Model):
     eval_kpi_id = models.AutoField(primary_key=True)
@@ -200,6 +270,11 @@ class AttendanceRecord(models.Model):
 
     class Meta:
         unique_together = ['employee', 'date']
+        indexes = [
+            # Days not yet counted in an evaluation, by date; partial, as queries test the flag rather than compare it,
+            # and with status last so they are counted from the index alone
+            models.Index(fields=['employee', 'date', 'status'], condition=Q(is_counted=False), name='core_attendance_uncounted'),
+        ]
 
 class BacklogItem(models.Model):
     STATUS_CHOICES = [
@@ -242,8 +317,48 @@ class BacklogItem(models.Model):
     file_name = models.CharField(max_length=255, null=True, blank=True)
     uploaded_at = models.DateTimeField(null=True, blank=True)
 
+    # last change, for the delta-sync task APIs (queryset .update() calls must set it themselves)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
     def __str__(self):
         return f"Backlog {self.backlog_id} - {self.employee} - {self.status}"
     
     class Meta:
-        ordering = ['priority', 'due_date']
\ No newline at end of file
+        ordering = ['priority', 'due_date']
+        indexes = [
+            # Tasks not yet evaluated, by creation date (compliance rates, evaluations)
+            models.Index(fields=['employee', 'created_date'], condition=Q(is_evaluated=False), name='core_backlog_unevaluated'),
+            # Task lists and counts filtered by status and review status
+            models.Index(fields=['employee', 'status', 'review_status'], name='core_backlog_status'),
+        ]
+
+class BacklogItemTombstone(models.Model):
+    """A deleted backlog item, kept for a while so delta syncs can tell clients to drop it"""
+    backlog_id = models.IntegerField()
+    employee_id = models.IntegerField(db_index=True)  # plain id: the employee may be deleted too
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Deleted backlog {self.backlog_id}"
+
+class EmployeeSearchIndex(models.Model):
+    """
+    Normalized words of an employee's names, email, department, position and usernames,
+    maintained by core.signals. PostgreSQL searches it through a pg_trgm GIN index.
+    """
+    employee = models.OneToOneField(Employee, on_delete=models.CASCADE, primary_key=True, related_name='search_index')
+    document = models.TextField()
+
+    def __str__(self):
+        return f"Search index for {self.employee_id}"
+
+class SearchTrigram(models.Model):
+    """One trigram of an EmployeeSearchIndex document; the search index on databases without pg_trgm"""
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='search_trigrams')
+    gram = models.CharField(max_length=3)
+
+    class Meta:
+        indexes = [models.Index(fields=['gram', 'employee'])]
+
+    def __str__(self):
+        return f"{self.gram!r} of {self.employee_id}"
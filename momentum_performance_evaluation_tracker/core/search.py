@@ -0,0 +1,220 @@
+"""
+Employee directory search.
+
+Every employee has an EmployeeSearchIndex row: the lowercased words of their
+names, email, department, position and usernames. On PostgreSQL it is searched
+with pg_trgm through a GIN index (migration 0015). Elsewhere (SQLite in
+development) the words' trigrams are stored in SearchTrigram, indexed on the
+gram, and candidates are the employees sharing enough trigrams with the query.
+
+Either way a query term matches a word it is a prefix of, or a word it is
+close to (a typo), and results are ranked by how well every term matched.
+"""
+import math
+import operator
+import re
+from functools import reduce
+
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Case, Count, F, FloatField, Q, Value, When
+
+from .models import Employee, EmployeeSearchIndex, SearchTrigram, UserAccount
+from .utils import insert_rows
+
+WORD = re.compile(r'[a-z0-9]+')
+
+# Share of a term's trigrams a word must have for a fuzzy match
+FUZZY_THRESHOLD = 0.5
+# pg_trgm's word_similarity_threshold, set on every PostgreSQL connection (set_pg_trgm_threshold) in place
+# of its 0.6. pg_trgm closes the term with a blank, one trigram more than the open terms above, so it
+# needs a slightly higher bar than FUZZY_THRESHOLD to take the same typos
+PG_TRGM_THRESHOLD = 0.55
+# Candidates fetched per result wanted, before ranking in Python (non-PostgreSQL only)
+CANDIDATE_FACTOR = 4
+
+
+def words(text):
+    return WORD.findall((text or '').lower())
+
+
+def search_document(employee, usernames):
+    """The distinct words an employee can be found by, in a stable order"""
+    parts = [employee.first_name, employee.last_name, employee.email_address, employee.department, employee.position]
+    return ' '.join(dict.fromkeys(word for part in parts + list(usernames) for word in words(part)))
+
+
+def word_trigrams(word, closed=True):
+    """pg_trgm style trigrams; a query term is left open at the end so it also matches longer words"""
+    padded = f'  {word} ' if closed else f'  {word}'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def document_trigrams(document):
+    return set().union(*(word_trigrams(word) for word in document.split()))
+
+
+def uses_pg_trgm(using='default'):
+    return connections[using].vendor == 'postgresql'
+
+
+def set_pg_trgm_threshold(connection):
+    """Make pg_trgm's %> operator take typos as loosely as the trigram fallback does"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, false)", [str(PG_TRGM_THRESHOLD)])
+
+
+def index_employees(employee_ids, using='default', employees=None):
+    """(Re)build the search index rows of these employees; pass employees to save loading them"""
+    employee_ids = list(employee_ids)
+    if not employee_ids:
+        return
+    if employees is None:
+        employees = Employee.objects.using(using).filter(id__in=employee_ids)
+    usernames = {}
+    for employee_id, username in UserAccount.objects.using(using).filter(employee_id__in=employee_ids).values_list('employee_id', 'username'):
+        usernames.setdefault(employee_id, []).append(username)
+    documents = {employee.id: search_document(employee, usernames.get(employee.id, [])) for employee in employees}
+
+    EmployeeSearchIndex.objects.using(using).filter(employee_id__in=employee_ids).delete()
+    if not uses_pg_trgm(using):
+        SearchTrigram.objects.using(using).filter(employee_id__in=employee_ids).delete()
+    write_index(documents, using)
+
+
+def index_new_employee(employee, using='default'):
+    """Index a just-created employee, which has no usernames or index rows yet"""
+    write_index({employee.id: search_document(employee, [])}, using)
+
+
+def write_index(documents, using='default'):
+    EmployeeSearchIndex.objects.using(using).bulk_create(
+        [EmployeeSearchIndex(employee_id=employee_id, document=document) for employee_id, document in documents.items()],
+        batch_size=5000
+    )
+    if not uses_pg_trgm(using):
+        # Dozens of trigrams per employee, so they go in as plain tuples rather than model instances
+        insert_rows(
+            SearchTrigram, ['employee_id', 'gram'],
+            ((employee_id, gram) for employee_id, document in documents.items() for gram in document_trigrams(document)),
+            using
+        )
+
+
+def query_terms(query):
+    return list(dict.fromkeys(words(query)))
+
+
+def query_trigrams(terms):
+    """Trigrams to look candidates up by. '  x' is shared by every word starting with x, so it is only kept for one-letter terms"""
+    grams = set()
+    for term in terms:
+        grams |= word_trigrams(term, closed=False) - ({f'  {term[0]}'} if len(term) > 1 else set())
+    return grams
+
+
+def matching_employee_ids(query, using='default'):
+    """
+    Ids of employees matching every term of query, for filtering with employee__in / id__in:
+    a subquery on PostgreSQL, elsewhere a list of the trigram candidates whose every term
+    passes rank_document, as in search_employees. None if the query has no words.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return None
+    if uses_pg_trgm(using):
+        return EmployeeSearchIndex.objects.using(using).filter(pg_trgm_match(terms, 'document')).values('employee_id')
+    candidates = EmployeeSearchIndex.objects.using(using).filter(
+        employee_id__in=trigram_candidates(terms, using).values('employee_id')
+    ).values_list('employee_id', 'document')
+    return [employee_id for employee_id, document in candidates if rank_document(terms, document)]
+
+
+def word_is(term, field):
+    """The document, a space-separated list of words, has term as one of them"""
+    return (
+        Q(**{field: term}) | Q(**{f'{field}__startswith': f'{term} '})
+        | Q(**{f'{field}__endswith': f' {term}'}) | Q(**{f'{field}__contains': f' {term} '})
+    )
+
+
+def word_starts_with(term, field):
+    """The document has a word term is a prefix of, as in term_score; the GIN trigram index serves both LIKEs"""
+    return Q(**{f'{field}__startswith': term}) | Q(**{f'{field}__contains': f' {term}'})
+
+
+def pg_trgm_match(terms, field):
+    """Every term starts a word of the document, or is close to one (pg_trgm word similarity)"""
+    return reduce(operator.and_, (
+        word_starts_with(term, field) | TrigramWordSimilar(F(field), Value(term))
+        for term in terms
+    ))
+
+
+def pg_trgm_rank(terms, field):
+    """rank_document in SQL: per term, 3 for a whole word, 2 for a prefix, else its word similarity"""
+    return reduce(operator.add, (
+        Case(
+            When(word_is(term, field), then=Value(3.0)),
+            When(word_starts_with(term, field), then=Value(2.0)),
+            default=TrigramWordSimilarity(Value(term), field),
+            output_field=FloatField(),
+        )
+        for term in terms
+    ))
+
+
+def trigram_candidates(terms, using='default'):
+    """Employees sharing at least FUZZY_THRESHOLD of the query's trigrams, with the number shared as hits"""
+    grams = query_trigrams(terms)
+    return SearchTrigram.objects.using(using).filter(gram__in=grams).values('employee_id').annotate(
+        hits=Count('id')
+    ).filter(hits__gte=math.ceil(len(grams) * FUZZY_THRESHOLD))
+
+
+def term_score(term, document_words):
+    """How well one query term matches a document: exact word > prefix > typo; 0 if it doesn't"""
+    if term in document_words:
+        return 3.0
+    if any(word.startswith(term) for word in document_words):
+        return 2.0
+    grams = word_trigrams(term, closed=False)
+    best = max((len(grams & word_trigrams(word)) / len(grams) for word in document_words), default=0.0)
+    return best if best >= FUZZY_THRESHOLD else 0.0
+
+
+def rank_document(terms, document):
+    document_words = document.split()
+    scores = [term_score(term, document_words) for term in terms]
+    return sum(scores) if all(scores) else 0.0
+
+
+def search_employees(employees, query, limit):
+    """Up to limit employees from the employees queryset matching query, best match first"""
+    terms = query_terms(query)
+    if not terms:
+        return list(employees[:limit])
+
+    if uses_pg_trgm(employees.db):
+        return list(employees.filter(
+            pg_trgm_match(terms, 'search_index__document')
+        ).annotate(
+            search_rank=pg_trgm_rank(terms, 'search_index__document')
+        ).order_by('-search_rank', 'last_name', 'first_name', 'id')[:limit])
+
+    # Most shared trigrams first, so the cap keeps the likeliest matches
+    grams = query_trigrams(terms)
+    candidates = employees.filter(search_trigrams__gram__in=grams).annotate(
+        search_hits=Count('search_trigrams')
+    ).filter(
+        search_hits__gte=math.ceil(len(grams) * FUZZY_THRESHOLD)
+    ).select_related('search_index').order_by('-search_hits', 'id')[:limit * CANDIDATE_FACTOR]
+    ranked = []
+    for employee in candidates:
+        document = getattr(getattr(employee, 'search_index', None), 'document', '')
+        score = rank_document(terms, document)
+        if score:
+            ranked.append((-score, employee.last_name, employee.first_name, employee.id, employee))
+    ranked.sort(key=lambda row: row[:4])
+    return [row[-1] for row in ranked[:limit]]
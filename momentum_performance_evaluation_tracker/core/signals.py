@@ -0,0 +1,323 @@
+from datetime import date
+
+from django.db import transaction
+from django.db.models import F
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from dashboard.models import TeamMember
+from .availability import invalidate_availability
+from .counters import apply_daily_counts, as_date, attendance_daily_counts, rebuild_daily_counters, task_daily_counts
+from .backends import forget_principal
+from .search import index_employees, index_new_employee, set_pg_trgm_threshold
+from .models import AttendanceRecord, BacklogItem, Employee, EmployeeMetrics, Evaluation, KPI, Role, UserAccount
+from .team_cache import invalidate_employee_teams, invalidate_employees, invalidate_kpis, invalidate_team
+from .utils import get_attendance_start_date, rebuild_employee_metrics, record_task_deletion, refresh_last_evaluations
+
+# Fields each model contributes to EmployeeMetrics and DailyCounter; remembered on load so a save can apply the difference
+ATTENDANCE_FIELDS = ['employee_id', 'date', 'status', 'is_counted']
+TASK_FIELDS = ['employee_id', 'created_date', 'status', 'review_status', 'is_evaluated']
+# Fields that end up in the employee search index, compared the same way
+EMPLOYEE_SEARCH_FIELDS = ['first_name', 'last_name', 'email_address', 'department', 'position']
+ACCOUNT_SEARCH_FIELDS = ['employee_id', 'username']
+
+
+def attendance_counters(record, today):
+    """EmployeeMetrics counters contributed by one attendance record, as of today"""
+    record_date = record['date']
+    if isinstance(record_date, str):
+        record_date = date.fromisoformat(record_date)
+    if record['is_counted'] or not get_attendance_start_date(today) <= record_date <= today:
+        return {}
+    return {
+        'total_days': 1,
+        'present_days': 1 if record['status'] == 'Present' else 0,
+    }
+
+
+def task_counters(task, today=None):
+    """EmployeeMetrics counters contributed by one backlog item"""
+    counters = {}
+    if not task['is_evaluated']:
+        counters['total_tasks'] = 1
+        counters['accepted_tasks'] = 1 if 'Accepted' in (task['status'], task['review_status']) else 0
+    if task['status'] in ('Not Started', 'In Progress') and task['review_status'] != 'Accepted':
+        counters['open_backlog'] = 1
+    return counters
+
+
+def remember_state(instance, fields):
+    """Keep the loaded values of the metric fields, or None if any were deferred"""
+    deferred = instance.get_deferred_fields()
+    if any(field in deferred for field in fields):
+        instance._metrics_state = None
+    else:
+        instance._metrics_state = {field: getattr(instance, field) for field in fields}
+
+
+def apply_counters(employee_id, counters, rebuild_missing=True):
+    """Add counter deltas to an employee's EmployeeMetrics row with F() expressions"""
+    counters = {name: delta for name, delta in counters.items() if delta}
+    if not counters:
+        return
+
+    updated = EmployeeMetrics.objects.filter(
+        employee_id=employee_id,
+        counted_through=timezone.now().date()
+    ).update(**{name: F(name) + delta for name, delta in counters.items()})
+
+    # No current row yet: build it from the raw tables, which already include this write
+    if not updated and rebuild_missing:
+        rebuild_employee_metrics([employee_id])
+
+
+def forget_metrics(employee_id):
+    """Drop an employee's EmployeeMetrics row so the next read rebuilds it, and recount their daily totals after the commit"""
+    EmployeeMetrics.objects.filter(employee_id=employee_id).delete()
+    transaction.on_commit(lambda: rebuild_daily_counters(Employee.objects.filter(id=employee_id).values_list('id', flat=True)))
+
+
+def remove_daily_counts(state, get_daily_counts):
+    # Never create rows here: the employee itself may be in the middle of a cascade delete
+    day, counts = get_daily_counts(state)
+    apply_daily_counts([state['employee_id']], day, {name: -delta for name, delta in counts.items()}, create_missing=False)
+
+
+def sync_daily_counters(previous, current, get_daily_counts):
+    """Move a record's contribution to the running daily totals from its old day (and employee) to its new one"""
+    changes = {}
+    for state, sign in ((previous, -1), (current, 1)):
+        if state:
+            day, counts = get_daily_counts(state)
+            change = changes.setdefault((state['employee_id'], day), {})
+            for name, delta in counts.items():
+                change[name] = change.get(name, 0) + sign * delta
+    for (employee_id, day), counts in changes.items():
+        apply_daily_counts([employee_id], day, counts)
+
+
+def sync_metrics(instance, fields, get_counters, get_daily_counts, created):
+    previous = None if created else instance._metrics_state
+    current = {field: getattr(instance, field) for field in fields}
+
+    if not created and previous is None:
+        # Loaded with deferred fields, so the old contribution is unknown
+        rebuild_employee_metrics([instance.employee_id])
+        rebuild_daily_counters([instance.employee_id])
+    else:
+        sync_daily_counters(previous, current, get_daily_counts)
+        today = timezone.now().date()
+        old_counters = get_counters(previous, today) if previous else {}
+        new_counters = get_counters(current, today)
+
+        if previous and previous['employee_id'] != current['employee_id']:
+            apply_counters(previous['employee_id'], {name: -delta for name, delta in old_counters.items()})
+            apply_counters(current['employee_id'], new_counters)
+        else:
+            names = set(old_counters) | set(new_counters)
+            apply_counters(current['employee_id'], {
+                name: new_counters.get(name, 0) - old_counters.get(name, 0) for name in names
+            })
+
+    instance._metrics_state = current
+
+
+@receiver(post_init, sender=AttendanceRecord)
+def remember_attendance_state(sender, instance, **kwargs):
+    remember_state(instance, ATTENDANCE_FIELDS)
+
+
+@receiver(post_init, sender=BacklogItem)
+def remember_task_state(sender, instance, **kwargs):
+    remember_state(instance, TASK_FIELDS)
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def update_metrics_for_attendance(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    sync_metrics(instance, ATTENDANCE_FIELDS, attendance_counters, attendance_daily_counts, created)
+
+
+@receiver(post_save, sender=BacklogItem)
+def update_metrics_for_task(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    sync_metrics(instance, TASK_FIELDS, task_counters, task_daily_counts, created)
+
+
+@receiver(post_delete, sender=AttendanceRecord)
+def remove_attendance_from_metrics(sender, instance, **kwargs):
+    state = instance._metrics_state
+    if not state:
+        forget_metrics(instance.employee_id)
+        return
+    counters = attendance_counters(state, timezone.now().date())
+    # Never rebuild here: the employee itself may be in the middle of a cascade delete
+    apply_counters(state['employee_id'], {name: -delta for name, delta in counters.items()}, rebuild_missing=False)
+    remove_daily_counts(state, attendance_daily_counts)
+
+
+@receiver(post_delete, sender=BacklogItem)
+def remove_task_from_metrics(sender, instance, **kwargs):
+    state = instance._metrics_state
+    if not state:
+        forget_metrics(instance.employee_id)
+        return
+    counters = task_counters(state)
+    apply_counters(state['employee_id'], {name: -delta for name, delta in counters.items()}, rebuild_missing=False)
+    remove_daily_counts(state, task_daily_counts)
+
+
+@receiver(post_delete, sender=BacklogItem)
+def remember_task_deletion(sender, instance, **kwargs):
+    record_task_deletion(instance)
+
+
+@receiver(post_init, sender=Evaluation)
+def remember_evaluation_employee(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred employee_id is not fetched for every loaded evaluation
+    instance._loaded_employee_id = instance.__dict__.get('employee_id')
+
+
+@receiver(post_save, sender=Evaluation)
+@receiver(post_delete, sender=Evaluation)
+def update_last_evaluation(sender, instance, created=False, raw=False, **kwargs):
+    """Re-point the evaluation's employee (and its previous one, if it moved) at their latest evaluation"""
+    if raw:
+        return
+    employee_ids = {instance.employee_id, instance._loaded_employee_id} - {None}
+    refresh_last_evaluations(employee_ids)
+    instance._loaded_employee_id = instance.employee_id
+
+    # An employee object the caller still holds would otherwise keep, and could save back, the old pointer
+    if Evaluation.employee.is_cached(instance):
+        employee = instance.employee
+        evaluation_date = as_date(instance.evaluation_date)
+        if created and (employee.last_evaluation_date is None or evaluation_date >= employee.last_evaluation_date):
+            # Ids only grow, so a new evaluation dated on or after the old pointer is the latest one
+            employee.last_evaluation, employee.last_evaluation_date = instance, evaluation_date
+        else:
+            employee.refresh_from_db(fields=['last_evaluation', 'last_evaluation_date'])
+
+
+@receiver(post_save, sender=AttendanceRecord)
+@receiver(post_delete, sender=AttendanceRecord)
+@receiver(post_save, sender=BacklogItem)
+@receiver(post_delete, sender=BacklogItem)
+@receiver(post_save, sender=Evaluation)
+@receiver(post_delete, sender=Evaluation)
+def invalidate_team_cache_for_employee_data(sender, instance, **kwargs):
+    invalidate_employee_teams([instance.employee_id])
+
+
+@receiver(post_save, sender=BacklogItem)
+@receiver(post_delete, sender=BacklogItem)
+def invalidate_employee_task_version(sender, instance, **kwargs):
+    invalidate_employees([instance.employee_id])
+
+
+@receiver(post_save, sender=KPI)
+@receiver(post_delete, sender=KPI)
+def invalidate_kpi_version(sender, instance, **kwargs):
+    invalidate_kpis()
+
+
+@receiver(post_save, sender=Employee)
+def invalidate_team_cache_for_employee(sender, instance, **kwargs):
+    invalidate_employee_teams([instance.pk])
+
+
+@receiver(post_save, sender=TeamMember)
+@receiver(post_delete, sender=TeamMember)
+def invalidate_team_cache_for_membership(sender, instance, **kwargs):
+    invalidate_team(instance.manager_id)
+
+
+@receiver(post_save, sender=UserAccount)
+@receiver(post_delete, sender=UserAccount)
+def forget_cached_principal(sender, instance, **kwargs):
+    forget_principal(instance.pk)
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def forget_cached_principals(sender, instance, **kwargs):
+    # Rare admin edits; dropping every cached principal is simpler than finding the affected ones
+    forget_principal()
+
+
+def remember_search_state(instance, fields):
+    deferred = instance.get_deferred_fields()
+    instance._search_state = None if deferred & set(fields) else {field: getattr(instance, field) for field in fields}
+
+
+def search_fields_changed(instance, fields, created):
+    state = getattr(instance, '_search_state', None)
+    changed = created or state is None or any(state[field] != getattr(instance, field) for field in fields)
+    remember_search_state(instance, fields)
+    return changed, state
+
+
+@receiver(post_init, sender=Employee)
+def remember_employee_search_state(sender, instance, **kwargs):
+    remember_search_state(instance, EMPLOYEE_SEARCH_FIELDS)
+
+
+@receiver(post_init, sender=UserAccount)
+def remember_account_search_state(sender, instance, **kwargs):
+    remember_search_state(instance, ACCOUNT_SEARCH_FIELDS)
+
+
+@receiver(post_save, sender=Employee)
+def update_search_index_for_employee(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    changed, state = search_fields_changed(instance, EMPLOYEE_SEARCH_FIELDS, created)
+    if created:
+        index_new_employee(instance)
+    elif changed:
+        index_employees([instance.pk], employees=[instance])
+    if changed and (created or state is None or state['email_address'] != instance.email_address):
+        invalidate_availability()
+
+
+@receiver(post_save, sender=UserAccount)
+def update_search_index_for_account(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    # Logins and password changes save the account too; only a new username or owner matters here
+    changed, state = search_fields_changed(instance, ACCOUNT_SEARCH_FIELDS, created)
+    if not changed:
+        return
+    if created or state is None or state['username'] != instance.username:
+        invalidate_availability()
+    if state and state['employee_id'] != instance.employee_id:
+        index_employees([state['employee_id'], instance.employee_id])
+    elif UserAccount.employee.is_cached(instance):
+        index_employees([instance.employee_id], employees=[instance.employee])
+    else:
+        index_employees([instance.employee_id])
+
+
+@receiver(post_delete, sender=UserAccount)
+def remove_account_from_search_index(sender, instance, **kwargs):
+    # After commit: in a cascade from Employee the employee row is about to go too
+    employee_id = instance.employee_id
+    transaction.on_commit(lambda: index_employees([employee_id]))
+    invalidate_availability()
+
+
+@receiver(post_delete, sender=Employee)
+def release_employee_email(sender, instance, **kwargs):
+    invalidate_availability()
+
+
+@receiver(connection_created)
+def configure_search_connection(sender, connection, **kwargs):
+    if connection.vendor == 'postgresql':
+        set_pg_trgm_threshold(connection)
@@ -0,0 +1,271 @@
+"""
+Periodic performance snapshots (dashboard.PerformanceSnapshot).
+
+A snapshot holds one employee's attendance and task counts for one calendar
+day, week or month, with the rates derived from them, so trend views and
+exports read a row per period instead of recounting attendance and tasks.
+
+build_snapshots splits the employees into shards (id ranges or departments),
+which the build_snapshots command can hand to a process pool. Each shard walks
+its employees in chunks: two grouped queries per chunk count the raw rows per
+employee and period, and the rows are upserted, so memory is bounded by the
+chunk rather than by the history.
+
+get_performance_trend reads them back as a time series for any set of
+employees, merged down to a point budget.
+"""
+import calendar
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from itertools import repeat
+
+from django.db import connections
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import Trunc
+
+from dashboard.models import PerformanceSnapshot
+from .export import chunks
+from .models import AttendanceRecord, BacklogItem, Employee
+
+GRANULARITIES = [value for value, label in PerformanceSnapshot.GRANULARITY_CHOICES]
+SNAPSHOT_CHUNK_SIZE = 200  # employees per round of queries and upserts
+SHARD_SIZE = 5000  # employees per shard when sharding by id
+
+SNAPSHOT_COUNTERS = ['present_days', 'late_days', 'total_days', 'accepted_tasks', 'total_tasks']
+
+
+def get_period_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def get_period_end(start, granularity):
+    if granularity == 'week':
+        return start + timedelta(days=6)
+    if granularity == 'month':
+        return start.replace(day=calendar.monthrange(start.year, start.month)[1])
+    return start
+
+
+def get_period_label(start, granularity):
+    if granularity == 'week':
+        year, week, _ = start.isocalendar()
+        return f"{year}-W{week:02d}"
+    if granularity == 'month':
+        return start.strftime('%Y-%m')
+    return start.isoformat()
+
+
+def get_period_starts(first_day, last_day, granularity):
+    """Starts of every period overlapping [first_day, last_day], oldest first"""
+    starts = []
+    start = get_period_start(first_day, granularity)
+    while start <= last_day:
+        starts.append(start)
+        start = get_period_end(start, granularity) + timedelta(days=1)
+    return starts
+
+
+def count_periods(first_day, last_day, granularity):
+    """Number of periods overlapping [first_day, last_day], without listing them"""
+    if last_day < first_day:
+        return 0
+    if granularity == 'week':
+        return (get_period_start(last_day, 'week') - get_period_start(first_day, 'week')).days // 7 + 1
+    if granularity == 'month':
+        return (last_day.year - first_day.year) * 12 + last_day.month - first_day.month + 1
+    return (last_day - first_day).days + 1
+
+
+def get_shards(shard_by='id', shard_size=SHARD_SIZE):
+    """
+    Small picklable descriptions of disjoint employee sets covering everyone:
+    ('id', first_id, last_id) ranges of up to shard_size employees, or ('department', name)
+    """
+    if shard_by == 'department':
+        departments = Employee.objects.order_by('department').values_list('department', flat=True).distinct()
+        return [('department', department) for department in departments]
+    employee_ids = Employee.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=shard_size)
+    return [('id', chunk[0], chunk[-1]) for chunk in chunks(employee_ids, shard_size)]
+
+
+def get_shard_employees(shard):
+    if shard[0] == 'department':
+        return Employee.objects.filter(department=shard[1])
+    return Employee.objects.filter(id__range=shard[1:])
+
+
+def build_snapshot(employee_id, start, granularity, counts):
+    attendance_rate = round(counts['present_days'] / counts['total_days'] * 100, 2) if counts['total_days'] else 0.0
+    compliance_rate = round(counts['accepted_tasks'] / counts['total_tasks'] * 100, 2) if counts['total_tasks'] else 0.0
+    return PerformanceSnapshot(
+        employee_id=employee_id,
+        period=get_period_label(start, granularity),
+        granularity=granularity,
+        period_start=start,
+        period_end=get_period_end(start, granularity),
+        attendance_rate=attendance_rate,
+        compliance_rate=compliance_rate,
+        # Same weights as the dashboard and evaluations: 40% attendance, 60% compliance
+        summary_score=round(attendance_rate * 0.4 + compliance_rate * 0.6, 2),
+        **counts
+    )
+
+
+def compute_snapshots(employee_ids, starts, granularity):
+    """Snapshots of these employees for every period in starts, counted with one grouped query per table"""
+    first_day, last_day = starts[0], get_period_end(starts[-1], granularity)
+    counts = {
+        (employee_id, start): dict.fromkeys(SNAPSHOT_COUNTERS, 0)
+        for employee_id in employee_ids
+        for start in starts
+    }
+
+    attendance_rows = AttendanceRecord.objects.filter(
+        employee_id__in=employee_ids,
+        date__range=(first_day, last_day)
+    ).annotate(
+        bucket=Trunc('date', granularity, output_field=DateField())
+    ).values('employee_id', 'bucket').annotate(
+        total_days=Count('attendance_id'),
+        present_days=Count('attendance_id', filter=Q(status='Present')),
+        late_days=Count('attendance_id', filter=Q(status='Late'))
+    ).order_by()
+    for row in attendance_rows.iterator(chunk_size=2000):
+        period = counts[(row['employee_id'], row['bucket'])]
+        period.update(total_days=row['total_days'], present_days=row['present_days'], late_days=row['late_days'])
+
+    task_rows = BacklogItem.objects.filter(
+        employee_id__in=employee_ids,
+        created_date__range=(first_day, last_day)
+    ).annotate(
+        bucket=Trunc('created_date', granularity, output_field=DateField())
+    ).values('employee_id', 'bucket').annotate(
+        total_tasks=Count('backlog_id'),
+        accepted_tasks=Count('backlog_id', filter=Q(status='Accepted') | Q(review_status='Accepted'))
+    ).order_by()
+    for row in task_rows.iterator(chunk_size=2000):
+        period = counts[(row['employee_id'], row['bucket'])]
+        period.update(total_tasks=row['total_tasks'], accepted_tasks=row['accepted_tasks'])
+
+    return [
+        build_snapshot(employee_id, start, granularity, period_counts)
+        for (employee_id, start), period_counts in counts.items()
+    ]
+
+
+def write_snapshots(snapshots):
+    """Insert the snapshots, replacing any already stored for the same employee and period"""
+    PerformanceSnapshot.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=['employee', 'granularity', 'period_start'],
+        update_fields=['period', 'period_end', 'attendance_rate', 'compliance_rate', 'summary_score', 'computed_at'] + SNAPSHOT_COUNTERS,
+        batch_size=1000
+    )
+
+
+def build_shard_snapshots(shard, starts, granularity, chunk_size=SNAPSHOT_CHUNK_SIZE):
+    """Compute and store the snapshots of one shard; returns how many were written"""
+    employee_ids = get_shard_employees(shard).order_by('id').values_list('id', flat=True)
+    written = 0
+    for chunk in chunks(employee_ids.iterator(chunk_size=chunk_size), chunk_size):
+        snapshots = compute_snapshots(chunk, starts, granularity)
+        write_snapshots(snapshots)
+        written += len(snapshots)
+    return written
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+def build_snapshots(starts, granularity, shard_by='id', workers=1, chunk_size=SNAPSHOT_CHUNK_SIZE, shard_size=SHARD_SIZE):
+    """
+    Snapshots of every employee for the periods in starts. Yields (shard, written)
+    as shards finish; with workers > 1 the shards run in a process pool.
+    """
+    shards = get_shards(shard_by, shard_size)
+    if workers <= 1:
+        for shard in shards:
+            yield shard, build_shard_snapshots(shard, starts, granularity, chunk_size)
+        return
+
+    # Forked workers must open their own connections rather than share the parent's sockets
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        results = pool.map(build_shard_snapshots, shards, repeat(starts), repeat(granularity), repeat(chunk_size))
+        yield from zip(shards, results)
+
+
+def choose_granularity(start, end, points, available=GRANULARITIES):
+    """The finest available granularity with no more periods in [start, end] than points, else the coarsest available"""
+    available = [granularity for granularity in GRANULARITIES if granularity in available]
+    for granularity in available:
+        if count_periods(start, end, granularity) <= points:
+            return granularity
+    return available[-1] if available else GRANULARITIES[-1]
+
+
+def get_trend_point(bucket_start, bucket_end, counts):
+    attendance_rate = round(counts['present_days'] / counts['total_days'] * 100, 2) if counts['total_days'] else None
+    compliance_rate = round(counts['accepted_tasks'] / counts['total_tasks'] * 100, 2) if counts['total_tasks'] else None
+    overall_score = None
+    if attendance_rate is not None or compliance_rate is not None:
+        overall_score = round((attendance_rate or 0.0) * 0.4 + (compliance_rate or 0.0) * 0.6, 2)
+    return {
+        'start': bucket_start,
+        'end': bucket_end,
+        'attendance_rate': attendance_rate,
+        'compliance_rate': compliance_rate,
+        'overall_score': overall_score,
+        **counts
+    }
+
+
+def get_performance_trend(employee_ids, start, end, points, granularity=None):
+    """
+    Attendance, compliance and overall score of these employees (a list or an id
+    subquery) over [start, end], as at most `points` points read from snapshots.
+
+    Counts are summed over the employees and over runs of consecutive periods
+    when the range has more periods than points, and the rates are derived from
+    the sums, so merged points stay weighted by days and tasks. Without a
+    granularity, the finest one with snapshots that fits the budget is used.
+    Rates are None for points with no attendance or tasks at all.
+    """
+    if granularity is None:
+        available = PerformanceSnapshot.objects.filter(
+            period_start__range=(get_period_start(start, 'month'), end)
+        ).values_list('granularity', flat=True).distinct()
+        granularity = choose_granularity(start, end, points, set(available))
+
+    starts = get_period_starts(start, end, granularity)
+    periods_per_point = -(-len(starts) // points)  # ceiling division
+
+    rows = PerformanceSnapshot.objects.filter(
+        employee_id__in=employee_ids,
+        granularity=granularity,
+        period_start__range=(starts[0], starts[-1])
+    ).values('period_start').annotate(
+        **{counter: Sum(counter) for counter in SNAPSHOT_COUNTERS}
+    ).order_by('period_start')
+    counts_by_start = {row.pop('period_start'): row for row in rows}
+
+    trend = []
+    for bucket in chunks(starts, periods_per_point):
+        counts = dict.fromkeys(SNAPSHOT_COUNTERS, 0)
+        for period_start in bucket:
+            for counter, value in counts_by_start.get(period_start, {}).items():
+                counts[counter] += value
+        trend.append(get_trend_point(bucket[0], get_period_end(bucket[-1], granularity), counts))
+
+    return {
+        'granularity': granularity,
+        'periods_per_point': periods_per_point,
+        'points': trend
+    }
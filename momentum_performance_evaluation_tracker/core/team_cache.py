@@ -0,0 +1,174 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard.models import TeamMember
+from .utils import get_attendance_start_date, get_team_kpis, get_team_performance_data
+
+# Manager dashboard data is cached under a per-team version number. Any write that can change
+# a team's numbers bumps that team's version, so old entries are simply never read again.
+# This only holds across workers when they share the cache, which core.checks warns about.
+TEAM_CACHE_TIMEOUT = getattr(settings, 'TEAM_CACHE_TIMEOUT', 300)
+# Hit/miss counting writes to the shared cache on every read, so it is off unless asked for
+TEAM_CACHE_STATS = getattr(settings, 'TEAM_CACHE_STATS', False)
+
+VERSION_KEY = 'team_cache:version:{manager_id}'
+# The same scheme versions an employee's own task list and the KPI list, for the ETags of their APIs
+EMPLOYEE_VERSION_KEY = 'employee_cache:version:{employee_id}'
+KPI_VERSION_KEY = 'kpi_cache:version'
+DATA_KEY = 'team_cache:{name}:{manager_id}:{version}:{attendance_start_date}'
+HITS_KEY = 'team_cache:hits'
+MISSES_KEY = 'team_cache:misses'
+
+
+def new_version():
+    # Time based so a version is never reused, whether after a bump or after its key was evicted
+    return time.time_ns()
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, new_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_versions(keys):
+    # A plain set, not incr: incr is a read then a write on most backends, so two concurrent
+    # bumps could land on one version, and it would put back the default timeout on the key
+    cache.set_many({key: new_version() for key in set(keys)}, timeout=None)
+
+
+def get_team_version(manager_id):
+    """Current cache version for a manager's team"""
+    return get_version(VERSION_KEY.format(manager_id=manager_id))
+
+
+def bump_team_versions(manager_ids):
+    """Invalidate the cached dashboard data of the given managers"""
+    bump_versions(VERSION_KEY.format(manager_id=manager_id) for manager_id in manager_ids)
+
+
+def invalidate_employee_teams(employee_ids):
+    """Bump the version of every team the employees belong to, once the current transaction commits"""
+    employee_ids = list(employee_ids)
+
+    def bump():
+        manager_ids = TeamMember.objects.filter(
+            employee_id__in=employee_ids
+        ).values_list('manager_id', flat=True)
+        bump_team_versions(manager_ids)
+
+    transaction.on_commit(bump)
+
+
+def invalidate_team(manager_id):
+    """Bump a manager's team version once the current transaction commits"""
+    transaction.on_commit(lambda: bump_team_versions([manager_id]))
+
+
+def get_employee_version(employee_id):
+    """Current version of an employee's own task list"""
+    return get_version(EMPLOYEE_VERSION_KEY.format(employee_id=employee_id))
+
+
+def invalidate_employees(employee_ids):
+    """Bump the task list version of the given employees once the current transaction commits"""
+    keys = [EMPLOYEE_VERSION_KEY.format(employee_id=employee_id) for employee_id in employee_ids]
+    transaction.on_commit(lambda: bump_versions(keys))
+
+
+def get_kpi_version():
+    """Current version of the KPI list"""
+    return get_version(KPI_VERSION_KEY)
+
+
+def invalidate_kpis():
+    transaction.on_commit(lambda: bump_versions([KPI_VERSION_KEY]))
+
+
+def count(key, amount=1):
+    # Diagnostic only: on backends without an atomic incr (the database cache) concurrent counts can be lost
+    if not TEAM_CACHE_STATS or not amount:
+        return
+    if not cache.add(key, amount, timeout=None):
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            pass
+        else:
+            # BaseCache.incr re-sets the key with the default timeout; keep the counters from expiring
+            cache.touch(key, timeout=None)
+
+
+def get_or_compute(names, manager_user):
+    """
+    The named team data for a manager, from the cache where present and computed otherwise.
+
+    One version read and one get_many serve any number of names.
+    """
+    version = get_team_version(manager_user.pk)
+    attendance_start_date = get_attendance_start_date(timezone.now().date())
+    keys = {
+        name: DATA_KEY.format(
+            name=name, manager_id=manager_user.pk, version=version, attendance_start_date=attendance_start_date
+        )
+        for name in names
+    }
+    cached = cache.get_many(keys.values())
+
+    data = {}
+    missing = {}
+    for name, key in keys.items():
+        if key in cached:
+            data[name] = cached[key]
+        else:
+            data[name] = missing[key] = COMPUTE[name](manager_user)
+    if missing:
+        cache.set_many(missing, timeout=TEAM_CACHE_TIMEOUT)
+
+    count(HITS_KEY, len(keys) - len(missing))
+    count(MISSES_KEY, len(missing))
+    return data
+
+
+COMPUTE = {
+    'performance': get_team_performance_data,
+    'kpis': get_team_kpis,
+}
+
+
+def get_cached_team_performance_data(manager_user):
+    """get_team_performance_data served from the versioned team cache"""
+    return get_or_compute(['performance'], manager_user)['performance']
+
+
+def get_cached_team_kpis(manager_user):
+    """get_team_kpis served from the versioned team cache"""
+    return get_or_compute(['kpis'], manager_user)['kpis']
+
+
+def get_cached_team_dashboard(manager_user):
+    """(get_team_performance_data, get_team_kpis) for the manager dashboard, read from the cache together"""
+    data = get_or_compute(['performance', 'kpis'], manager_user)
+    return data['performance'], data['kpis']
+
+
+def get_team_cache_stats():
+    """Hit/miss counters for the team cache, kept while TEAM_CACHE_STATS is on"""
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round((hits / total) * 100, 2) if total > 0 else 0.0
+    }
+
+
+def reset_team_cache_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,33 @@
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from .middleware import current_timing
+
+
+class TimedTemplate(Template):
+    """A Django template whose render time is added to the current request's Server-Timing"""
+
+    def render(self, context=None, request=None):
+        timing = current_timing.get()
+        if timing is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timing.template_time += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates handing out TimedTemplate; outside a timed request it renders exactly like the stock backend"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
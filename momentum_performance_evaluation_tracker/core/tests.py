@@ -1,3 +1,1182 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from dashboard.models import PerformanceSnapshot, TeamMember
+from .backends import forget_principal
+from .checks import check_shared_cache
+from .counters import get_totals_through, get_window_totals, rebuild_daily_counters
+from .export import EVALUATION_COLUMNS
+from .management.commands.load_benchmark import TRAFFIC_MIX, percentile, split_users
+from .management.commands.query_advisor import REQUESTS, postgresql_scans, sqlite_scans
+from .pagination import decode_cursor, encode_cursor
+from .search import search_employees
+from .snapshots import count_periods, get_period_end, get_period_label, get_period_starts
+from .team_cache import get_team_version
+from .models import AttendanceRecord, BacklogItem, DailyCounter, Employee, EmployeeMetrics, EmployeeSearchIndex, Evaluation, EvaluationKPI, KPI, Role, UserAccount
+from .utils import (
+    calculate_attendance_rate_for_period, calculate_compliance_rate, calculate_compliance_rate_for_evaluation,
+    count_employee_metrics, create_evaluation, create_evaluations_batch, get_metrics_for_employees, rebuild_employee_metrics
+)
+
+PASSWORD = 'password123'
+
+
+def core_url(name):
+    # core.urls is mounted at both / and /core/; the front end calls /core/, where admin/ isn't shadowed by Django admin
+    return '/core' + reverse(f'core:{name}')
+
+
+def create_roles():
+    for role_id, role_name in [(301, 'Admin'), (302, 'Supervisor'), (303, 'Employee')]:
+        Role.objects.get_or_create(role_id=role_id, defaults={'role_name': role_name})
+
+
+def create_team(team_size, prefix='team', days=20, tasks_per_employee=6):
+    """Seed a supervisor with team_size employees, each with attendance, tasks and one past evaluation"""
+    create_roles()
+    today = timezone.now().date()
+
+    manager = UserAccount.create_supervisor_user(
+        {'first_name': 'Manager', 'last_name': prefix, 'email_address': f'{prefix}-manager@example.com'},
+        f'{prefix}-manager', PASSWORD
+    )
+    manager.is_first_login = False
+    manager.save()
+
+    employees = []
+    for i in range(team_size):
+        user = UserAccount.create_employee_user(
+            {
+                'first_name': f'Employee{i}',
+                'last_name': prefix,
+                'email_address': f'{prefix}-employee{i}@example.com',
+                'department': 'IT' if i % 2 else 'Operations',
+                'position': 'Analyst',
+            },
+            f'{prefix}-employee{i}', PASSWORD
+        )
+        employees.append(user.employee)
+
+    TeamMember.objects.bulk_create([TeamMember(manager=manager, employee=employee) for employee in employees])
+
+    statuses = ['Present', 'Late', 'Absent']
+    AttendanceRecord.objects.bulk_create([
+        AttendanceRecord(employee=employee, date=today - timedelta(days=day), status=statuses[day % 3])
+        for employee in employees
+        for day in range(1, days + 1)
+    ])
+
+    # (status, review_status) pairs covering every state the dashboard shows
+    task_states = [
+        ('Not Started', 'Pending Review'),
+        ('In Progress', 'Pending Review'),
+        ('Completed', 'Pending Review'),
+        ('Accepted', 'Accepted'),
+        ('In Progress', 'Rejected'),
+        ('Completed', 'Pending Review'),
+    ]
+    tasks = []
+    for employee in employees:
+        for i in range(tasks_per_employee):
+            status, review_status = task_states[i % len(task_states)]
+            tasks.append(BacklogItem(
+                employee=employee,
+                task_description=f'Task {i}',
+                due_date=today + timedelta(days=i),
+                status=status,
+                review_status=review_status,
+                reviewed_by=manager if review_status != 'Pending Review' else None,
+                completed_date=today if status in ('Completed', 'Accepted') else None,
+            ))
+    BacklogItem.objects.bulk_create(tasks)
+
+    kpi, _ = KPI.objects.get_or_create(name='Quality', defaults={
+        'kpi_type': 'score', 'description': 'Quality of work', 'target_value': 100
+    })
+    for employee in employees:
+        evaluation = Evaluation(
+            employee=employee,
+            created_by=manager,
+            evaluation_date=today - timedelta(days=days + 1),
+            period='Previous',
+            compliance_rate=50.0,
+            attendance_rate=50.0,
+            overall_performance=50.0
+        )
+        evaluation.save(calculate_metrics=False)
+        EvaluationKPI.objects.create(evaluation=evaluation, kpi=kpi, value=80, target=100)
+
+    rebuild_employee_metrics([employee.id for employee in employees])
+    rebuild_daily_counters([employee.id for employee in employees])
+    return manager, employees
+
+
+# Most budgets count the application's own SQL against an in-memory cache; the DatabaseCache
+# budget classes count the cache traffic the shipped default adds on top
+IN_MEMORY_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'momentum-tests'}}
+DATABASE_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'momentum_cache'}}
+
+
+class QueryBudgetMixin:
+    """
+    Helpers for asserting an upper bound on the SQL a request runs.
+
+    Subclasses set TEAM_SIZE; the same budgets are asserted for every size,
+    so a query inside a per-employee loop fails the larger team.
+    """
+
+    TEAM_SIZE = 3
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, user):
+        self.client.force_login(user, backend='core.backends.CustomUserBackend')
+
+    def assertQueryBudget(self, budget, request, *args, **kwargs):
+        """Run request(*args, **kwargs) and fail with the executed SQL if it used more than budget queries"""
+        with CaptureQueriesContext(connection) as queries:
+            response = request(*args, **kwargs)
+        if len(queries) > budget:
+            listing = '\n'.join(
+                f"{number}. {query['sql']}" for number, query in enumerate(queries.captured_queries, start=1)
+            )
+            self.fail(f"{len(queries)} queries exceed the budget of {budget} (team size {self.TEAM_SIZE}):\n{listing}")
+        return response
+
+
+class CoreQueryBudgetTests(QueryBudgetMixin):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.employees = create_team(cls.TEAM_SIZE)
+        cls.admin = UserAccount.create_admin_user(
+            {'first_name': 'Admin', 'last_name': 'User', 'email_address': 'admin@example.com'},
+            'admin', PASSWORD
+        )
+
+    def new_user_data(self, username):
+        return {
+            'first_name': 'New',
+            'last_name': 'User',
+            'email': f'{username}@example.com',
+            'department': 'IT',
+            'position': 'Analyst',
+            'username': username,
+            'password': PASSWORD,
+            'confirm_password': PASSWORD,
+        }
+
+    def test_home(self):
+        response = self.assertQueryBudget(0, self.client.get, core_url('home'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_login(self):
+        response = self.assertQueryBudget(9, self.client.post, core_url('login'), {
+            'username': 'team-manager', 'password': PASSWORD
+        })
+        self.assertEqual(response.status_code, 302)
+
+    def test_registration(self):
+        # 7 of these keep the search index current (core.search)
+        response = self.assertQueryBudget(14, self.client.post, core_url('registration'), self.new_user_data('newuser'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(UserAccount.objects.filter(username='newuser').exists())
+
+    def test_check_email(self):
+        # The first check loads the taken sets; after that a miss needs no query and a hit one
+        self.client.get(core_url('check_email'), {'email': 'warm-up@example.com'})
+        response = self.assertQueryBudget(1, self.client.get, core_url('check_email'), {'email': 'Team-Employee0@example.com'})
+        self.assertTrue(response.json()['exists'])
+        response = self.assertQueryBudget(0, self.client.get, core_url('check_email'), {'email': 'nobody@example.com'})
+        self.assertFalse(response.json()['exists'])
+
+    def test_check_username(self):
+        self.client.get(core_url('check_username'), {'username': 'warm-up'})
+        response = self.assertQueryBudget(1, self.client.get, core_url('check_username'), {'username': 'TEAM-employee0'})
+        self.assertTrue(response.json()['exists'])
+        response = self.assertQueryBudget(0, self.client.get, core_url('check_username'), {'username': 'nobody'})
+        self.assertFalse(response.json()['exists'])
+
+    def test_logout(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(2, self.client.get, core_url('logout'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_handle_password_reset(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(7, self.client.post, core_url('handle_password_reset'), {
+            'current_password': PASSWORD, 'new_password': 'newpassword123', 'confirm_password': 'newpassword123'
+        })
+        self.assertEqual(response.status_code, 302)
+
+    def test_admin_create_supervisor(self):
+        self.login(self.admin)
+        response = self.assertQueryBudget(16, self.client.post, core_url('admin_create_supervisor'), self.new_user_data('newsupervisor'))
+        self.assertTrue(response.json()['success'])
+
+    def test_admin_create_admin(self):
+        self.login(self.admin)
+        response = self.assertQueryBudget(16, self.client.post, core_url('admin_create_admin'), self.new_user_data('newadmin'))
+        self.assertTrue(response.json()['success'])
+
+    def test_get_admins(self):
+        self.login(self.admin)
+        response = self.assertQueryBudget(3, self.client.get, core_url('user_directory_api'), {'role': 'admin'})
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_get_supervisors(self):
+        self.login(self.admin)
+        response = self.assertQueryBudget(3, self.client.get, core_url('user_directory_api'), {'role': 'supervisor'})
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_get_employees(self):
+        self.login(self.admin)
+        response = self.assertQueryBudget(3, self.client.get, core_url('user_directory_api'), {'role': 'employee', 'per_page': 100})
+        self.assertEqual(response.json()['count'], self.TEAM_SIZE)
+
+    def test_get_all_users(self):
+        self.login(self.admin)
+        response = self.assertQueryBudget(4, self.client.get, core_url('user_directory_api'), {'search': 'team'})
+        self.assertTrue(response.json()['success'])
+
+    def test_user_directory_stream(self):
+        self.login(self.admin)
+
+        def stream():
+            response = self.client.get(core_url('user_directory_api'), {'format': 'ndjson'})
+            return b''.join(response.streaming_content)
+
+        body = self.assertQueryBudget(3, stream)
+        self.assertEqual(len(body.splitlines()), self.TEAM_SIZE + 2)
+
+
+@override_settings(CACHES=IN_MEMORY_CACHES)
+class SmallTeamCoreQueryBudgetTests(CoreQueryBudgetTests, TestCase):
+    TEAM_SIZE = 3
+
+
+@override_settings(CACHES=IN_MEMORY_CACHES)
+class LargeTeamCoreQueryBudgetTests(CoreQueryBudgetTests, TestCase):
+    TEAM_SIZE = 15
+
+
+@override_settings(PRINCIPAL_CACHE_TIMEOUT=60, CACHES=IN_MEMORY_CACHES)
+class PrincipalCacheTests(TestCase):
+    """With the per-process principal cache on, changes saved in this process show on the next request"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.employees = create_team(1, days=1, tasks_per_employee=0)
+        cls.account = cls.employees[0].accounts.get()
+
+    def setUp(self):
+        forget_principal()
+        self.addCleanup(forget_principal)
+        self.client.force_login(self.account, backend='core.backends.CustomUserBackend')
+
+    def team_kpis_status(self):
+        return self.client.get(reverse('dashboard:team_kpi_api')).status_code
+
+    def test_principal_is_reused(self):
+        self.assertEqual(self.team_kpis_status(), 403)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.team_kpis_status(), 403)
+        self.assertFalse([query for query in queries.captured_queries if 'core_useraccount' in query['sql']])
+
+    def test_role_change_is_seen_on_the_next_request(self):
+        self.assertEqual(self.team_kpis_status(), 403)
+        self.account.role = Role.objects.get(role_id=302)
+        self.account.save()
+        self.assertEqual(self.team_kpis_status(), 200)
+
+    def test_renamed_role_is_seen_on_the_next_request(self):
+        self.client.get(reverse('dashboard:home'))
+        role = Role.objects.get(role_id=303)
+        role.role_name = 'Staff'
+        role.save()
+        self.assertEqual(self.client.get(reverse('dashboard:home')).context['user_account'].role.role_name, 'Staff')
+
+    def test_deleted_account_is_logged_out(self):
+        self.assertEqual(self.team_kpis_status(), 403)
+        self.account.delete()
+        response = self.client.get(reverse('dashboard:team_kpi_api'))
+        self.assertEqual(response.status_code, 302)
+
+
+class ServerTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_roles()
+        cls.admin = UserAccount.create_admin_user(
+            {'first_name': 'Admin', 'last_name': 'User', 'email_address': 'admin@example.com'},
+            'admin', PASSWORD
+        )
+
+    def metrics(self, response):
+        return {
+            metric.split(';')[0]: float(metric.split('dur=')[1].split(';')[0])
+            for metric in response['Server-Timing'].split(', ')
+        }
+
+    def test_rendered_page(self):
+        metrics = self.metrics(self.client.get(core_url('home')))
+        self.assertEqual(list(metrics), ['db', 'tpl', 'view', 'total'])
+        self.assertGreater(metrics['tpl'], 0)
+        self.assertLessEqual(metrics['view'], metrics['total'])
+
+    @override_settings(SERVER_TIMING_LOG=True)
+    def test_streamed_body_queries_are_logged(self):
+        self.client.force_login(self.admin, backend='core.backends.CustomUserBackend')
+        response = self.client.get(core_url('user_directory_api'), {'format': 'ndjson'})
+        with self.assertLogs('momentum.request', 'INFO') as logs, CaptureQueriesContext(connection) as body_queries:
+            b''.join(response.streaming_content)
+        self.assertGreater(len(body_queries), 0)
+        entry = json.loads(logs.records[0].getMessage())
+        header_queries = int(response['Server-Timing'].split('desc="')[1].split(' ')[0])
+        self.assertEqual(entry['queries'], header_queries + len(body_queries))
+
+
+class SeedMomentumCommandTests(TestCase):
+    def seed(self, prefix, seed=7):
+        call_command(
+            'seed_momentum', seed=seed, employees=12, fanout=5, days=15, tasks=3, evaluations=2,
+            end_date='2025-03-15', prefix=prefix, stdout=StringIO()
+        )
+        accounts = UserAccount.objects.filter(username__startswith=f'{prefix}-employee').order_by('employee_id')
+        return [
+            (
+                list(AttendanceRecord.objects.filter(employee_id=account.employee_id).order_by('date').values_list('date', 'status', 'is_counted')),
+                list(BacklogItem.objects.filter(employee_id=account.employee_id).order_by('backlog_id').values_list(
+                    'created_date', 'due_date', 'status', 'review_status', 'priority', 'is_evaluated'
+                )),
+                list(Evaluation.objects.filter(employee_id=account.employee_id).order_by('evaluation_date').values_list(
+                    'evaluation_date', 'overall_performance'
+                )),
+            )
+            for account in accounts
+        ]
+
+    def test_same_seed_gives_same_data(self):
+        first = self.seed('first')
+        self.assertEqual(first, self.seed('second'))
+        self.assertNotEqual(first, self.seed('third', seed=8))
+
+    def test_shape(self):
+        self.seed('shape')
+        self.assertEqual(UserAccount.objects.filter(username__startswith='shape-manager', role_id=302).count(), 3)
+        self.assertEqual(TeamMember.objects.filter(manager__username='shape-manager0').count(), 5)
+        self.assertEqual(AttendanceRecord.objects.count(), 12 * 15)
+        self.assertEqual(Evaluation.objects.count(), 12 * 2)
+
+    def test_metrics_are_built(self):
+        self.seed('metrics')
+        employee_ids = list(EmployeeMetrics.objects.values_list('employee_id', flat=True))
+        expected = count_employee_metrics(employee_ids, timezone.now().date())
+        for row in EmployeeMetrics.objects.all():
+            self.assertEqual(row.total_tasks, expected[row.employee_id]['total_tasks'])
+            self.assertEqual(row.total_days, expected[row.employee_id]['total_days'])
+
+    def test_existing_prefix_is_refused(self):
+        self.seed('taken')
+        with self.assertRaises(CommandError):
+            self.seed('taken')
+
+
+class LoadBenchmarkHelperTests(SimpleTestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_split_users_follows_the_mix(self):
+        roles = split_users(20, TRAFFIC_MIX)
+        self.assertEqual(len(roles), 20)
+        self.assertEqual((roles.count(301), roles.count(302), roles.count(303)), (1, 9, 10))
+
+    def test_split_users_keeps_every_role(self):
+        roles = split_users(4, TRAFFIC_MIX)
+        self.assertEqual(len(roles), 4)
+        self.assertEqual(set(roles), {301, 302, 303})
+
+
+class BenchmarkMetricsCommandTests(TestCase):
+    def test_sweep_reports_every_case_and_leaves_no_rows(self):
+        stdout = StringIO()
+        call_command('benchmark_metrics', team_sizes='3,6', days='5', repeat=1, function=['get_team_kpis', 'calculate_attendance_rate'],
+                     stdout=stdout, stderr=StringIO())
+        rows = [line for line in stdout.getvalue().splitlines() if line.startswith(('get_team_kpis', 'calculate_attendance_rate'))]
+        self.assertEqual(len(rows), 4)
+        self.assertFalse(UserAccount.objects.exists())
+
+
+class QueryAdvisorTests(TestCase):
+    def test_sqlite_plans(self):
+        sql = 'SELECT U0."id" FROM "core_attendancerecord" U0 INNER JOIN "core_employee" T3 ON ... ORDER BY 1'
+        plan = [
+            (2, 0, 0, 'SCAN T3'),
+            (5, 0, 0, 'SEARCH U0 USING INDEX core_attendance_uncounted (employee_id=?)'),
+            (9, 0, 0, 'SCAN U0 USING COVERING INDEX core_attendancerecord_employee_id_date_471fccfa_uniq'),
+            (20, 0, 0, 'USE TEMP B-TREE FOR ORDER BY'),
+        ]
+        self.assertEqual(sqlite_scans(plan, sql), [
+            ('scan', 'core_employee', 'SCAN T3'),
+            ('sort', 'core_attendancerecord', 'USE TEMP B-TREE FOR ORDER BY'),
+        ])
+
+    def test_postgresql_plans(self):
+        plan = [{'Plan': {'Node Type': 'Sort', 'Sort Key': ['evaluation_date DESC'], 'Plans': [
+            {'Node Type': 'Nested Loop', 'Plans': [
+                {'Node Type': 'Index Scan', 'Relation Name': 'core_evaluation'},
+                {'Node Type': 'Seq Scan', 'Relation Name': 'core_employee'},
+            ]},
+        ]}}]
+        self.assertEqual(sorted(postgresql_scans(json.dumps(plan))), [
+            ('scan', 'core_employee', 'Seq Scan on core_employee'),
+            ('sort', 'core_evaluation', 'Sort on evaluation_date DESC'),
+        ])
+
+    def test_hot_paths_use_indexes(self):
+        create_team(3, days=10, tasks_per_employee=3)
+        UserAccount.create_admin_user(
+            {'first_name': 'Admin', 'last_name': 'User', 'email_address': 'admin@example.com'}, 'admin', PASSWORD
+        )
+        path = os.path.join(tempfile.mkdtemp(), 'advice.json')
+        # No --analyze: statistics on a handful of rows would rightly prefer scanning them
+        call_command('query_advisor', '--fail-on-scan', '--output', path, stdout=StringIO(), stderr=StringIO())
+        with open(path) as output:
+            report = json.load(output)
+        self.assertEqual([row['request'] for row in report['requests']], [entry[0] for entry in REQUESTS])
+        self.assertEqual({row['status'] for row in report['requests']}, {200})
+        # The latest evaluation comes off core_evaluation_latest in order, not from a sort
+        self.assertNotIn('core_evaluation', {finding['table'] for finding in report['findings']})
+        # Nothing the advisor did is kept
+        self.assertFalse(AttendanceRecord.objects.filter(date=timezone.now().date()).exists())
+
+    def test_empty_database(self):
+        with self.assertRaises(CommandError):
+            call_command('query_advisor', stdout=StringIO(), stderr=StringIO())
+
+
+@override_settings(CACHES=IN_MEMORY_CACHES)
+class KeysetPaginationTests(QueryBudgetMixin, TestCase):
+    TEAM_SIZE = 45
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.employees = create_team(cls.TEAM_SIZE, days=1, tasks_per_employee=0)
+        cls.admin = UserAccount.create_admin_user(
+            {'first_name': 'Admin', 'last_name': 'User', 'email_address': 'admin@example.com'},
+            'admin', PASSWORD
+        )
+
+    def get_users(self, **params):
+        return self.client.get(core_url('user_directory_api'), params)
+
+    def test_cursor_round_trip(self):
+        token = encode_cursor([timezone.now().date(), 7])
+        self.assertEqual(decode_cursor(token, 2), [timezone.now().date().isoformat(), 7])
+        with self.assertRaises(ValueError):
+            decode_cursor(token, 3)
+        with self.assertRaises(ValueError):
+            decode_cursor('not a cursor', 2)
+
+    def test_walk_forward_and_back(self):
+        self.login(self.admin)
+        expected = list(UserAccount.objects.order_by('username', 'id').values_list('username', flat=True))
+
+        pages = []
+        params = {'per_page': 10, 'include_total': 1}
+        while True:
+            data = self.get_users(**params).json()
+            pages.append(data)
+            if not data['pagination']['has_next']:
+                break
+            params = {'per_page': 10, 'after': data['pagination']['next_cursor']}
+        self.assertEqual(pages[0]['pagination']['total_count'], len(expected))
+        self.assertEqual([user['username'] for page in pages for user in page['users']], expected)
+        self.assertFalse(pages[0]['pagination']['has_previous'])
+
+        back = self.get_users(per_page=10, before=pages[-1]['pagination']['previous_cursor']).json()
+        self.assertEqual(back['users'], pages[-2]['users'])
+        self.assertTrue(back['pagination']['has_next'])
+
+    def test_deep_page_costs_the_same(self):
+        self.login(self.admin)
+        self.get_users(per_page=5)
+        with CaptureQueriesContext(connection) as first:
+            self.get_users(per_page=5)
+        first_page_queries = len(first)
+
+        # Start right before the last five users
+        key = UserAccount.objects.order_by('-username', '-id').values_list('username', 'id')[5]
+        response = self.assertQueryBudget(first_page_queries, self.get_users, per_page=5, after=encode_cursor(key))
+        self.assertEqual(len(response.json()['users']), 5)
+        self.assertFalse(response.json()['pagination']['has_next'])
+
+    def test_bad_cursor(self):
+        self.login(self.admin)
+        self.assertEqual(self.get_users(after='garbage').status_code, 400)
+
+
+@override_settings(CACHES=IN_MEMORY_CACHES)
+class UserDirectoryTests(QueryBudgetMixin, TestCase):
+    TEAM_SIZE = 6
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.employees = create_team(cls.TEAM_SIZE, days=1, tasks_per_employee=0)
+        cls.admin = UserAccount.create_admin_user(
+            {'first_name': 'Admin', 'last_name': 'User', 'email_address': 'admin@example.com'},
+            'admin', PASSWORD
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.login(self.admin)
+
+    def get_directory(self, **params):
+        return self.client.get(core_url('user_directory_api'), params)
+
+    def test_role_filter(self):
+        data = self.get_directory(role='admin,supervisor').json()
+        self.assertEqual([user['username'] for user in data['users']], ['admin', 'team-manager'])
+        self.assertEqual(self.get_directory(role='employee').json()['count'], self.TEAM_SIZE)
+        self.assertEqual(self.get_directory(role='owner').status_code, 400)
+
+    def test_field_selection(self):
+        data = self.get_directory(role='supervisor', fields='username,email').json()
+        self.assertEqual(data['users'], [{'username': 'team-manager', 'email': 'team-manager@example.com'}])
+        self.assertEqual(self.get_directory(fields='username,password').status_code, 400)
+
+    def test_stream_matches_pages(self):
+        pages = []
+        params = {'per_page': 4, 'fields': 'id,username'}
+        while True:
+            data = self.get_directory(**params).json()
+            pages.extend(data['users'])
+            if not data['pagination']['has_next']:
+                break
+            params = {'per_page': 4, 'fields': 'id,username', 'after': data['pagination']['next_cursor']}
+
+        response = self.get_directory(format='ndjson', fields='id,username')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        streamed = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(streamed, pages)
+        self.assertEqual(len(streamed), self.TEAM_SIZE + 2)
+
+    def test_stream_search(self):
+        response = self.get_directory(format='ndjson', search='manager', fields='username')
+        self.assertEqual(b''.join(response.streaming_content), b'{"username": "team-manager"}\n')
+
+    def test_search_needs_every_term(self):
+        # 'manager' alone shares enough trigrams with the whole query to pass the prefilter
+        self.assertEqual(self.get_directory(search='manager', fields='username').json()['users'], [{'username': 'team-manager'}])
+        self.assertEqual(self.get_directory(search='manager zzzz', fields='username').json()['users'], [])
+
+    def test_legacy_endpoints_are_gone(self):
+        # Replaced by the directory; a 404 rather than a silently truncated list
+        for path in ['get-admins', 'get-supervisors', 'get-employees', 'get-all-users']:
+            self.assertEqual(self.client.get(f'/core/admin/{path}/').status_code, 404)
+
+
+class ExportPerformanceCommandTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.employees = create_team(3, days=5, tasks_per_employee=2)
+        create_team(2, prefix='other', days=5, tasks_per_employee=0)
+
+    def export(self, *args):
+        out = StringIO()
+        call_command('export_performance', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_whole_org_performance_csv(self):
+        lines = self.export('performance', '--chunk-size', '2').splitlines()
+        self.assertEqual(lines[0], 'employee_id,name,department,position,performance_score,attendance_rate,compliance_rate,backlog_count,status')
+        # Every employee, managers included, in id order
+        self.assertEqual([int(line.split(',')[0]) for line in lines[1:]], list(Employee.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_team_evaluations_ndjson(self):
+        rows = [json.loads(line) for line in self.export('evaluations', '--manager', 'team-manager', '--format', 'ndjson').splitlines()]
+        self.assertEqual([row['employee_id'] for row in rows], [employee.id for employee in self.employees])
+        self.assertEqual(rows[0]['kpi_scores'][0]['kpi'], 'Quality')
+
+    def test_output_file(self):
+        path = os.path.join(tempfile.mkdtemp(), 'evaluations.csv')
+        self.export('evaluations', '--output', path, '--until', '2000-01-01')
+        with open(path, encoding='utf-8') as output:
+            self.assertEqual(output.read().splitlines(), [','.join(EVALUATION_COLUMNS)])
+
+    def test_bad_arguments(self):
+        with self.assertRaises(CommandError):
+            self.export('evaluations', '--manager', 'nobody')
+        with self.assertRaises(CommandError):
+            self.export('evaluations', '--since', '01/02/2026')
+
+
+class BuildSnapshotsCommandTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.employees = create_team(4, days=40, tasks_per_employee=6)
+
+    def build(self, *args):
+        call_command('build_snapshots', *args, stdout=StringIO())
+
+    def test_period_boundaries(self):
+        day = timezone.datetime(2026, 2, 18).date()
+        self.assertEqual(get_period_starts(day, day, 'month'), [day.replace(day=1)])
+        self.assertEqual(get_period_end(day.replace(day=1), 'month'), day.replace(day=28))
+        self.assertEqual(get_period_starts(day, day + timedelta(days=7), 'week'), [day - timedelta(days=2), day + timedelta(days=5)])
+        self.assertEqual(get_period_label(day - timedelta(days=2), 'week'), '2026-W08')
+        for granularity in ('day', 'week', 'month'):
+            for length in (0, 1, 6, 7, 13, 31, 400):
+                self.assertEqual(
+                    count_periods(day, day + timedelta(days=length), granularity),
+                    len(get_period_starts(day, day + timedelta(days=length), granularity))
+                )
+
+    def test_counts_match_raw_rows(self):
+        today = timezone.now().date()
+        self.build('--granularity', 'month', '--since', (today - timedelta(days=45)).isoformat(), '--chunk-size', '3')
+        employee = self.employees[0]
+        snapshots = PerformanceSnapshot.objects.filter(employee=employee, granularity='month').order_by('period_start')
+        self.assertEqual(len(snapshots), len(get_period_starts(today - timedelta(days=45), today, 'month')))
+
+        # Every employee gets a row per period
+        self.assertEqual(PerformanceSnapshot.objects.count(), len(snapshots) * Employee.objects.count())
+        for snapshot in snapshots:
+            attendance = AttendanceRecord.objects.filter(employee=employee, date__range=(snapshot.period_start, snapshot.period_end))
+            self.assertEqual(snapshot.total_days, attendance.count())
+            self.assertEqual(snapshot.present_days, attendance.filter(status='Present').count())
+            self.assertEqual(snapshot.late_days, attendance.filter(status='Late').count())
+        current = snapshots.last()
+        self.assertEqual(current.total_tasks, 6)
+        self.assertEqual(current.accepted_tasks, 1)
+        self.assertEqual(current.compliance_rate, round(100 / 6, 2))
+        self.assertEqual(current.summary_score, round(current.attendance_rate * 0.4 + current.compliance_rate * 0.6, 2))
+
+    def test_rerun_updates_in_place(self):
+        self.build('--granularity', 'week')
+        snapshot = PerformanceSnapshot.objects.get(employee=self.employees[0], granularity='week')
+        BacklogItem.objects.filter(employee=self.employees[0]).update(review_status='Accepted')
+
+        self.build('--granularity', 'week')
+        self.assertEqual(PerformanceSnapshot.objects.filter(granularity='week').count(), Employee.objects.count())
+        snapshot.refresh_from_db()
+        self.assertEqual(snapshot.compliance_rate, 100.0)
+
+    def test_department_shards_cover_everyone(self):
+        self.build('--granularity', 'day', '--shard-by', 'department')
+        by_department = sorted(PerformanceSnapshot.objects.values_list('employee_id', 'total_days'))
+        PerformanceSnapshot.objects.all().delete()
+        self.build('--granularity', 'day', '--shard-size', '2')
+        self.assertEqual(sorted(PerformanceSnapshot.objects.values_list('employee_id', 'total_days')), by_department)
+        self.assertEqual(len(by_department), Employee.objects.count())
+
+    def test_bad_dates(self):
+        with self.assertRaises(CommandError):
+            self.build('--date', 'yesterday')
+        with self.assertRaises(CommandError):
+            self.build('--date', '2026-01-01', '--since', '2026-02-01')
+
+
+class EmployeeMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.employees = create_team(1, days=5, tasks_per_employee=3)
+        cls.employee = cls.employees[0]
+        cls.today = timezone.now().date()
+
+    def assertMetricsMatchRecount(self):
+        row = EmployeeMetrics.objects.get(employee=self.employee)
+        expected = count_employee_metrics([self.employee.id], timezone.now().date())[self.employee.id]
+        self.assertEqual({field: getattr(row, field) for field in expected}, expected)
+        return row
+
+    def test_future_attendance_counts_once_its_day_comes(self):
+        before = self.assertMetricsMatchRecount()
+        AttendanceRecord.objects.create(employee=self.employee, date=self.today + timedelta(days=1), status='Present')
+        self.assertEqual(self.assertMetricsMatchRecount().total_days, before.total_days)
+
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(days=1)):
+            metrics = get_metrics_for_employees([self.employee.id])[self.employee.id]
+            self.assertEqual(metrics.total_days, before.total_days + 1)
+            self.assertMetricsMatchRecount()
+
+    def test_attendance_create_status_change_and_delete(self):
+        record = AttendanceRecord.objects.create(employee=self.employee, date=self.today, status='Present')
+        self.assertMetricsMatchRecount()
+
+        record = AttendanceRecord.objects.get(pk=record.pk)
+        record.status = 'Late'
+        record.save()
+        self.assertMetricsMatchRecount()
+
+        record.delete()
+        self.assertMetricsMatchRecount()
+
+    def test_task_create_and_complete(self):
+        before = self.assertMetricsMatchRecount()
+        task = BacklogItem.objects.create(employee=self.employee, task_description='New', due_date=self.today)
+        self.assertEqual(self.assertMetricsMatchRecount().open_backlog, before.open_backlog + 1)
+
+        task = BacklogItem.objects.get(pk=task.pk)
+        task.status = 'Completed'
+        task.save()
+        self.assertEqual(self.assertMetricsMatchRecount().open_backlog, before.open_backlog)
+
+        task.status = 'Accepted'
+        task.review_status = 'Accepted'
+        task.save()
+        self.assertEqual(self.assertMetricsMatchRecount().accepted_tasks, before.accepted_tasks + 1)
+
+    def test_evaluation_create(self):
+        create_evaluation(self.employee, self.manager, self.today, 'Now')
+        row = self.assertMetricsMatchRecount()
+        # The evaluated period's attendance and tasks are no longer counted
+        self.assertEqual((row.total_days, row.total_tasks), (0, 0))
+
+    def test_verify(self):
+        out = StringIO()
+        call_command('rebuild_employee_metrics', '--verify', stdout=out)
+        self.assertIn('match', out.getvalue())
+
+        # A bulk update skips the signals, which is the drift --verify is for
+        EmployeeMetrics.objects.filter(employee=self.employee).update(present_days=99)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_employee_metrics', '--verify', stdout=StringIO())
+
+        call_command('rebuild_employee_metrics', stdout=StringIO())
+        call_command('rebuild_employee_metrics', '--verify', stdout=StringIO())
+        self.assertMetricsMatchRecount()
+
+
+@override_settings(CACHES=IN_MEMORY_CACHES)
+class BatchEvaluationTests(TestCase):
+    """create_evaluations_batch must leave exactly what create_evaluation per employee leaves"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.now().date()
+        cls.teams = [create_team(4, prefix=prefix, days=15) for prefix in ('batch', 'single')]
+        for manager, employees in cls.teams:
+            # Vary the employees: fewer days each, and the last one has never been evaluated
+            for i, employee in enumerate(employees):
+                for record in AttendanceRecord.objects.filter(employee=employee).order_by('date')[:i * 2]:
+                    record.delete()
+            Evaluation.objects.filter(employee=employees[-1]).delete()
+
+    def setUp(self):
+        cache.clear()
+
+    def evaluate(self, evaluate_team):
+        """Run evaluate_team(manager, employees) on each team in its own commit; return what each left behind"""
+        results = []
+        for manager, employees in self.teams:
+            employees = [Employee.objects.get(pk=employee.pk) for employee in employees]
+            version = get_team_version(manager.pk)
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    evaluate_team(manager, employees)
+            results.append({
+                'team_version_bumped': get_team_version(manager.pk) != version,
+                'employees': [self.employee_state(employee) for employee in employees],
+            })
+        return results
+
+    def employee_state(self, employee):
+        evaluation = Evaluation.objects.get(employee=employee, evaluation_date=self.today)
+        employee.refresh_from_db()
+        return {
+            'evaluation': Evaluation.objects.filter(pk=evaluation.pk).values(
+                'evaluation_date', 'period', 'compliance_rate', 'attendance_rate', 'overall_performance', 'notes'
+            ).get(),
+            'last_evaluation': (employee.last_evaluation_id == evaluation.pk, employee.last_evaluation_date),
+            'counted_days': list(AttendanceRecord.objects.filter(employee=employee).order_by('date').values_list('date', 'is_counted')),
+            'evaluated_tasks': list(BacklogItem.objects.filter(employee=employee).order_by('backlog_id').values_list('task_description', 'is_evaluated')),
+            'metrics': EmployeeMetrics.objects.filter(employee=employee).values(
+                'present_days', 'total_days', 'accepted_tasks', 'total_tasks', 'open_backlog'
+            ).get(),
+        }
+
+    def test_batch_matches_one_evaluation_per_employee(self):
+        batch_results = {}
+
+        def evaluate_team(manager, employees):
+            if manager == self.teams[0][0]:
+                for summary in create_evaluations_batch([employee.id for employee in employees], manager, self.today, 'Q4', 'Note. '):
+                    batch_results[summary['employee_id']] = summary
+            else:
+                for employee in employees:
+                    evaluation, stats = create_evaluation(employee, manager, self.today, 'Q4', 'Note. ')
+                    batch_results[employee.id] = {
+                        'overall_performance': stats['overall_performance'],
+                        'attendance_rate': stats['attendance_rate'],
+                        'compliance_rate': stats['compliance_rate'],
+                        'days_evaluated': stats['days_evaluated'],
+                        'tasks_evaluated': stats['tasks_evaluated'],
+                    }
+
+        batch, single = self.evaluate(evaluate_team)
+        self.assertEqual(batch, single)
+        self.assertTrue(batch['team_version_bumped'])
+
+        fields = ['overall_performance', 'attendance_rate', 'compliance_rate', 'days_evaluated', 'tasks_evaluated']
+        for batch_employee, single_employee in zip(self.teams[0][1], self.teams[1][1]):
+            self.assertEqual(
+                {field: batch_results[batch_employee.id][field] for field in fields},
+                batch_results[single_employee.id]
+            )
+
+
+class LastEvaluationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.employees = create_team(2, days=10, tasks_per_employee=0)
+        cls.employee = cls.employees[0]
+        cls.today = timezone.now().date()
+
+    def evaluate(self, employee, days_ago):
+        evaluation = Evaluation(
+            employee=employee, created_by=self.manager, evaluation_date=self.today - timedelta(days=days_ago),
+            period='Test', compliance_rate=1.0, attendance_rate=1.0
+        )
+        evaluation.save(calculate_metrics=False)
+        return evaluation
+
+    def assertPointsAt(self, employee, evaluation):
+        employee = Employee.objects.get(pk=employee.pk)
+        self.assertEqual(employee.last_evaluation_id, evaluation.pk if evaluation else None)
+        self.assertEqual(employee.last_evaluation_date, evaluation.evaluation_date if evaluation else None)
+
+    def test_follows_the_latest_evaluation(self):
+        first = Evaluation.objects.get(employee=self.employee)
+        self.assertPointsAt(self.employee, first)
+
+        newer = self.evaluate(self.employee, 5)
+        self.assertPointsAt(self.employee, newer)
+        self.evaluate(self.employee, 30)  # backdated: the pointer stays
+        self.assertPointsAt(self.employee, newer)
+        same_day = self.evaluate(self.employee, 5)  # ties go to the later id
+        self.assertPointsAt(self.employee, same_day)
+
+        same_day.delete()
+        self.assertPointsAt(self.employee, newer)
+        newer.evaluation_date = self.today - timedelta(days=40)
+        newer.save()
+        self.assertPointsAt(self.employee, first)
+        Evaluation.objects.filter(employee=self.employee).delete()
+        self.assertPointsAt(self.employee, None)
+
+    def test_moving_an_evaluation_repoints_both_employees(self):
+        other = self.employees[1]
+        evaluation = self.evaluate(self.employee, 1)
+        evaluation = Evaluation.objects.get(pk=evaluation.pk)
+        evaluation.employee = other
+        evaluation.save()
+        self.assertPointsAt(self.employee, Evaluation.objects.get(employee=self.employee))
+        self.assertPointsAt(other, evaluation)
+
+    def test_held_employee_is_kept_current(self):
+        evaluation, stats = create_evaluation(self.employee, self.manager, self.today, 'Now')
+        self.assertEqual((self.employee.last_evaluation_id, self.employee.last_evaluation_date), (evaluation.pk, self.today))
+        # Saving the held employee must not restore the old pointer
+        self.employee.save()
+        self.assertPointsAt(self.employee, evaluation)
+
+    def test_batch_evaluations(self):
+        create_evaluations_batch([employee.id for employee in self.employees], self.manager, self.today, 'Batch')
+        for employee in self.employees:
+            self.assertPointsAt(employee, Evaluation.objects.get(employee=employee, evaluation_date=self.today))
+
+
+class DailyCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.employees = create_team(2, days=30, tasks_per_employee=6)
+        cls.employee = cls.employees[0]
+        cls.today = timezone.now().date()
+
+    def assertCountersMatchRaw(self, employee):
+        # A day emptied by a delete keeps a row equal to the day before, so compare totals rather than rows
+        days = [self.today - timedelta(days=offset) for offset in range(60)]
+        stored = [get_totals_through(employee.id, day) for day in days]
+        rebuild_daily_counters([employee.id])
+        self.assertEqual(stored, [get_totals_through(employee.id, day) for day in days])
+
+    def test_window_totals_match_raw_rows(self):
+        for start_days, end_days in [(30, 0), (12, 5), (1, 1), (40, 31)]:
+            start, end = self.today - timedelta(days=start_days), self.today - timedelta(days=end_days)
+            records = AttendanceRecord.objects.filter(employee=self.employee, date__range=(start, end))
+            with self.assertNumQueries(2):
+                totals = get_window_totals(self.employee.id, start, end)
+            self.assertEqual(totals['total_days'], records.count())
+            self.assertEqual(totals['present_days'], records.filter(status='Present').count())
+            self.assertEqual(totals['late_days'], records.filter(status='Late').count())
+            self.assertEqual(totals['absent_days'], records.filter(status='Absent').count())
+        self.assertEqual(get_window_totals(self.employee.id, None, self.today)['tasks_created'], 6)
+
+    def test_kept_in_sync_on_write(self):
+        # A backdated record shifts every later day's totals
+        AttendanceRecord.objects.create(employee=self.employee, date=self.today - timedelta(days=45), status='Present')
+        record = AttendanceRecord.objects.get(employee=self.employee, date=self.today - timedelta(days=10))
+        record.status = 'Present' if record.status != 'Present' else 'Absent'
+        record.save()
+        AttendanceRecord.objects.filter(employee=self.employee, date=self.today - timedelta(days=3)).get().delete()
+        moved = AttendanceRecord.objects.get(employee=self.employee, date=self.today - timedelta(days=20))
+        moved.date = self.today
+        moved.save()
+
+        task = BacklogItem.objects.filter(employee=self.employee, review_status='Pending Review').first()
+        task.review_status = 'Accepted'
+        task.save()
+        BacklogItem.objects.create(employee=self.employee, task_description='New', due_date=self.today)
+
+        self.assertCountersMatchRaw(self.employee)
+        totals = get_window_totals(self.employee.id, self.today, self.today)
+        self.assertEqual((totals['tasks_created'], totals['tasks_accepted']), (7, 2))
+
+    def test_day_row_created_concurrently(self):
+        # Another transaction inserts tomorrow's row (with its own Late day applied) after the
+        # missing check but before this write's insert: the insert skips it and the increment lands on it
+        tomorrow = self.today + timedelta(days=1)
+        base = get_totals_through(self.employee.id, self.today)
+        bulk_create = DailyCounter.objects.bulk_create
+
+        def insert_concurrently(rows, **kwargs):
+            DailyCounter.objects.create(employee=self.employee, date=tomorrow, **dict(
+                base, total_days=base['total_days'] + 1, late_days=base['late_days'] + 1
+            ))
+            return bulk_create(rows, **kwargs)
+
+        with mock.patch.object(DailyCounter.objects, 'bulk_create', side_effect=insert_concurrently):
+            AttendanceRecord.objects.create(employee=self.employee, date=tomorrow, status='Present')
+
+        self.assertEqual(DailyCounter.objects.filter(employee=self.employee, date=tomorrow).count(), 1)
+        totals = get_window_totals(self.employee.id, tomorrow, tomorrow)
+        self.assertEqual((totals['total_days'], totals['present_days'], totals['late_days']), (2, 1, 1))
+
+    def test_mark_absences(self):
+        day = self.today
+        call_command('mark_absences', '--date', day.isoformat(), stdout=StringIO())
+        self.assertEqual(get_window_totals(self.employee.id, day, day)['absent_days'], 1)
+        self.assertCountersMatchRaw(self.employee)
+
+    def test_mark_absences_counts_only_its_own_rows(self):
+        # A late login records the second employee absent just before this run's insert:
+        # that row keeps the single count its own signals gave it
+        tomorrow = self.today + timedelta(days=1)
+        other = self.employees[1]
+        inserted = []
+
+        def insert_concurrently(execute, sql, params, many, context):
+            if 'INTO "core_attendancerecord"' in sql and not inserted:
+                inserted.append(sql)
+                AttendanceRecord.objects.create(employee=other, date=tomorrow, status='Absent')
+            return execute(sql, params, many, context)
+
+        out = StringIO()
+        with connection.execute_wrapper(insert_concurrently):
+            call_command('mark_absences', '--date', tomorrow.isoformat(), stdout=out)
+
+        self.assertTrue(inserted)
+        self.assertIn(f"Marked 1 employees absent on {tomorrow}", out.getvalue())
+        self.assertEqual(get_window_totals(other.id, tomorrow, tomorrow)['absent_days'], 1)
+        self.assertCountersMatchRaw(other)
+        self.assertCountersMatchRaw(self.employee)
+
+    def test_mark_absences_without_returning(self):
+        # Without RETURNING the inserted rows are unknown, so their counters are recounted instead
+        day = self.today + timedelta(days=1)
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            call_command('mark_absences', '--date', day.isoformat(), stdout=StringIO())
+        self.assertEqual(get_window_totals(self.employee.id, day, day)['absent_days'], 1)
+        self.assertCountersMatchRaw(self.employee)
+
+    def test_evaluation_period_rates(self):
+        # Since the last evaluation (dated 31 days ago): all 30 days of attendance and the 6 tasks
+        records = AttendanceRecord.objects.filter(employee=self.employee)
+        expected = round(records.filter(status='Present').count() / records.count() * 100, 2)
+        self.assertEqual(calculate_attendance_rate_for_period(self.employee), expected)
+        self.assertEqual(calculate_compliance_rate_for_evaluation(self.employee), round(100 / 6, 2))
+        self.assertEqual(calculate_compliance_rate(self.employee, since_last_evaluation=True, real_time=False), round(100 / 6, 2))
+
+        # A new evaluation ten days ago leaves only the last ten days
+        create_evaluation(self.employee, self.manager, self.today - timedelta(days=10), 'Recent')
+        recent = records.filter(date__gt=self.today - timedelta(days=10))
+        self.assertEqual(
+            calculate_attendance_rate_for_period(self.employee),
+            round(recent.filter(status='Present').count() / recent.count() * 100, 2)
+        )
+        self.assertEqual(calculate_compliance_rate(self.employee, period_days=5), round(100 / 6, 2))
+
+
+class EmployeeSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_roles()
+        people = [
+            ('Johnathan', 'Reyes', 'Finance', 'Analyst', 'jreyes'),
+            ('John', 'Santos', 'IT', 'Engineer', 'jsantos'),
+            ('Maria', 'Johnson', 'Sales', 'Associate', 'mjohnson'),
+            ('Carla', 'Cruz', 'Operations', 'Coordinator', 'ccruz'),
+        ]
+        for first, last, department, position, username in people:
+            UserAccount.create_employee_user({
+                'first_name': first, 'last_name': last, 'department': department, 'position': position,
+                'email_address': f'{username}@example.com',
+            }, username, PASSWORD)
+
+    def names(self, query, limit=10):
+        return [f"{employee.first_name} {employee.last_name}" for employee in search_employees(Employee.objects.all(), query, limit)]
+
+    def test_exact_then_prefix(self):
+        self.assertEqual(self.names('john'), ['John Santos', 'Maria Johnson', 'Johnathan Reyes'])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.names('john rey'), ['Johnathan Reyes'])
+
+    def test_typo(self):
+        self.assertEqual(self.names('santso'), ['John Santos'])
+        self.assertEqual(self.names('santis'), ['John Santos'])
+        self.assertEqual(self.names('zantoz'), [])
+
+    def test_terms_match_from_the_start_of_a_word(self):
+        # 'son' ends Johnson and Santos' usernames but starts no word, and is no typo of one
+        self.assertEqual(self.names('son'), [])
+        self.assertEqual(self.names('sant'), ['John Santos'])
+        self.assertEqual(self.names('ohn'), [])
+
+    @skipUnless(connection.vendor == 'postgresql', "pg_trgm branch")
+    def test_postgresql_uses_pg_trgm(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.names('sant'), ['John Santos'])
+        self.assertIn('WORD_SIMILARITY', queries.captured_queries[-1]['sql'].upper())
+
+    def test_department_username_and_email(self):
+        self.assertEqual(self.names('operations'), ['Carla Cruz'])
+        self.assertEqual(self.names('mjohn'), ['Maria Johnson'])
+        self.assertEqual(self.names('jsantos@example'), ['John Santos'])
+
+    def test_index_follows_writes(self):
+        account = UserAccount.objects.get(username='ccruz')
+        employee = account.employee
+        employee.last_name = 'Walker'
+        employee.save()
+        self.assertEqual(self.names('walker'), ['Carla Walker'])
+
+        account.username = 'cwalker'
+        account.save()
+        self.assertEqual(self.names('cwalker'), ['Carla Walker'])
+        self.assertEqual(EmployeeSearchIndex.objects.get(employee=employee).document.split().count('cwalker'), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            employee.delete()
+        self.assertEqual(self.names('walker'), [])
+
+    def test_login_does_not_reindex(self):
+        account = UserAccount.objects.get(username='jreyes')
+        with CaptureQueriesContext(connection) as queries:
+            account.last_login = timezone.now()
+            account.save()
+        self.assertFalse([query for query in queries.captured_queries if 'search' in query['sql']])
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_per_process_cache_is_warned_about_outside_debug(self):
+        with override_settings(DEBUG=False, CACHES=IN_MEMORY_CACHES):
+            self.assertEqual([warning.id for warning in check_shared_cache(None)], ['core.W001'])
+        with override_settings(DEBUG=True, CACHES=IN_MEMORY_CACHES):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_database_cache_is_accepted(self):
+        database_cache = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'momentum_cache'}}
+        with override_settings(DEBUG=False, CACHES=database_cache):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class AvailabilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_roles()
+        cls.account = UserAccount.create_employee_user(
+            {'first_name': 'Ana', 'last_name': 'Reyes', 'email_address': 'ana@example.com'}, 'areyes', PASSWORD
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def check(self, name, **params):
+        return self.client.get(core_url(name), params).json()['exists']
+
+    def test_writes_refresh_the_sets(self):
+        self.assertTrue(self.check('check_username', username='AReyes'))
+        self.assertFalse(self.check('check_username', username='bcruz'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserAccount.create_employee_user(
+                {'first_name': 'Ben', 'last_name': 'Cruz', 'email_address': 'ben@example.com'}, 'bcruz', PASSWORD
+            )
+        self.assertTrue(self.check('check_username', username='bcruz'))
+        self.assertTrue(self.check('check_email', email='BEN@example.com'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.username = 'anareyes'
+            self.account.save()
+        self.assertFalse(self.check('check_username', username='areyes'))
+
+    def test_logins_keep_the_sets(self):
+        self.check('check_username', username='areyes')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.account.last_login = timezone.now()
+            self.account.save()
+        self.assertEqual(callbacks, [])
+
+    def test_old_sets_are_reloaded_without_a_bump(self):
+        self.assertFalse(self.check('check_username', username='bcruz'))
+        # The bump is lost, as when another worker wrote through a cache this one does not see
+        with self.captureOnCommitCallbacks(execute=False):
+            UserAccount.create_employee_user(
+                {'first_name': 'Ben', 'last_name': 'Cruz', 'email_address': 'ben@example.com'}, 'bcruz', PASSWORD
+            )
+        self.assertFalse(self.check('check_username', username='bcruz'))
+
+        later = time.monotonic() + settings.AVAILABILITY_RELOAD_SECONDS
+        with mock.patch('core.availability.time.monotonic', return_value=later):
+            self.assertTrue(self.check('check_username', username='bcruz'))
+
+    def test_dummy_cache_reloads_every_check(self):
+        dummy_cache = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with override_settings(CACHES=dummy_cache), mock.patch.dict('core.availability._taken', version=None, loaded_at=None):
+            self.assertFalse(self.check('check_username', username='nobody'))
+            self.assertTrue(self.check('check_email', email='ana@example.com'))
+            # Without bumps to hear, a new account is seen on the next check anyway
+            with self.captureOnCommitCallbacks(execute=True):
+                UserAccount.create_employee_user(
+                    {'first_name': 'Ben', 'last_name': 'Cruz', 'email_address': 'ben@example.com'}, 'bcruz', PASSWORD
+                )
+            self.assertTrue(self.check('check_username', username='bcruz'))
+
+    def test_lookups_use_the_lower_index(self):
+        self.assertEqual(UserAccount.get_by_username('AREYES'), self.account)
+        with CaptureQueriesContext(connection) as queries:
+            UserAccount.username_exists('AReyes')
+            Employee.email_exists('Ana@Example.com')
+        self.assertIn('LOWER("core_useraccount"."username") = ', queries.captured_queries[0]['sql'])
+        self.assertIn('LOWER("core_employee"."email_address") = ', queries.captured_queries[1]['sql'])
@@ -1,125 +1,85 @@
+from django.conf import settings
 from django.utils import timezone
-from datetime import timedelta
-from .models import AttendanceRecord, BacklogItem, EvaluationKPI, KPI, Employee, Evaluation
+from django.utils.dateparse import parse_datetime
+from datetime import timedelta, timezone as dt_timezone
+from collections import defaultdict
+from .counters import get_window_totals
+from .models import AttendanceRecord, BacklogItem, BacklogItemTombstone, EvaluationKPI, KPI, Employee, Evaluation, EmployeeMetrics
 from dashboard.models import TeamMember
-from django.db.models import Q
+from django.db import connections, transaction
+from django.db.models import Q, Count, OuterRef, Subquery
+import logging
+
+logger = logging.getLogger(__name__)
+
+def get_attendance_start_date(today):
+    """Start of the attendance year (October 1st) that contains today"""
+    # Start from October 1st of the current year
+    start_date = today.replace(month=10, day=1)
+    
+    # If we're in a month before October, use October of previous year
+    if today.month < 10:
+        start_date = start_date.replace(year=today.year - 1)
+    
+    return start_date
 
 def calculate_attendance_rate(employee, period=None):
     """Calculate attendance rate for an employee"""
     try:
-        today = timezone.now().date()
-        
-        # Start from October 1st of the current year
-        start_date = today.replace(month=10, day=1)
-        
-        # If we're in a month before October, use October of previous year
-        if today.month < 10:
-            start_date = start_date.replace(year=today.year - 1)
-        
-        attendance_records = AttendanceRecord.objects.filter(
-            employee=employee,
-            date__gte=start_date,
-            date__lte=today
-        )
-        
-        attendance_records = attendance_records.filter(is_counted=False)
-        
-                
-        if not attendance_records.exists():
-            return 0.0
-        
-        total_days = attendance_records.count()
-        present_days = attendance_records.filter(status='Present').count()
-        
-        rate = round((present_days / total_days) * 100, 2) if total_days > 0 else 0.0
-        
-        return rate
+        # Present/total days since October 1st that are not yet counted in an evaluation
+        return get_employee_metrics(employee).attendance_rate
     except Exception as e:
-        print(f"Error calculating attendance: {e}")
+        logger.error("Error calculating attendance: %s", e)
         return 0.0
 
 def calculate_backlog_count(employee):
     """Count pending backlog items for an employee"""
     try:
-        # count tasks that are Not Started, In Progress, or Completed but pending review
-        # exclude Accepted tasks
-        return BacklogItem.objects.filter(
-            employee=employee, 
-            status__in=['Not Started', 'In Progress']
-        ).exclude(
-            review_status='Accepted'  # exclude accepted tasks from backlog count
-        ).count()
+        # Not Started or In Progress tasks, excluding accepted ones
+        return get_employee_metrics(employee).open_backlog
     except Exception as e:
-        print(f"Error calculating backlog: {e}")
+        logger.error("Error calculating backlog: %s", e)
         return 0
 
 def calculate_compliance_rate(employee, period_days=None, since_last_evaluation=False, real_time=True):
     """Calculate compliance rate for tasks"""
     try:
-        from django.utils import timezone
-        from datetime import timedelta
+        # Plain real-time rate is kept in EmployeeMetrics
+        if real_time and not period_days and not since_last_evaluation:
+            return get_employee_metrics(employee).compliance_rate
         
-        # Base queryset
-        tasks = BacklogItem.objects.filter(employee=employee)
+        end_date = timezone.now().date()
+        start_date = end_date - timedelta(days=period_days) if period_days else None
         
-        # Exclude evaluated tasks in real-time mode
-        if real_time:
-            # Exclude tasks that were already evaluated
-            tasks = tasks.filter(is_evaluated=False)
-        
-        # Apply date filters if period_days is specified
-        if period_days:
-            end_date = timezone.now().date()
-            start_date = end_date - timedelta(days=period_days)
-            tasks = tasks.filter(
-                created_date__gte=start_date,
-                created_date__lte=end_date
-            )
-        
-        # Filter for tasks since last evaluation if requested
-        if since_last_evaluation:
-            last_evaluation = Evaluation.objects.filter(
-                employee=employee
-            ).order_by('-evaluation_date').first()
+        # Tasks since the last evaluation; in real-time mode evaluated tasks are left out too,
+        # and an evaluation marks every task created up to its date as evaluated
+        if since_last_evaluation or real_time:
+            last_evaluation_date = employee.last_evaluation_date
             
-            if last_evaluation:
-                tasks = tasks.filter(created_date__gt=last_evaluation.evaluation_date)
+            if last_evaluation_date:
+                after_evaluation = last_evaluation_date + timedelta(days=1)
+                start_date = max(start_date, after_evaluation) if start_date else after_evaluation
         
-        if not tasks.exists():
+        totals = get_window_totals(employee.id, start_date, end_date)
+        if not totals['tasks_created']:
             return 0.0
         
-        total_tasks = tasks.count()
-        
-        # Calculate accepted tasks
-        accepted_tasks = tasks.filter(
-            Q(status='Accepted') | 
-            Q(review_status='Accepted')
-        ).distinct().count()
-        
         # Simple compliance rate calculation
-        compliance_rate = (accepted_tasks / total_tasks) * 100 if total_tasks > 0 else 0.0
+        compliance_rate = (totals['tasks_accepted'] / totals['tasks_created']) * 100
         
         return round(compliance_rate, 2)
         
     except Exception as e:
-        print(f"Error calculating compliance: {e}")
+        logger.error("Error calculating compliance: %s", e)
         return 0.0
 
 def calculate_performance_score(employee):
     """Calculate overall performance score for an employee"""
     try:
-        attendance_rate = calculate_attendance_rate(employee)
-        compliance_rate = calculate_compliance_rate(employee, real_time=True)
-        
-        # Simple weighted average calculation
-        performance_score = (
-            (attendance_rate * 0.4) +
-            (compliance_rate * 0.6)
-        )
-        
-        return round(performance_score, 2)
+        # Weighted average: 40% attendance, 60% compliance
+        return get_employee_metrics(employee).performance_score
     except Exception as e:
-        print(f"Error calculating performance score: {e}")
+        logger.error("Error calculating performance score: %s", e)
         return 0.0
 
 def get_employee_status(employee):
@@ -134,49 +94,180 @@ def get_employee_status(employee):
     else:
         return 'poor'
 
+def get_performance_status(performance_score):
+    """Map a performance score to the status used by the team dashboard"""
+    if performance_score >= 90:
+        return 'excellent'
+    elif performance_score >= 80:
+        return 'good'
+    elif performance_score >= 70:
+        return 'needs_improvement'
+    return 'poor'
+
+def count_employee_metrics(employee_ids, today):
+    """
+    Count the raw attendance and task totals behind EmployeeMetrics as of today.
+
+    Runs one grouped query per table regardless of how many employees are
+    passed, and returns {employee_id: counters} for every id given.
+    """
+    attendance_rows = AttendanceRecord.objects.filter(
+        employee_id__in=employee_ids,
+        date__gte=get_attendance_start_date(today),
+        date__lte=today,
+        is_counted=False
+    ).values('employee_id').annotate(
+        total_days=Count('attendance_id'),
+        present_days=Count('attendance_id', filter=Q(status='Present'))
+    ).order_by()
+    
+    task_rows = BacklogItem.objects.filter(
+        employee_id__in=employee_ids
+    ).values('employee_id').annotate(
+        total_tasks=Count('backlog_id', filter=Q(is_evaluated=False)),
+        accepted_tasks=Count(
+            'backlog_id',
+            filter=Q(is_evaluated=False) & (Q(status='Accepted') | Q(review_status='Accepted'))
+        ),
+        open_backlog=Count(
+            'backlog_id',
+            filter=Q(status__in=['Not Started', 'In Progress']) & ~Q(review_status='Accepted')
+        )
+    ).order_by()
+    
+    counters = {
+        employee_id: {
+            'present_days': 0,
+            'total_days': 0,
+            'accepted_tasks': 0,
+            'total_tasks': 0,
+            'open_backlog': 0
+        }
+        for employee_id in employee_ids
+    }
+    for row in attendance_rows:
+        counters[row['employee_id']]['present_days'] = row['present_days']
+        counters[row['employee_id']]['total_days'] = row['total_days']
+    for row in task_rows:
+        counters[row['employee_id']]['accepted_tasks'] = row['accepted_tasks']
+        counters[row['employee_id']]['total_tasks'] = row['total_tasks']
+        counters[row['employee_id']]['open_backlog'] = row['open_backlog']
+    
+    return counters
+
+def rebuild_employee_metrics(employee_ids):
+    """Recompute EmployeeMetrics rows from the raw tables and upsert them"""
+    employee_ids = list(employee_ids)
+    today = timezone.now().date()
+    counters = count_employee_metrics(employee_ids, today)
+    
+    rows = [
+        EmployeeMetrics(
+            employee_id=employee_id,
+            attendance_start_date=get_attendance_start_date(today),
+            counted_through=today,
+            **counters[employee_id]
+        )
+        for employee_id in employee_ids
+    ]
+    EmployeeMetrics.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['employee'],
+        update_fields=['attendance_start_date', 'counted_through', 'present_days', 'total_days', 'accepted_tasks', 'total_tasks', 'open_backlog']
+    )
+    
+    return {row.employee_id: row for row in rows}
+
+def refresh_last_evaluations(employee_ids):
+    """Point these employees at their latest evaluation (by date, then id) with one UPDATE"""
+    latest = Evaluation.objects.filter(employee_id=OuterRef('pk')).order_by('-evaluation_date', '-evaluation_id')
+    Employee.objects.filter(pk__in=employee_ids).update(
+        last_evaluation_id=Subquery(latest.values('evaluation_id')[:1]),
+        last_evaluation_date=Subquery(latest.values('evaluation_date')[:1])
+    )
+
+def get_metrics_for_employees(employee_ids):
+    """
+    Get EmployeeMetrics rows for many employees in one query.
+
+    Rows that are missing, or counted through an earlier day (attendance
+    counts only up to today), are rebuilt from the raw tables first.
+    Returns {employee_id: EmployeeMetrics}.
+    """
+    employee_ids = list(employee_ids)
+    today = timezone.now().date()
+    
+    metrics = {
+        row.employee_id: row
+        for row in EmployeeMetrics.objects.filter(employee_id__in=employee_ids)
+    }
+    
+    stale_ids = [
+        employee_id for employee_id in employee_ids
+        if employee_id not in metrics or metrics[employee_id].counted_through != today
+    ]
+    if stale_ids:
+        metrics.update(rebuild_employee_metrics(stale_ids))
+    
+    return metrics
+
+def get_employee_metrics(employee):
+    """Get the EmployeeMetrics row for a single employee"""
+    return get_metrics_for_employees([employee.id])[employee.id]
+
+def calculate_team_metrics(employee_ids):
+    """
+    Get real-time attendance, compliance, backlog and performance for
+    many employees at once, read from their EmployeeMetrics rows.
+
+    Returns {employee_id: metrics} where each value matches what
+    calculate_attendance_rate, calculate_compliance_rate(real_time=True),
+    calculate_backlog_count and calculate_performance_score return.
+    """
+    return {
+        employee_id: {
+            'attendance_rate': row.attendance_rate,
+            'compliance_rate': row.compliance_rate,
+            'backlog_count': row.open_backlog,
+            'performance_score': row.performance_score
+        }
+        for employee_id, row in get_metrics_for_employees(employee_ids).items()
+    }
+
 def get_team_performance_data(manager_user):
     """Get performance data for manager's team members"""
     try:
-        team_members = TeamMember.objects.filter(
+        team_members = list(TeamMember.objects.filter(
             manager=manager_user, 
             is_active=True
-        ).select_related('employee')
+        ).select_related('employee'))
+        
+        team_metrics = calculate_team_metrics([member.employee_id for member in team_members])
         
         team_performance = []
         
         for team_member in team_members:
             employee = team_member.employee
-            
-            attendance_rate = calculate_attendance_rate(employee)
-            backlog_count = calculate_backlog_count(employee)
-            compliance_rate = calculate_compliance_rate(employee, real_time=True)
-            performance_score = calculate_performance_score(employee)
-            
-            if performance_score >= 90:
-                status = 'excellent'
-            elif performance_score >= 80:
-                status = 'good'
-            elif performance_score >= 70:
-                status = 'needs_improvement'
-            else:
-                status = 'poor'
+            metrics = team_metrics[employee.id]
             
             team_performance.append({
                 'employee_id': employee.id,
                 'name': f"{employee.first_name} {employee.last_name}",
                 'position': employee.position or 'Not specified',
                 'department': employee.department or 'Not specified',
-                'performance_score': performance_score,
-                'attendance_rate': attendance_rate,
-                'compliance_rate': compliance_rate,
-                'backlog_count': backlog_count,
-                'status': status
+                'performance_score': metrics['performance_score'],
+                'attendance_rate': metrics['attendance_rate'],
+                'compliance_rate': metrics['compliance_rate'],
+                'backlog_count': metrics['backlog_count'],
+                'status': get_performance_status(metrics['performance_score']),
+                'last_evaluation_date': employee.last_evaluation_date
             })
         
         return team_performance
         
     except Exception as e:
-        print(f"Error getting team performance data: {e}")
+        logger.error("Error getting team performance data: %s", e)
         return []
 
 def filter_team_performance(team_performance, department=None, status=None):
@@ -210,28 +301,26 @@ def get_employee_compliance_rate(employee, real_time=True):
     Get employee compliance rate.
     """
     try:
-        print(f"DEBUG: Getting compliance for {employee} - real_time={real_time}")
+        logger.debug("Getting compliance for %s - real_time=%s", employee, real_time)
         
         if real_time:
             # REAL-TIME calculation - exclude evaluated tasks
             rate = calculate_compliance_rate(employee, real_time=True)
-            print(f"DEBUG: Real-time compliance rate = {rate}")
+            logger.debug("Real-time compliance rate = %s", rate)
             return rate
         else:
             # Get from latest evaluation
-            latest_evaluation = Evaluation.objects.filter(
-                employee=employee
-            ).order_by('-evaluation_date').first()
+            latest_evaluation = employee.last_evaluation
             
             if latest_evaluation and latest_evaluation.compliance_rate is not None:
-                print(f"DEBUG: Using evaluation compliance rate = {latest_evaluation.compliance_rate}")
+                logger.debug("Using evaluation compliance rate = %s", latest_evaluation.compliance_rate)
                 return latest_evaluation.compliance_rate
             else:
                 rate = calculate_compliance_rate(employee, real_time=False)
-                print(f"DEBUG: Calculated compliance rate = {rate}")
+                logger.debug("Calculated compliance rate = %s", rate)
                 return rate
     except Exception as e:
-        print(f"Error getting compliance rate: {e}")
+        logger.error("Error getting compliance rate: %s", e)
         return calculate_compliance_rate(employee, real_time=real_time)
 
 def calculate_evaluation_metrics(employee, evaluation_date=None):
@@ -259,139 +348,382 @@ def calculate_evaluation_metrics(employee, evaluation_date=None):
         }
         
     except Exception as e:
-        print(f"Error calculating evaluation metrics: {e}")
+        logger.error("Error calculating evaluation metrics: %s", e)
         return {
             'attendance_rate': 0.0,
             'compliance_rate': 0.0,
             'overall_performance': 0.0
         }
 
+def get_evaluation_window(employee, evaluation_date=None):
+    """
+    First and last day of the evaluation period ending on evaluation_date (default today):
+    from the day after the last evaluation, or from the beginning (None) for a first evaluation
+    """
+    last_evaluation_date = employee.last_evaluation_date
+    start_date = last_evaluation_date + timedelta(days=1) if last_evaluation_date else None
+    return start_date, evaluation_date or timezone.now().date()
+
 def calculate_attendance_rate_for_period(employee, evaluation_date=None):
     """Calculate attendance rate for a specific period"""
     try:
-        # Get last evaluation date or default period
-        last_evaluation = Evaluation.objects.filter(
-            employee=employee
-        ).order_by('-evaluation_date').first()
-        
-        if evaluation_date:
-            end_date = evaluation_date
-        else:
-            end_date = timezone.now().date()
-        
-        if last_evaluation:
-            # Calculate for period since last evaluation
-            start_date = last_evaluation.evaluation_date
-            attendance_records = AttendanceRecord.objects.filter(
-                employee=employee,
-                date__gt=start_date,  # After last evaluation
-                date__lte=end_date    # Up to current evaluation
-            )
-        else:
-            # First evaluation - use all records
-            attendance_records = AttendanceRecord.objects.filter(
-                employee=employee,
-                date__lte=end_date
-            )
+        # Period since last evaluation (or all records for a first evaluation), from the daily counters
+        totals = get_window_totals(employee.id, *get_evaluation_window(employee, evaluation_date))
         
-        if not attendance_records.exists():
+        if not totals['total_days']:
             return 0.0
         
-        total_days = attendance_records.count()
-        present_days = attendance_records.filter(status='Present').count()
-        
-        rate = (present_days / total_days) * 100 if total_days > 0 else 0.0
+        rate = (totals['present_days'] / totals['total_days']) * 100
         return round(rate, 2)
         
     except Exception as e:
-        print(f"Error calculating attendance for period: {e}")
+        logger.error("Error calculating attendance for period: %s", e)
         return 0.0
 
 def calculate_compliance_rate_for_evaluation(employee, evaluation_date=None):
     """Calculate compliance rate for evaluation period"""
     try:
-        # Get last evaluation date
-        last_evaluation = Evaluation.objects.filter(
-            employee=employee
-        ).order_by('-evaluation_date').first()
+        # Tasks created since last evaluation (or all tasks for a first evaluation), from the daily counters
+        totals = get_window_totals(employee.id, *get_evaluation_window(employee, evaluation_date))
         
-        if evaluation_date:
-            end_date = evaluation_date
-        else:
-            end_date = timezone.now().date()
-        
-        # Get tasks for the evaluation period
-        tasks = BacklogItem.objects.filter(employee=employee)
-        
-        if last_evaluation:
-            # Only tasks created after last evaluation
-            tasks = tasks.filter(
-                created_date__gt=last_evaluation.evaluation_date,
-                created_date__lte=end_date
-            )
-        else:
-            # First evaluation - all tasks up to evaluation date
-            tasks = tasks.filter(created_date__lte=end_date)
-        
-        if not tasks.exists():
+        if not totals['tasks_created']:
             return 0.0
         
-        total_tasks = tasks.count()
-        accepted_tasks = tasks.filter(
-            Q(status='Accepted') | 
-            Q(review_status='Accepted')
-        ).distinct().count()
-        
-        compliance_rate = (accepted_tasks / total_tasks) * 100 if total_tasks > 0 else 0.0
+        compliance_rate = (totals['tasks_accepted'] / totals['tasks_created']) * 100
         return round(compliance_rate, 2)
         
     except Exception as e:
-        print(f"Error calculating compliance for evaluation: {e}")
+        logger.error("Error calculating compliance for evaluation: %s", e)
         return 0.0
 
+def get_evaluation_period_records(employee, evaluation_date, last_evaluation=None):
+    """Attendance and task querysets covered by an evaluation ending on evaluation_date"""
+    attendance_records = AttendanceRecord.objects.filter(employee=employee, date__lte=evaluation_date)
+    tasks = BacklogItem.objects.filter(employee=employee, created_date__lte=evaluation_date)
+    
+    if last_evaluation:
+        # Only records after the last evaluation
+        attendance_records = attendance_records.filter(date__gt=last_evaluation.evaluation_date)
+        tasks = tasks.filter(created_date__gt=last_evaluation.evaluation_date)
+    
+    return attendance_records, tasks
+
+def calculate_evaluation_stats(employee, evaluation_date, last_evaluation=None):
+    """
+    Attendance and task statistics for an evaluation period.
+
+    The period runs from the day after the last evaluation (or the beginning,
+    for a first evaluation) up to evaluation_date. Uses one aggregate query
+    per table.
+    """
+    attendance_records, tasks = get_evaluation_period_records(employee, evaluation_date, last_evaluation)
+    
+    if last_evaluation:
+        period_note = f"since last evaluation ({last_evaluation.evaluation_date})"
+    else:
+        period_note = "all time (first evaluation)"
+    
+    attendance_stats = attendance_records.aggregate(
+        total_days=Count('attendance_id'),
+        present_days=Count('attendance_id', filter=Q(status='Present')),
+        absent_days=Count('attendance_id', filter=Q(status='Absent')),
+        late_days=Count('attendance_id', filter=Q(status='Late'))
+    )
+    
+    task_stats = tasks.aggregate(
+        total_tasks=Count('backlog_id'),
+        accepted_tasks=Count('backlog_id', filter=Q(status='Accepted') | Q(review_status='Accepted')),
+        completed_pending=Count('backlog_id', filter=Q(status='Completed', review_status='Pending Review')),
+        rejected_tasks=Count('backlog_id', filter=Q(review_status='Rejected')),
+        in_progress=Count('backlog_id', filter=Q(status='In Progress')),
+        not_started=Count('backlog_id', filter=Q(status='Not Started'))
+    )
+    
+    return build_evaluation_stats(attendance_stats, task_stats, period_note)
+
+def build_evaluation_stats(attendance_stats, task_stats, period_note):
+    """Derive evaluation rates from raw attendance and task counts"""
+    attendance_rate = 0.0
+    if attendance_stats['total_days'] > 0:
+        attendance_rate = round((attendance_stats['present_days'] / attendance_stats['total_days']) * 100, 2)
+    
+    compliance_rate = 0.0
+    if task_stats['total_tasks'] > 0:
+        compliance_rate = round((task_stats['accepted_tasks'] / task_stats['total_tasks']) * 100, 2)
+    
+    overall_performance = round(
+        (attendance_rate * 0.4) +  # 40% weight for attendance
+        (compliance_rate * 0.6)    # 60% weight for compliance
+    , 2)
+    
+    return {
+        'attendance_stats': attendance_stats,
+        'task_stats': task_stats,
+        'attendance_rate': attendance_rate,
+        'compliance_rate': compliance_rate,
+        'overall_performance': overall_performance,
+        'period_note': period_note
+    }
+
+def build_evaluation_summary(stats, last_evaluation=None):
+    """Text summary of the evaluation statistics appended to the evaluation notes"""
+    attendance_stats = stats['attendance_stats']
+    task_stats = stats['task_stats']
+    
+    stats_summary = f"\n\nPERFORMANCE EVALUATION SUMMARY\n"
+    stats_summary += f"=========================================\n"
+    stats_summary += f"OVERALL PERFORMANCE: {stats['overall_performance']}%\n"
+    stats_summary += f"=========================================\n\n"
+    
+    stats_summary += f"ATTENDANCE ({stats['period_note']}):\n"
+    stats_summary += f"-----------------------------------------\n"
+    stats_summary += f"Attendance Rate: {stats['attendance_rate']}%\n"
+    stats_summary += f"Total Days: {attendance_stats['total_days']}\n"
+    stats_summary += f"Present: {attendance_stats['present_days']}\n"
+    stats_summary += f"Absent: {attendance_stats['absent_days']}\n"
+    stats_summary += f"Late: {attendance_stats['late_days']}\n\n"
+    
+    stats_summary += f"TASK COMPLIANCE ({stats['period_note']}):\n"
+    stats_summary += f"-----------------------------------------\n"
+    stats_summary += f"Compliance Rate: {stats['compliance_rate']}%\n"
+    stats_summary += f"Total Tasks: {task_stats['total_tasks']}\n"
+    stats_summary += f"Accepted/Approved: {task_stats['accepted_tasks']}\n"
+    stats_summary += f"Completed (Pending Review): {task_stats['completed_pending']}\n"
+    stats_summary += f"Rejected: {task_stats['rejected_tasks']}\n"
+    stats_summary += f"In Progress: {task_stats['in_progress']}\n"
+    stats_summary += f"Not Started: {task_stats['not_started']}\n\n"
+    
+    if last_evaluation:
+        stats_summary += f"COMPARISON WITH PREVIOUS EVALUATION:\n"
+        stats_summary += f"Previous Date: {last_evaluation.evaluation_date}\n"
+        stats_summary += f"Previous Overall: {last_evaluation.overall_performance}%\n"
+        stats_summary += f"Previous Attendance: {last_evaluation.attendance_rate}%\n"
+        stats_summary += f"Previous Compliance: {last_evaluation.compliance_rate}%\n"
+    
+    stats_summary += f"========================================="
+    
+    return stats_summary
+
+def create_evaluation(employee, created_by, evaluation_date, period, notes=''):
+    """
+    Evaluate an employee for the period ending on evaluation_date.
+
+    Computes the period statistics, writes the Evaluation once and marks the
+    period's attendance as counted and tasks as evaluated, all in one
+    transaction. Returns (evaluation, stats) where stats also carries
+    'days_evaluated' and 'tasks_evaluated'.
+    """
+    with transaction.atomic():
+        last_evaluation = employee.last_evaluation
+        
+        stats = calculate_evaluation_stats(employee, evaluation_date, last_evaluation)
+        
+        evaluation = Evaluation(
+            employee=employee,
+            created_by=created_by,
+            evaluation_date=evaluation_date,
+            period=period,
+            compliance_rate=stats['compliance_rate'],
+            attendance_rate=stats['attendance_rate'],
+            overall_performance=stats['overall_performance'],
+            notes=(notes or '') + build_evaluation_summary(stats, last_evaluation)
+        )
+        evaluation.save(calculate_metrics=False)
+        
+        # MARK DATA AS EVALUATED (for resetting dashboard rates)
+        # This prevents evaluated data from being counted again in real-time rates
+        attendance_records, tasks = get_evaluation_period_records(employee, evaluation_date, last_evaluation)
+        stats['days_evaluated'] = attendance_records.update(is_counted=True)
+        stats['tasks_evaluated'] = tasks.update(is_evaluated=True)
+        
+        # Queryset updates skip the model signals, so refresh the counters here
+        # (saving the evaluation already invalidates the cached team data)
+        rebuild_employee_metrics([employee.id])
+    
+    return evaluation, stats
+
+def get_batch_period_filter(last_evaluation_dates, evaluation_date, date_field):
+    """
+    Q matching every employee's evaluation period in one filter.
+
+    last_evaluation_dates maps employee_id to the date of their last
+    evaluation (or None). Employees sharing a last evaluation date share
+    one clause, so batches evaluated together stay a short OR.
+    """
+    employees_by_date = defaultdict(list)
+    for employee_id, last_date in last_evaluation_dates.items():
+        employees_by_date[last_date].append(employee_id)
+    
+    period_filter = Q(pk__in=[])
+    for last_date, employee_ids in employees_by_date.items():
+        clause = Q(employee_id__in=employee_ids)
+        if last_date:
+            clause &= Q(**{f'{date_field}__gt': last_date})
+        period_filter |= clause
+    
+    return period_filter & Q(**{f'{date_field}__lte': evaluation_date})
+
+def create_evaluations_batch(employee_ids, created_by, evaluation_date, period, notes=''):
+    """
+    Evaluate many employees for the same period at once.
+
+    Same results as calling create_evaluation per employee, but statistics
+    come from one grouped query per table, evaluations are inserted with
+    bulk_create and the counted/evaluated flags are set with one UPDATE per
+    table. Returns a summary dict per employee.
+    """
+    employee_ids = list(dict.fromkeys(employee_ids))
+    if not employee_ids:
+        return []
+    
+    with transaction.atomic():
+        # Each employee's last evaluation comes joined through their pointer to it
+        employees = Employee.objects.select_related('last_evaluation').in_bulk(employee_ids)
+        employee_ids = [employee_id for employee_id in employee_ids if employee_id in employees]
+        
+        last_evaluations = {
+            employee_id: employees[employee_id].last_evaluation
+            for employee_id in employee_ids
+            if employees[employee_id].last_evaluation_id
+        }
+        last_evaluation_dates = {
+            employee_id: last_evaluations[employee_id].evaluation_date if employee_id in last_evaluations else None
+            for employee_id in employee_ids
+        }
+        
+        attendance_filter = get_batch_period_filter(last_evaluation_dates, evaluation_date, 'date')
+        task_filter = get_batch_period_filter(last_evaluation_dates, evaluation_date, 'created_date')
+        
+        attendance_rows = {
+            row.pop('employee_id'): row
+            for row in AttendanceRecord.objects.filter(attendance_filter).values('employee_id').annotate(
+                total_days=Count('attendance_id'),
+                present_days=Count('attendance_id', filter=Q(status='Present')),
+                absent_days=Count('attendance_id', filter=Q(status='Absent')),
+                late_days=Count('attendance_id', filter=Q(status='Late'))
+            ).order_by()
+        }
+        task_rows = {
+            row.pop('employee_id'): row
+            for row in BacklogItem.objects.filter(task_filter).values('employee_id').annotate(
+                total_tasks=Count('backlog_id'),
+                accepted_tasks=Count('backlog_id', filter=Q(status='Accepted') | Q(review_status='Accepted')),
+                completed_pending=Count('backlog_id', filter=Q(status='Completed', review_status='Pending Review')),
+                rejected_tasks=Count('backlog_id', filter=Q(review_status='Rejected')),
+                in_progress=Count('backlog_id', filter=Q(status='In Progress')),
+                not_started=Count('backlog_id', filter=Q(status='Not Started'))
+            ).order_by()
+        }
+        
+        empty_attendance = {'total_days': 0, 'present_days': 0, 'absent_days': 0, 'late_days': 0}
+        empty_tasks = {
+            'total_tasks': 0, 'accepted_tasks': 0, 'completed_pending': 0,
+            'rejected_tasks': 0, 'in_progress': 0, 'not_started': 0
+        }
+        
+        evaluations = []
+        batch_stats = []
+        for employee_id in employee_ids:
+            last_evaluation = last_evaluations.get(employee_id)
+            if last_evaluation:
+                period_note = f"since last evaluation ({last_evaluation.evaluation_date})"
+            else:
+                period_note = "all time (first evaluation)"
+            
+            stats = build_evaluation_stats(
+                attendance_rows.get(employee_id, dict(empty_attendance)),
+                task_rows.get(employee_id, dict(empty_tasks)),
+                period_note
+            )
+            batch_stats.append(stats)
+            evaluations.append(Evaluation(
+                employee_id=employee_id,
+                created_by=created_by,
+                evaluation_date=evaluation_date,
+                period=period,
+                compliance_rate=stats['compliance_rate'],
+                attendance_rate=stats['attendance_rate'],
+                overall_performance=stats['overall_performance'],
+                notes=(notes or '') + build_evaluation_summary(stats, last_evaluation)
+            ))
+        
+        Evaluation.objects.bulk_create(evaluations)
+        
+        # MARK DATA AS EVALUATED for the whole batch
+        AttendanceRecord.objects.filter(attendance_filter).update(is_counted=True)
+        BacklogItem.objects.filter(task_filter).update(is_evaluated=True)
+        
+        # bulk_create and queryset updates skip the model signals
+        rebuild_employee_metrics(employee_ids)
+        refresh_last_evaluations(employee_ids)
+        # Imported here: team_cache imports this module at load time
+        from .team_cache import invalidate_employee_teams
+        invalidate_employee_teams(employee_ids)
+    
+    summaries = []
+    for evaluation, stats in zip(evaluations, batch_stats):
+        employee = employees[evaluation.employee_id]
+        summaries.append({
+            'employee_id': employee.id,
+            'employee_name': f"{employee.first_name} {employee.last_name}",
+            'evaluation_id': evaluation.evaluation_id,
+            'evaluation_date': evaluation.evaluation_date.strftime('%Y-%m-%d'),
+            'overall_performance': stats['overall_performance'],
+            'attendance_rate': stats['attendance_rate'],
+            'compliance_rate': stats['compliance_rate'],
+            'days_evaluated': stats['attendance_stats']['total_days'],
+            'tasks_evaluated': stats['task_stats']['total_tasks']
+        })
+    
+    return summaries
+
 def reset_rates_after_evaluation(employee):
     """
     Reset rates in dashboard by marking tasks/attendance as 'evaluated'
     This is a conceptual approach - you might need different implementation
     """
     try:
-        # Get latest evaluation
-        latest_evaluation = Evaluation.objects.filter(
-            employee=employee
-        ).order_by('-evaluation_date').first()
+        # Get latest evaluation date
+        latest_evaluation_date = employee.last_evaluation_date
         
-        if not latest_evaluation:
+        if not latest_evaluation_date:
             return False
         
         # Mark tasks created before evaluation as 'evaluated'
         # You might need to add an 'evaluated' field to BacklogItem
         BacklogItem.objects.filter(
             employee=employee,
-            created_date__lte=latest_evaluation.evaluation_date
+            created_date__lte=latest_evaluation_date
         ).update(is_evaluated=True)  # Assuming you add this field
         
         # Mark attendance before evaluation as 'counted'
         AttendanceRecord.objects.filter(
             employee=employee,
-            date__lte=latest_evaluation.evaluation_date
+            date__lte=latest_evaluation_date
         ).update(is_counted=True)  # Assuming you add this field
         
+        # Queryset updates skip the model signals, so refresh the counters and cached team data here
+        rebuild_employee_metrics([employee.id])
+        # Imported here: team_cache imports this module at load time
+        from .team_cache import invalidate_employee_teams
+        invalidate_employee_teams([employee.id])
+        
         return True
         
     except Exception as e:
-        print(f"Error resetting rates: {e}")
+        logger.error("Error resetting rates: %s", e)
         return False
 
 
 def get_team_kpis(manager_user):
     """Get KPI data for manager's team"""
     try:
-        team_members = TeamMember.objects.filter(
+        employee_ids = list(TeamMember.objects.filter(
             manager=manager_user, 
             is_active=True
-        ).select_related('employee')
+        ).values_list('employee_id', flat=True))
         
-        if not team_members.exists():
+        if not employee_ids:
             return {
                 'total_employees': 0,
                 'avg_compliance': 0,
@@ -399,16 +731,12 @@ def get_team_kpis(manager_user):
                 'total_backlogs': 0
             }
         
-        total_employees = team_members.count()
-        total_compliance = 0
-        total_attendance = 0
-        total_backlogs = 0
+        team_metrics = calculate_team_metrics(employee_ids).values()
         
-        for team_member in team_members:
-            employee = team_member.employee
-            total_compliance += get_employee_compliance_rate(employee, real_time=True)  # REAL-TIME
-            total_attendance += calculate_attendance_rate(employee)
-            total_backlogs += calculate_backlog_count(employee)
+        total_employees = len(employee_ids)
+        total_compliance = sum(metrics['compliance_rate'] for metrics in team_metrics)  # REAL-TIME
+        total_attendance = sum(metrics['attendance_rate'] for metrics in team_metrics)
+        total_backlogs = sum(metrics['backlog_count'] for metrics in team_metrics)
         
         return {
             'total_employees': total_employees,
@@ -418,10 +746,80 @@ def get_team_kpis(manager_user):
         }
         
     except Exception as e:
-        print(f"Error getting team KPIs: {e}")
+        logger.error("Error getting team KPIs: %s", e)
         return {
             'total_employees': 0,
             'avg_compliance': 0,
             'avg_attendance': 0,
             'total_backlogs': 0
-        }
\ No newline at end of file
+        }
+
+# Writes are stamped before they commit, so a delta re-sends this much before the cursor; clients upsert tasks by id
+TASK_SYNC_OVERLAP = timedelta(seconds=5)
+
+def make_sync_cursor(moment):
+    """Cursor for the next delta sync: UTC ISO 8601 with a Z, so it survives a query string unescaped"""
+    return moment.astimezone(dt_timezone.utc).isoformat().replace('+00:00', 'Z')
+
+def parse_sync_cursor(value):
+    """
+    Start of a delta sync for a `since` cursor, or None when a full sync is needed.
+
+    None is also returned for cursors older than TASK_TOMBSTONE_DAYS, since
+    deletions before that are no longer known. Raises ValueError when the
+    cursor is not a datetime.
+    """
+    if not value:
+        return None
+    since = parse_datetime(value)
+    if since is None:
+        raise ValueError(f"Invalid since cursor: {value}")
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since, dt_timezone.utc)
+    if since < timezone.now() - timedelta(days=getattr(settings, 'TASK_TOMBSTONE_DAYS', 30)):
+        return None
+    return since - TASK_SYNC_OVERLAP
+
+def get_deleted_task_ids(employee_ids, since):
+    """Ids of the employees' tasks deleted after since"""
+    return list(BacklogItemTombstone.objects.filter(
+        employee_id__in=employee_ids,
+        deleted_at__gt=since
+    ).values_list('backlog_id', flat=True).distinct())
+
+def record_task_deletion(task):
+    """Leave a tombstone for a deleted task and drop tombstones too old for any valid cursor"""
+    BacklogItemTombstone.objects.create(backlog_id=task.backlog_id, employee_id=task.employee_id)
+    BacklogItemTombstone.objects.filter(
+        deleted_at__lt=timezone.now() - timedelta(days=getattr(settings, 'TASK_TOMBSTONE_DAYS', 30))
+    ).delete()
+
+
+def insert_rows(model, columns, rows, using='default', batch_size=5000):
+    """
+    INSERT tuples of column values with executemany, batch by batch, and return how many.
+    For tables filled by the hundred thousand rows, where building model instances for
+    bulk_create (and running their post_init signals) costs more than the inserts.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table), ', '.join(quote(column) for column in columns), ', '.join(['%s'] * len(columns))
+    )
+
+    def flush(batch):
+        # One transaction per batch; in autocommit SQLite would commit every row
+        with transaction.atomic(using=using, savepoint=False), connection.cursor() as cursor:
+            cursor.executemany(sql, batch)
+        return len(batch)
+
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            total += flush(batch)
+            batch = []
+    if batch:
+        total += flush(batch)
+    return total
@@ -1,15 +1,21 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth import logout as auth_logout
 
 from .forms import SupervisorPasswordResetForm, LoginForm, RegistrationForm, AdminCreateUserForm
-from .models import UserAccount, Employee
+from .models import UserAccount
+from .availability import email_taken, username_taken
 
 from django.contrib.auth.decorators import login_required, user_passes_test
+import json
+import logging
 import time
 
+logger = logging.getLogger(__name__)
+
 def home_page(request):
     return render(request, "core/home.html")
 
@@ -44,8 +50,8 @@ def registration(request):
                 user = form.save()
                 messages.success(request, "Account created successfully! Please login.")
                 return render(request, "core/home.html", {"show_login": True})
-            except Exception as e:
-                print("Error during registration:", e)
+            except Exception:
+                logger.exception("Error during registration")
                 messages.error(request, "An error occurred during registration. Please try again.")
                 return render(request, "core/home.html", {
                     "show_register": True, 
@@ -79,14 +85,14 @@ def check_email_exists(request):
     email = request.GET.get("email")
     exists = False
     if email:
-        exists = Employee.email_exists(email)
+        exists = email_taken(email)
     return JsonResponse({"exists": exists})
 
 def check_username_exists(request):
     username = request.GET.get("username")
     exists = False
     if username:
-        exists = UserAccount.username_exists(username)
+        exists = username_taken(username)
     return JsonResponse({"exists": exists})
 
 def handle_password_reset(request):
@@ -174,195 +180,119 @@ def admin_create_admin(request):
     
     return JsonResponse({'success': False, 'message': 'Invalid request method'})
 
-from django.core.paginator import Paginator
-from django.db.models import Q
+from .pagination import estimate_count, keyset_page
+from .search import matching_employee_ids
 
-@login_required
-@user_passes_test(is_admin, login_url='/login/')
-def get_admins_api(request):
-    """API endpoint to get all admin users"""
-    try:
-        # Get all admin users (role_id = 301)
-        admins = UserAccount.objects.filter(
-            role__role_id=301
-        ).select_related('employee', 'role')
-        
-        # Convert to list
-        admin_data = []
-        for admin in admins:
-            admin_data.append({
-                'id': admin.pk,
-                'username': admin.username,
-                'employee_name': f"{admin.employee.first_name} {admin.employee.last_name}",
-                'email': admin.employee.email_address,
-                'role': admin.role.role_name,
-                'is_first_login': admin.is_first_login,
-                'last_login': admin.last_login.strftime('%Y-%m-%d %H:%M') if admin.last_login else 'Never',
-                'position': admin.employee.position or '',
-                'department': admin.employee.department or '',
-                'hire_date': admin.employee.hire_date.strftime('%Y-%m-%d') if admin.employee.hire_date else ''
-            })
-        
-        return JsonResponse({
-            'success': True,
-            'admins': admin_data,
-            'count': len(admin_data)
-        })
-        
-    except Exception as e:
-        return JsonResponse({
-            'success': False,
-            'error': str(e)
-        })
+ROLE_IDS = {'admin': 301, 'supervisor': 302, 'employee': 303}
 
-@login_required
-@user_passes_test(is_admin, login_url='/login/')
-def get_supervisors_api(request):
-    """API endpoint to get all supervisor users"""
-    try:
-        # Get all supervisor users (role_id = 302)
-        supervisors = UserAccount.objects.filter(
-            role__role_id=302
-        ).select_related('employee', 'role')
-        
-        # Convert to list
-        supervisor_data = []
-        for supervisor in supervisors:
-            supervisor_data.append({
-                'id': supervisor.pk,
-                'username': supervisor.username,
-                'employee_name': f"{supervisor.employee.first_name} {supervisor.employee.last_name}",
-                'email': supervisor.employee.email_address,
-                'role': supervisor.role.role_name,
-                'is_first_login': supervisor.is_first_login,
-                'last_login': supervisor.last_login.strftime('%Y-%m-%d %H:%M') if supervisor.last_login else 'Never',
-                'position': supervisor.employee.position or '',
-                'department': supervisor.employee.department or '',
-                'hire_date': supervisor.employee.hire_date.strftime('%Y-%m-%d') if supervisor.employee.hire_date else ''
-            })
-        
-        return JsonResponse({
-            'success': True,
-            'supervisors': supervisor_data,
-            'count': len(supervisor_data)
-        })
-        
-    except Exception as e:
-        return JsonResponse({
-            'success': False,
-            'error': str(e)
-        })
+# Fields the user directory can return: name -> (columns it reads, how to render it).
+# ?fields=username,email limits both the JSON and the columns selected.
+DIRECTORY_FIELDS = {
+    'id': ([], lambda user: user.pk),
+    'username': ([], lambda user: user.username),
+    'employee_name': (['employee__first_name', 'employee__last_name'], lambda user: f"{user.employee.first_name} {user.employee.last_name}"),
+    'email': (['employee__email_address'], lambda user: user.employee.email_address),
+    'role_id': ([], lambda user: user.role_id),
+    'role': (['role__role_name'], lambda user: user.role.role_name),
+    'is_first_login': (['is_first_login'], lambda user: user.is_first_login),
+    'last_login': (['last_login'], lambda user: user.last_login.strftime('%Y-%m-%d %H:%M') if user.last_login else 'Never'),
+    'position': (['employee__position'], lambda user: user.employee.position or ''),
+    'department': (['employee__department'], lambda user: user.employee.department or ''),
+    'hire_date': (['employee__hire_date'], lambda user: user.employee.hire_date.strftime('%Y-%m-%d') if user.employee.hire_date else ''),
+}
+DIRECTORY_PER_PAGE = 20
+DIRECTORY_MAX_PER_PAGE = 100
+DIRECTORY_CHUNK_SIZE = 2000  # rows fetched per round trip when streaming
 
-@login_required
-@user_passes_test(is_admin, login_url='/login/')
-def get_employees_api(request):
-    """API endpoint to get all regular employees"""
-    try:
-        # Get all regular employees (role_id = 303)
-        employees = UserAccount.objects.filter(
-            role__role_id=303
-        ).select_related('employee', 'role')
-        
-        # Convert to list
-        employee_data = []
-        for employee in employees:
-            employee_data.append({
-                'id': employee.pk,
-                'username': employee.username,
-                'employee_name': f"{employee.employee.first_name} {employee.employee.last_name}",
-                'email': employee.employee.email_address,
-                'role': employee.role.role_name,
-                'is_first_login': employee.is_first_login,
-                'last_login': employee.last_login.strftime('%Y-%m-%d %H:%M') if employee.last_login else 'Never',
-                'position': employee.employee.position or '',
-                'department': employee.employee.department or '',
-                'hire_date': employee.employee.hire_date.strftime('%Y-%m-%d') if employee.employee.hire_date else ''
-            })
-        
-        return JsonResponse({
-            'success': True,
-            'employees': employee_data,
-            'count': len(employee_data)
-        })
-        
-    except Exception as e:
-        return JsonResponse({
-            'success': False,
-            'error': str(e)
-        })
 
-@login_required
-@user_passes_test(is_admin, login_url='/login/')
-def get_all_users_api(request):
-    """API endpoint to get all users with search and pagination"""
+def directory_query(params):
+    """Users matching the role/search params, the fields to render, and the columns they need; raises ValueError"""
+    roles = [name for name in params.get('role', 'all').split(',') if name and name != 'all']
+    unknown = [name for name in roles if name not in ROLE_IDS]
+    if unknown:
+        raise ValueError(f"Unknown role '{unknown[0]}'; choose from {', '.join(ROLE_IDS)}")
+
+    fields = [name for name in params.get('fields', '').split(',') if name] or list(DIRECTORY_FIELDS)
+    unknown = [name for name in fields if name not in DIRECTORY_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field '{unknown[0]}'; choose from {', '.join(DIRECTORY_FIELDS)}")
+
+    columns = {'username', 'role_id'}
+    for name in fields:
+        columns.update(DIRECTORY_FIELDS[name][0])
+    relations = sorted({column.split('__')[0] for column in columns if '__' in column})
+
+    users = UserAccount.objects.select_related(*relations).only(*columns)
+    if roles:
+        users = users.filter(role_id__in=[ROLE_IDS[name] for name in roles])
+
+    # Apply search filter through the search index (core.search) instead of scanning every column
+    search_query = params.get('search', '').strip()
+    if search_query:
+        matches = matching_employee_ids(search_query)
+        users = users.filter(employee__in=matches) if matches is not None else users.none()
+    return users, fields
+
+
+def render_directory_user(user, fields):
+    return {name: DIRECTORY_FIELDS[name][1](user) for name in fields}
+
+
+def directory_response(request):
+    """
+    The user directory: users in (username, id) order, filtered by role and search.
+
+    By default one keyset page (per_page, after/before cursors, optional
+    include_total) under 'users'. With format=ndjson every matching user is
+    streamed as one JSON object per line, read from the database in chunks,
+    so memory stays flat however many accounts there are.
+    """
     try:
-        # Get parameters
-        role_filter = request.GET.get('role', 'all')  # 'admin', 'supervisor', 'employee', 'all'
-        search_query = request.GET.get('search', '').strip()
-        page = int(request.GET.get('page', 1))
-        per_page = int(request.GET.get('per_page', 20))
-        
-        # Base queryset
-        users = UserAccount.objects.select_related('employee', 'role')
-        
-        # Apply role filter
-        if role_filter == 'admin':
-            users = users.filter(role__role_id=301)
-        elif role_filter == 'supervisor':
-            users = users.filter(role__role_id=302)
-        elif role_filter == 'employee':
-            users = users.filter(role__role_id=303)
-        
-        # Apply search filter
-        if search_query:
-            users = users.filter(
-                Q(username__icontains=search_query) |
-                Q(employee__first_name__icontains=search_query) |
-                Q(employee__last_name__icontains=search_query) |
-                Q(employee__email_address__icontains=search_query) |
-                Q(employee__position__icontains=search_query) |
-                Q(employee__department__icontains=search_query)
+        users, fields = directory_query(request.GET)
+
+        if request.GET.get('format') == 'ndjson':
+            rows = users.order_by('username', 'id').iterator(chunk_size=DIRECTORY_CHUNK_SIZE)
+            response = StreamingHttpResponse(
+                (json.dumps(render_directory_user(user, fields), cls=DjangoJSONEncoder) + '\n' for user in rows),
+                content_type='application/x-ndjson'
             )
-        
-        # Get total count
-        total_count = users.count()
-        
-        # Pagination
-        paginator = Paginator(users, per_page)
-        page_obj = paginator.get_page(page)
-        
-        # Convert to list
-        user_data = []
-        for user in page_obj:
-            user_data.append({
-                'id': user.pk,
-                'username': user.username,
-                'employee_name': f"{user.employee.first_name} {user.employee.last_name}",
-                'email': user.employee.email_address,
-                'role_id': user.role.role_id,
-                'role': user.role.role_name,
-                'is_first_login': user.is_first_login,
-                'last_login': user.last_login.strftime('%Y-%m-%d %H:%M') if user.last_login else 'Never',
-                'position': user.employee.position or '',
-                'department': user.employee.department or '',
-                'hire_date': user.employee.hire_date.strftime('%Y-%m-%d') if user.employee.hire_date else ''
-            })
-        
+            response['Cache-Control'] = 'no-store'
+            return response
+
+        per_page = min(max(int(request.GET.get('per_page', DIRECTORY_PER_PAGE)), 1), DIRECTORY_MAX_PER_PAGE)
+        page_obj = keyset_page(
+            users, ['username', 'id'], per_page,
+            after=request.GET.get('after'), before=request.GET.get('before')
+        )
+        user_data = [render_directory_user(user, fields) for user in page_obj]
+
         return JsonResponse({
             'success': True,
             'users': user_data,
+            'count': len(user_data),
             'pagination': {
-                'page': page,
                 'per_page': per_page,
-                'total_pages': paginator.num_pages,
-                'total_count': total_count,
-                'has_next': page_obj.has_next(),
-                'has_previous': page_obj.has_previous()
+                'has_next': page_obj.has_next,
+                'has_previous': page_obj.has_previous,
+                'next_cursor': page_obj.next_cursor,
+                'previous_cursor': page_obj.previous_cursor,
+                'total_count': estimate_count(users) if request.GET.get('include_total') else None
             }
         })
         
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
     except Exception as e:
         return JsonResponse({
             'success': False,
             'error': str(e)
-        })
\ No newline at end of file
+        })
+
+@login_required
+@user_passes_test(is_admin, login_url='/login/')
+def user_directory_api(request):
+    """API endpoint for the user directory; see directory_response for the parameters"""
+    return directory_response(request)
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:40
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def delete_undated_snapshots(apps, schema_editor):
+    # Nothing wrote snapshots before; any row left has no period dates to place it on a timeline
+    apps.get_model('dashboard', 'PerformanceSnapshot').objects.using(schema_editor.connection.alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_lower_username_email_indexes'),
+        ('dashboard', '0003_teammember'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_undated_snapshots, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='performancesnapshot',
+            name='employee',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='core.employee'),
+        ),
+        migrations.AddField(
+            model_name='performancesnapshot',
+            name='granularity',
+            field=models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], default='month', max_length=10),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='performancesnapshot',
+            name='period_start',
+            field=models.DateField(default=datetime.date(1970, 1, 1)),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='performancesnapshot',
+            name='period_end',
+            field=models.DateField(default=datetime.date(1970, 1, 1)),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='performancesnapshot',
+            name='present_days',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='performancesnapshot',
+            name='late_days',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='performancesnapshot',
+            name='total_days',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='performancesnapshot',
+            name='accepted_tasks',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='performancesnapshot',
+            name='total_tasks',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='performancesnapshot',
+            name='attendance_rate',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='performancesnapshot',
+            name='compliance_rate',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='performancesnapshot',
+            name='computed_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddConstraint(
+            model_name='performancesnapshot',
+            constraint=models.UniqueConstraint(fields=('employee', 'granularity', 'period_start'), name='dashboard_snapshot_employee_period'),
+        ),
+        migrations.AddIndex(
+            model_name='performancesnapshot',
+            index=models.Index(fields=['granularity', 'period_start'], name='dashboard_snapshot_period'),
+        ),
+    ]
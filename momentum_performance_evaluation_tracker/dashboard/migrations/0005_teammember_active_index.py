@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_performance_snapshot_periods'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='teammember',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['manager', 'employee'], name='dashboard_team_active'),
+        ),
+    ]
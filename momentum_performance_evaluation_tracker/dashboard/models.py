@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from core.models import Employee, UserAccount
 
 class TeamMember(models.Model):
@@ -10,6 +11,10 @@ class TeamMember(models.Model):
     
     class Meta:
         unique_together = ['manager', 'employee']
+        indexes = [
+            # A manager's current team; removed members stay as inactive rows, which this index leaves out
+            models.Index(fields=['manager', 'employee'], condition=Q(is_active=True), name='dashboard_team_active'),
+        ]
         verbose_name = 'Team Member'
         verbose_name_plural = 'Team Members'
     
@@ -26,10 +31,37 @@ class Report(models.Model):
         return self.title
 
 class PerformanceSnapshot(models.Model):
+    """
+    An employee's attendance and task counts over one calendar period, written by
+    the build_snapshots command (core.snapshots) so history is read, not recounted
+    """
+    GRANULARITY_CHOICES = [
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month'),
+    ]
+
     snapshot_id = models.AutoField(primary_key=True)
-    employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
-    period = models.CharField(max_length=50)
-    summary_score = models.FloatField()
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='snapshots')
+    period = models.CharField(max_length=50)  # label, e.g. 2026-10, 2026-W42 or 2026-10-18
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    period_start = models.DateField()
+    period_end = models.DateField()
+    present_days = models.IntegerField(default=0)
+    late_days = models.IntegerField(default=0)
+    total_days = models.IntegerField(default=0)
+    accepted_tasks = models.IntegerField(default=0)
+    total_tasks = models.IntegerField(default=0)
+    attendance_rate = models.FloatField(default=0.0)
+    compliance_rate = models.FloatField(default=0.0)
+    summary_score = models.FloatField()  # overall performance: 40% attendance, 60% compliance
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'granularity', 'period_start'], name='dashboard_snapshot_employee_period')
+        ]
+        indexes = [models.Index(fields=['granularity', 'period_start'], name='dashboard_snapshot_period')]
 
     def __str__(self):
-        return f"Snapshot {self.snapshot_id}"
\ No newline at end of file
+        return f"Snapshot {self.snapshot_id}"
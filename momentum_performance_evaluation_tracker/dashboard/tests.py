@@ -1,3 +1,666 @@
-from django.test import TestCase
+import csv
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import AttendanceRecord, BacklogItem, KPI, UserAccount
+from core.pagination import encode_cursor
+from core.team_cache import VERSION_KEY, bump_team_versions, get_team_cache_stats, get_team_version
+from core.tests import DATABASE_CACHES, IN_MEMORY_CACHES, PASSWORD, QueryBudgetMixin, create_team
+from core.utils import get_team_performance_data
+from .models import TeamMember
+from .views import mark_attendance
+
+
+class DashboardQueryBudgetTests(QueryBudgetMixin):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.employees = create_team(cls.TEAM_SIZE)
+        cls.employee = cls.employees[0]
+        cls.employee_user = cls.employee.accounts.get()
+        # Two employees outside the team for the add-to-team endpoint
+        cls.outsiders = [
+            UserAccount.create_employee_user(
+                {'first_name': f'Outsider{i}', 'last_name': 'User', 'email_address': f'outsider{i}@example.com'},
+                f'outsider{i}', PASSWORD
+            ).employee
+            for i in range(2)
+        ]
+
+    def task(self, **filters):
+        return BacklogItem.objects.filter(employee=self.employee, **filters).first()
+
+    def post_json(self, url, data):
+        return self.client.post(url, json.dumps(data), content_type='application/json')
+
+    def test_manager_dashboard(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(6, self.client.get, reverse('dashboard:home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['team_performance']), self.TEAM_SIZE)
+
+    def test_manager_dashboard_cached(self):
+        self.login(self.manager)
+        self.client.get(reverse('dashboard:home'))
+        response = self.assertQueryBudget(2, self.client.get, reverse('dashboard:home'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_employee_dashboard(self):
+        self.login(self.employee_user)
+        # Marking today's attendance adds it to today's DailyCounter row (core.counters): 2 queries
+        response = self.assertQueryBudget(18, self.client.get, reverse('dashboard:home'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_employee_performance_api(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(12, self.client.get, reverse('dashboard:employee_performance_api', args=[self.employee.id]))
+        self.assertEqual(len(response.json()['recent_evaluations']), 1)
+
+    def test_team_kpi_api(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(4, self.client.get, reverse('dashboard:team_kpi_api'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_search_employees_api(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(3, self.client.get, reverse('dashboard:search_employees_api'), {'q': 'Outsider'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_add_employees_to_team_api(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(7, self.client.post, reverse('dashboard:add_employees_to_team'), {
+            'employee_ids[]': [employee.id for employee in self.outsiders] + [self.employee.id]
+        })
+        data = response.json()
+        self.assertEqual(len(data['added']), 2)
+        self.assertEqual(data['failed'][0]['error'], 'Already in team')
+        self.assertEqual(TeamMember.objects.filter(manager=self.manager, is_active=True).count(), self.TEAM_SIZE + 2)
+
+    def test_get_team_members_api(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(3, self.client.get, reverse('dashboard:get_team_members'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_employee_performance_modal(self):
+        self.login(self.manager)
+        # The last evaluation is joined to the employee (Employee.last_evaluation)
+        response = self.assertQueryBudget(14, self.client.get, reverse('dashboard:employee_performance_modal', args=[self.employee.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_remove_employee_from_team_api(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(5, self.client.post, reverse('dashboard:remove_employee_from_team', args=[self.employee.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_employee_tasks_api(self):
+        self.login(self.employee_user)
+        response = self.assertQueryBudget(3, self.client.get, reverse('dashboard:employee_tasks'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_update_task_status_api(self):
+        self.login(self.employee_user)
+        task = self.task(status='In Progress', review_status='Pending Review')
+        response = self.assertQueryBudget(7, self.client.post, reverse('dashboard:update_task_status', args=[task.pk]), {
+            'status': 'Completed'
+        })
+        self.assertEqual(response.status_code, 200)
+
+    def test_assign_task_api(self):
+        self.login(self.manager)
+        # 2 of these add the task to today's DailyCounter row
+        response = self.assertQueryBudget(10, self.client.post, reverse('dashboard:assign_task'), {
+            'employee_id': self.employee.id, 'task_description': 'New task', 'due_date': '2030-01-01'
+        })
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_team_tasks_api(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(5, self.client.get, reverse('dashboard:team_tasks'))
+        self.assertEqual(len(response.json()['team_tasks']), self.TEAM_SIZE)
+
+    def test_upload_task_file_api(self):
+        # The remove-file branch; an actual upload goes to Cloudinary
+        self.login(self.employee_user)
+        task = self.task(status='Not Started')
+        response = self.assertQueryBudget(4, self.post_json, reverse('dashboard:upload_task_file', args=[task.pk]), {
+            'remove_file': True
+        })
+        self.assertTrue(response.json()['success'])
+
+    def test_get_task_file_info_api(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(5, self.client.get, reverse('dashboard:task_file_info', args=[self.task().pk]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_employee_completed_tasks_api(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(5, self.client.get, reverse('dashboard:employee_completed_tasks', args=[self.employee.id]))
+        self.assertEqual(len(response.json()['tasks']), 2)
+
+    def test_review_task_api(self):
+        self.login(self.manager)
+        task = self.task(status='Completed', review_status='Pending Review')
+        response = self.assertQueryBudget(11, self.client.post, reverse('dashboard:review_task', args=[task.pk]), {
+            'action': 'accept'
+        })
+        self.assertEqual(response.status_code, 200)
+
+    def test_create_evaluation_api(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(15, self.post_json, reverse('dashboard:create_evaluation_api', args=[self.employee.id]), {
+            'period': 'Q1'
+        })
+        self.assertTrue(response.json()['success'])
+
+    def test_create_team_evaluations_api(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(15, self.post_json, reverse('dashboard:create_team_evaluations_api'), {
+            'period': 'Q1'
+        })
+        self.assertTrue(response.json()['success'])
+
+    def test_get_available_kpis_api(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(3, self.client.get, reverse('dashboard:get_available_kpis_api'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_evaluation_modal(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(4, self.client.get, reverse('dashboard:evaluation_modal', args=[self.employee.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_last_evaluation_api(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(4, self.client.get, reverse('dashboard:get_last_evaluation', args=[self.employee.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_employee_attendance_stats_api(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(6, self.client.get, reverse('dashboard:employee_attendance_stats', args=[self.employee.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_performance_trend_api(self):
+        self.login(self.manager)
+        response = self.assertQueryBudget(4, self.client.get, reverse('dashboard:performance_trend'), {'scope': 'team'})
+        self.assertEqual(response.status_code, 200)
+
+    def download(self, name, params=None):
+        response = self.client.get(reverse(f'dashboard:{name}'), params or {})
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_team_performance(self):
+        self.login(self.manager)
+        body = self.assertQueryBudget(4, self.download, 'export_team_performance')
+        self.assertEqual(len(body.splitlines()), self.TEAM_SIZE + 1)
+
+    def test_export_team_evaluations(self):
+        self.login(self.manager)
+        body = self.assertQueryBudget(4, self.download, 'export_team_evaluations', {'format': 'ndjson'})
+        self.assertEqual(len(body.splitlines()), self.TEAM_SIZE)
+
+
+@override_settings(CACHES=IN_MEMORY_CACHES)
+class SmallTeamDashboardQueryBudgetTests(DashboardQueryBudgetTests, TestCase):
+    TEAM_SIZE = 3
+
+
+@override_settings(CACHES=IN_MEMORY_CACHES)
+class LargeTeamDashboardQueryBudgetTests(DashboardQueryBudgetTests, TestCase):
+    TEAM_SIZE = 15
+
+
+@override_settings(CACHES=DATABASE_CACHES)
+class DatabaseCacheQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """The manager dashboard budgets with the cache queries of the shipped DatabaseCache counted in"""
+
+    TEAM_SIZE = 15
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('createcachetable', verbosity=0)
+        cls.manager, cls.employees = create_team(cls.TEAM_SIZE)
+
+    def test_manager_dashboard(self):
+        self.login(self.manager)
+        # The 6 of the in-memory budget, plus creating the team version and storing both entries
+        response = self.assertQueryBudget(24, self.client.get, reverse('dashboard:home'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_manager_dashboard_cached(self):
+        self.login(self.manager)
+        self.client.get(reverse('dashboard:home'))
+        # Session and user, then one read of the team version and one get_many of both entries
+        response = self.assertQueryBudget(4, self.client.get, reverse('dashboard:home'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_hit_miss_counters_only_while_enabled(self):
+        self.login(self.manager)
+        self.client.get(reverse('dashboard:home'))
+        self.assertEqual(get_team_cache_stats()['misses'], 0)
+        with mock.patch('core.team_cache.TEAM_CACHE_STATS', True):
+            self.client.get(reverse('dashboard:home'))
+            self.client.get(reverse('dashboard:team_kpi_api'))
+        self.assertEqual(get_team_cache_stats(), {'hits': 3, 'misses': 0, 'hit_rate': 100.0})
+
+    def test_bumped_versions_never_expire(self):
+        key = VERSION_KEY.format(manager_id=self.manager.pk)
+        versions = {get_team_version(self.manager.pk)}
+        for _ in range(2):
+            bump_team_versions([self.manager.pk])
+            versions.add(get_team_version(self.manager.pk))
+        self.assertEqual(len(versions), 3)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT expires FROM momentum_cache WHERE cache_key = %s', [cache.make_key(key)])
+            (expires,), = cursor.fetchall()
+        # A timeout of None is stored as the year 9999
+        self.assertTrue(str(expires).startswith('9999-'))
+
+    def test_team_tasks_not_modified(self):
+        self.login(self.manager)
+        etag = self.client.get(reverse('dashboard:team_tasks')).headers['ETag']
+        response = self.assertQueryBudget(3, self.client.get, reverse('dashboard:team_tasks'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class MarkAttendanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.employees = create_team(1, days=3, tasks_per_employee=0)
+        cls.employee = cls.employees[0]
+
+    def mark(self):
+        request = mock.Mock(session={})
+        # 10 AM: a Late login
+        morning = timezone.localtime(timezone.now()).replace(hour=10, minute=0)
+        with mock.patch('dashboard.views.timezone.now', return_value=morning):
+            return mark_attendance(self.employee, request), request.session
+
+    def test_already_marked(self):
+        AttendanceRecord.objects.create(employee=self.employee, date=timezone.localdate(), status='Present')
+        marked, session = self.mark()
+        self.assertFalse(marked)
+        self.assertTrue(session['attendance_marked_today'])
+
+    def test_other_integrity_errors_are_not_taken_for_a_mark(self):
+        with mock.patch('core.signals.apply_daily_counts', side_effect=IntegrityError('daily counter conflict')):
+            marked, session = self.mark()
+        self.assertFalse(marked)
+        self.assertNotIn('attendance_marked_today', session)
+        self.assertFalse(AttendanceRecord.objects.filter(employee=self.employee, date=timezone.localdate()).exists())
+        marked, session = self.mark()
+        self.assertTrue(marked)
+
+
+@override_settings(CACHES=IN_MEMORY_CACHES)
+class ConditionalRequestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.employees = create_team(3)
+        cls.employee = cls.employees[0]
+        cls.employee_user = cls.employee.accounts.get()
+
+    def setUp(self):
+        cache.clear()
+
+    def assertRevalidates(self, url):
+        """First GET carries an ETag, and sending it back gets a 304 without touching the data tables"""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        # Only the session and the user are loaded
+        self.assertEqual(len(queries), 2, '\n'.join(query['sql'] for query in queries.captured_queries))
+        return etag
+
+    def test_employee_tasks(self):
+        self.client.force_login(self.employee_user, backend='core.backends.CustomUserBackend')
+        url = reverse('dashboard:employee_tasks')
+        etag = self.assertRevalidates(url)
+
+        task = BacklogItem.objects.filter(employee=self.employee, status='Not Started').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('dashboard:update_task_status', args=[task.pk]), {'status': 'In Progress'})
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_team_tasks(self):
+        self.client.force_login(self.manager, backend='core.backends.CustomUserBackend')
+        url = reverse('dashboard:team_tasks')
+        etag = self.assertRevalidates(url)
+
+        task = BacklogItem.objects.filter(employee=self.employee, status='Completed', review_status='Pending Review').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('dashboard:review_task', args=[task.pk]), {'action': 'accept'})
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_team_members(self):
+        self.client.force_login(self.manager, backend='core.backends.CustomUserBackend')
+        url = reverse('dashboard:get_team_members')
+        etag = self.assertRevalidates(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('dashboard:remove_employee_from_team', args=[self.employee.id]))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['team_members']), 2)
+
+    def test_kpis(self):
+        self.client.force_login(self.manager, backend='core.backends.CustomUserBackend')
+        url = reverse('dashboard:get_available_kpis_api')
+        etag = self.assertRevalidates(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            KPI.objects.create(name='Speed', kpi_type='score', description='Speed of work', target_value=100)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_other_roles_are_still_refused(self):
+        self.client.force_login(self.employee_user, backend='core.backends.CustomUserBackend')
+        response = self.client.get(reverse('dashboard:team_tasks'), HTTP_IF_NONE_MATCH='"anything"')
+        self.assertEqual(response.status_code, 403)
+
+
+class TaskDeltaSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.employees = create_team(3)
+        cls.employee = cls.employees[0]
+        cls.employee_user = cls.employee.accounts.get()
+
+    def setUp(self):
+        # Everything seeded is older than the sync overlap window
+        BacklogItem.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        TeamMember.objects.update(added_date=timezone.now() - timedelta(hours=1))
+
+    def test_employee_delta(self):
+        self.client.force_login(self.employee_user, backend='core.backends.CustomUserBackend')
+        url = reverse('dashboard:employee_tasks')
+        full = self.client.get(url).json()
+        self.assertTrue(full['full'])
+        self.assertEqual(len(full['tasks']), 6)
+
+        changed = BacklogItem.objects.filter(employee=self.employee, status='Not Started').first()
+        self.client.post(reverse('dashboard:update_task_status', args=[changed.pk]), {'status': 'In Progress'})
+        deleted = BacklogItem.objects.filter(employee=self.employee).exclude(pk=changed.pk).first()
+        deleted_id = deleted.pk
+        deleted.delete()
+
+        delta = self.client.get(url, {'since': full['cursor']}).json()
+        self.assertFalse(delta['full'])
+        self.assertEqual([task['id'] for task in delta['tasks']], [changed.pk])
+        self.assertEqual(delta['tasks'][0]['status'], 'In Progress')
+        self.assertEqual(delta['deleted'], [deleted_id])
+
+        # Nothing changed since the last cursor; only the overlap window may be sent again
+        again = self.client.get(url, {'since': delta['cursor']}).json()
+        self.assertLessEqual({task['id'] for task in again['tasks']}, {changed.pk})
+
+    def test_team_delta(self):
+        self.client.force_login(self.manager, backend='core.backends.CustomUserBackend')
+        url = reverse('dashboard:team_tasks')
+        cursor = self.client.get(url).json()['cursor']
+
+        task = BacklogItem.objects.filter(employee=self.employee, status='Completed', review_status='Pending Review').first()
+        self.client.post(reverse('dashboard:review_task', args=[task.pk]), {'action': 'accept'})
+        self.client.post(reverse('dashboard:remove_employee_from_team', args=[self.employees[1].id]))
+        newcomer = create_team(1, prefix='other')[1][0]
+        BacklogItem.objects.filter(employee=newcomer).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.client.post(reverse('dashboard:add_employees_to_team'), {'employee_ids[]': [newcomer.id]})
+
+        delta = self.client.get(url, {'since': cursor}).json()
+        tasks_by_employee = {member['employee_id']: [task['id'] for task in member['tasks']] for member in delta['team_tasks']}
+        self.assertNotIn(self.employees[1].id, tasks_by_employee)
+        self.assertEqual(tasks_by_employee[self.employee.id], [task.pk])
+        self.assertEqual(tasks_by_employee[self.employees[2].id], [])
+        self.assertEqual(len(tasks_by_employee[newcomer.id]), 6)
+
+    def test_bad_and_expired_cursors(self):
+        self.client.force_login(self.employee_user, backend='core.backends.CustomUserBackend')
+        url = reverse('dashboard:employee_tasks')
+        self.assertEqual(self.client.get(url, {'since': 'yesterday'}).status_code, 400)
+
+        expired = (timezone.now() - timedelta(days=365)).isoformat()
+        response = self.client.get(url, {'since': expired}).json()
+        self.assertTrue(response['full'])
+        self.assertEqual(len(response['tasks']), 6)
+
+
+class TeamTasksPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.employees = create_team(4)
+
+    def setUp(self):
+        self.client.force_login(self.manager, backend='core.backends.CustomUserBackend')
+
+    def get(self, **params):
+        return self.client.get(reverse('dashboard:team_tasks'), params)
+
+    def task_ids(self, data):
+        return [task['id'] for member in data['team_tasks'] for task in member['tasks']]
+
+    def test_pages_cover_every_task_once(self):
+        first = self.get(per_page=10).json()
+        self.assertEqual(len(first['team_tasks']), 4)
+        self.assertEqual(first['pagination']['total_count'], 24)
+        self.assertEqual(first['pagination']['total_pages'], 3)
+
+        seen = []
+        for page in range(1, 4):
+            seen += self.task_ids(self.get(per_page=10, page=page).json())
+        self.assertEqual(sorted(seen), sorted(BacklogItem.objects.values_list('pk', flat=True)))
+
+    def test_filters(self):
+        data = self.get(status='Completed', review_status='Pending Review').json()
+        self.assertEqual(data['pagination']['total_count'], 8)
+
+        employee = self.employees[1]
+        data = self.get(employee=employee.id, due_before=(timezone.now().date() + timedelta(days=1)).isoformat()).json()
+        self.assertEqual(
+            sorted(self.task_ids(data)),
+            sorted(BacklogItem.objects.filter(employee=employee, due_date__lte=timezone.now().date() + timedelta(days=1)).values_list('pk', flat=True))
+        )
+
+    def test_priority_sorts_by_urgency(self):
+        # Alphabetically Critical < High < Low < Medium, so these only come first when sorting by rank
+        ids = list(BacklogItem.objects.order_by('pk').values_list('pk', flat=True))
+        BacklogItem.objects.update(priority='Medium')
+        BacklogItem.objects.filter(pk__in=ids[:4]).update(priority='Low')
+        BacklogItem.objects.filter(pk__in=ids[4:8]).update(priority='Critical')
+
+        def first_page(sort):
+            data = self.get(sort=sort, per_page=4).json()
+            return {task['priority'] for member in data['team_tasks'] for task in member['tasks']}
+
+        self.assertEqual(first_page('-priority'), {'Critical'})
+        self.assertEqual(first_page('priority'), {'Low'})
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.get(sort='task_description').status_code, 400)
+        self.assertEqual(self.get(due_after='next week').status_code, 400)
+        self.assertEqual(self.get(per_page='all').status_code, 400)
+        self.assertEqual(self.get(employee='me').status_code, 400)
+
+
+@override_settings(CACHES=IN_MEMORY_CACHES)
+class AttendanceHistoryPaginationTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.employees = create_team(1, days=25, tasks_per_employee=0)
+        cls.employee_user = cls.employees[0].accounts.get()
+
+    def test_walk_history(self):
+        self.login(self.employee_user)
+        url = reverse('dashboard:home')
+        page = self.client.get(url, {'attendance_page_size': 10}).context['attendance_page']
+        expected = list(AttendanceRecord.objects.filter(employee=self.employees[0]).order_by('-date').values_list('date', flat=True))
+
+        seen = [record.date for record in page]
+        while page.has_next:
+            page = self.client.get(url, {'attendance_page_size': 10, 'attendance_after': page.next_cursor}).context['attendance_page']
+            seen += [record.date for record in page]
+        self.assertEqual(seen, expected)
+
+        back = self.client.get(url, {'attendance_page_size': 10, 'attendance_before': page.previous_cursor}).context['attendance_page']
+        self.assertEqual([record.date for record in back], expected[10:20])
+
+    def test_deep_page_costs_the_same(self):
+        self.login(self.employee_user)
+        url = reverse('dashboard:home')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(url, {'attendance_page_size': 5})
+        first_page_queries = len(first)
+
+        oldest = AttendanceRecord.objects.filter(employee=self.employees[0]).order_by('date')[5]
+        response = self.assertQueryBudget(first_page_queries, self.client.get, url, {
+            'attendance_page_size': 5, 'attendance_after': encode_cursor([oldest.date, oldest.pk])
+        })
+        self.assertEqual(len(response.context['attendance_page']), 5)
+        self.assertFalse(response.context['attendance_page'].has_next)
+
+    def test_mangled_cursor_starts_over(self):
+        self.login(self.employee_user)
+        response = self.client.get(reverse('dashboard:home'), {'attendance_after': 'garbage'})
+        self.assertFalse(response.context['attendance_page'].has_previous)
+
+
+class TeamExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.employees = create_team(3, days=5, tasks_per_employee=6)
+        cls.employee_user = cls.employees[0].accounts.get()
+
+    def setUp(self):
+        self.client.force_login(self.manager, backend='core.backends.CustomUserBackend')
+
+    def get(self, name, **params):
+        return self.client.get(reverse(f'dashboard:{name}'), params)
+
+    def test_performance_csv_matches_dashboard(self):
+        response = self.get('export_team_performance')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment; filename="team-performance-', response['Content-Disposition'])
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+
+        expected = {row['employee_id']: row for row in get_team_performance_data(self.manager)}
+        self.assertEqual(len(rows), len(expected))
+        for row in rows:
+            dashboard_row = expected[int(row['employee_id'])]
+            self.assertEqual(float(row['performance_score']), dashboard_row['performance_score'])
+            self.assertEqual(int(row['backlog_count']), dashboard_row['backlog_count'])
+            self.assertEqual(row['status'], dashboard_row['status'])
+
+    def test_evaluations_ndjson_with_kpi_scores(self):
+        response = self.get('export_team_evaluations', format='ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['employee_id'] for row in rows], sorted(employee.id for employee in self.employees))
+        self.assertEqual(rows[0]['kpi_scores'], [{'kpi': 'Quality', 'value': 80.0, 'target': 100.0}])
+        self.assertEqual(rows[0]['evaluated_by'], 'team-manager')
+
+    def test_evaluations_csv_flattens_kpi_scores(self):
+        rows = list(csv.DictReader(b''.join(self.get('export_team_evaluations').streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0]['kpi_scores'], 'Quality=80/100')
+
+    def test_evaluation_date_range(self):
+        # create_team dates every evaluation days + 1 ago
+        evaluated = (timezone.now().date() - timedelta(days=6)).isoformat()
+        self.assertEqual(b''.join(self.get('export_team_evaluations', since=evaluated).streaming_content).count(b'\n'), 4)
+        self.assertEqual(b''.join(self.get('export_team_evaluations', until='2000-01-01').streaming_content).count(b'\n'), 1)
+        self.assertEqual(self.get('export_team_evaluations', since='last week').status_code, 400)
+
+    def test_rejects_unknown_format_and_non_managers(self):
+        self.assertEqual(self.get('export_team_performance', format='xlsx').status_code, 400)
+        self.client.force_login(self.employee_user, backend='core.backends.CustomUserBackend')
+        self.assertEqual(self.get('export_team_performance').status_code, 403)
+        self.assertEqual(self.get('export_team_evaluations').status_code, 403)
+
+
+class PerformanceTrendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.employees = create_team(3, days=40, tasks_per_employee=6)
+        cls.outsider = UserAccount.create_employee_user(
+            {'first_name': 'Out', 'last_name': 'Sider', 'email_address': 'outsider@example.com', 'department': 'Sales'},
+            'outsider', PASSWORD
+        ).employee
+        cls.today = timezone.now().date()
+        cls.start = cls.today - timedelta(days=40)
+        for granularity in ('day', 'week', 'month'):
+            call_command('build_snapshots', '--granularity', granularity, '--since', cls.start.isoformat(), stdout=StringIO())
+
+    def setUp(self):
+        self.client.force_login(self.manager, backend='core.backends.CustomUserBackend')
+
+    def trend(self, **params):
+        params.setdefault('start', self.start.isoformat())
+        return self.client.get(reverse('dashboard:performance_trend'), params)
+
+    def test_picks_the_finest_granularity_that_fits(self):
+        self.assertEqual(self.trend(points=100).json()['granularity'], 'day')
+        data = self.trend(points=10).json()
+        self.assertEqual(data['granularity'], 'week')
+        self.assertLessEqual(len(data['points']), 10)
+        self.assertEqual(self.trend(points=3).json()['granularity'], 'month')
+
+    def test_downsampled_points_sum_the_raw_rows(self):
+        data = self.trend(scope='employee', employee=self.employees[0].id, granularity='day', points=8).json()
+        self.assertLessEqual(len(data['points']), 8)
+        self.assertEqual(data['periods_per_point'], 6)
+
+        records = AttendanceRecord.objects.filter(employee=self.employees[0])
+        self.assertEqual(sum(point['total_days'] for point in data['points']), records.count())
+        self.assertEqual(sum(point['present_days'] for point in data['points']), records.filter(status='Present').count())
+        for point in data['points']:
+            if point['total_days']:
+                self.assertEqual(point['attendance_rate'], round(point['present_days'] / point['total_days'] * 100, 2))
+
+        # The tasks were all created today, so only the last point has a compliance rate
+        self.assertEqual(data['points'][-1]['compliance_rate'], round(100 / 6, 2))
+        self.assertIsNone(data['points'][0]['compliance_rate'])
+
+    def test_team_and_department_scopes(self):
+        team = self.trend(granularity='month').json()
+        self.assertEqual(sum(point['total_tasks'] for point in team['points']), 18)
+
+        # A department is read within the manager's team: the outsider in Sales is not on it
+        sales = self.trend(scope='department', department='Sales', granularity='month').json()
+        self.assertEqual([point['overall_score'] for point in sales['points']], [None] * len(sales['points']))
+        operations = self.trend(scope='department', department='Operations', granularity='month').json()
+        self.assertEqual(sum(point['total_tasks'] for point in operations['points']), 12)
+
+    def test_other_teams_are_not_readable(self):
+        self.assertEqual(self.trend(scope='employee', employee=self.outsider.id).status_code, 403)
+        BacklogItem.objects.create(employee=self.outsider, task_description='Outside task', due_date=self.today, priority='Low')
+        call_command('build_snapshots', '--granularity', 'month', '--since', self.start.isoformat(), stdout=StringIO())
+        sales = self.trend(scope='department', department='Sales', granularity='month').json()
+        self.assertEqual(sum(point['total_tasks'] for point in sales['points']), 0)
+
+    def test_rejects_bad_requests(self):
+        self.assertEqual(self.trend(scope='company').status_code, 400)
+        self.assertEqual(self.trend(scope='department').status_code, 400)
+        self.assertEqual(self.trend(scope='employee', employee='x').status_code, 404)
+        self.assertEqual(self.trend(granularity='year').status_code, 400)
+        self.assertEqual(self.trend(start='2026-13-01').status_code, 400)
+        self.assertEqual(self.trend(start='0001-01-01', end='9999-12-31').status_code, 400)
+        self.client.force_login(self.employees[0].accounts.get(), backend='core.backends.CustomUserBackend')
+        self.assertEqual(self.trend().status_code, 403)
@@ -25,9 +25,14 @@ urlpatterns = [
     path('api/tasks/<int:task_id>/review/', views.review_task_api, name='review_task'),
     
     path('api/evaluation/create/<int:employee_id>/', views.create_evaluation_api, name='create_evaluation_api'),
+    path('api/evaluation/create-team/', views.create_team_evaluations_api, name='create_team_evaluations_api'),
     path('api/evaluation/kpis/', views.get_available_kpis_api, name='get_available_kpis_api'),
     path('modal/evaluation/<int:employee_id>/', views.evaluation_modal, name='evaluation_modal'),
     path('modal/employee/<int:employee_id>/performance/', views.employee_performance_modal, name='employee_performance_modal'),
     path('api/employee/<int:employee_id>/last-evaluation/', views.get_last_evaluation_api, name='get_last_evaluation'),
     path('api/employee/<int:employee_id>/attendance-stats/', views.get_employee_attendance_stats_api, name='employee_attendance_stats'),
+
+    path('api/trends/performance/', views.performance_trend_api, name='performance_trend'),
+    path('api/team/export/performance/', views.export_team_performance_api, name='export_team_performance'),
+    path('api/team/export/evaluations/', views.export_team_evaluations_api, name='export_team_evaluations'),
 ]
\ No newline at end of file
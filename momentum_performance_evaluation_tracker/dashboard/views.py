@@ -1,31 +1,79 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import never_cache
+from django.views.decorators.cache import cache_control, never_cache
+from django.views.decorators.http import condition
 from core.forms import SupervisorPasswordResetForm
-from core.utils import calculate_attendance_rate, calculate_backlog_count, calculate_compliance_rate, get_team_kpis
-from django.http import JsonResponse
+from core.utils import calculate_attendance_rate, calculate_backlog_count, calculate_compliance_rate
+from django.http import JsonResponse, StreamingHttpResponse
 from core.models import Employee, Evaluation, BacklogItem, AttendanceRecord, KPI
-from core.utils import calculate_attendance_rate, calculate_backlog_count, calculate_compliance_rate, get_team_performance_data, calculate_performance_score
+from core.export import EVALUATION_COLUMNS, EXPORT_FORMATS, PERFORMANCE_COLUMNS, evaluation_rows, export_lines, performance_rows
+from core.counters import get_window_totals
+from core.pagination import keyset_page
+from core.search import search_employees
+from core.snapshots import GRANULARITIES, get_performance_trend
+from core.utils import calculate_attendance_rate, calculate_backlog_count, calculate_compliance_rate, calculate_performance_score
 from .models import TeamMember
-from django.db.models import Q 
+from django.db.models import Case, Count, Q, Value, When
 from core.models import BacklogItem
 from django.utils import timezone
-from datetime import datetime
+from datetime import datetime, timedelta
+from collections import defaultdict
+from django.utils.dateparse import parse_date
 from django.shortcuts import get_object_or_404
 from dashboard.forms import TaskFileForm
 import json
+import logging
 from django.views.decorators.csrf import csrf_exempt
 from datetime import time as dt_time
 from django.utils import timezone
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
 
 
 from core.utils import (
     calculate_attendance_rate, 
     calculate_backlog_count, 
     get_employee_compliance_rate,
-    calculate_performance_score
+    calculate_performance_score,
+    create_evaluation,
+    create_evaluations_batch,
+    get_deleted_task_ids,
+    get_evaluation_window,
+    make_sync_cursor,
+    parse_sync_cursor
 )
+from core.team_cache import (
+    get_cached_team_dashboard,
+    get_cached_team_kpis,
+    get_employee_version,
+    get_kpi_version,
+    get_team_version,
+    invalidate_team
+)
+
+logger = logging.getLogger(__name__)
+
+# ETags for the polled JSON APIs, built from the versions core.team_cache bumps on every relevant write.
+# A matching If-None-Match is answered with 304 before the view queries or serializes anything.
+# Returning None (wrong role) skips the check and lets the view answer as usual.
+
+def employee_tasks_etag(request):
+    return f"tasks-{request.user.employee_id}-{get_employee_version(request.user.employee_id)}"
+
+def team_tasks_etag(request):
+    if request.user.role.role_id != 302:
+        return None
+    return f"team-tasks-{request.user.pk}-{get_team_version(request.user.pk)}"
+
+def team_members_etag(request):
+    if request.user.role.role_id != 302:
+        return None
+    return f"team-members-{request.user.pk}-{get_team_version(request.user.pk)}"
+
+def kpis_etag(request):
+    if request.user.role.role_id != 302:
+        return None
+    return f"kpis-{get_kpi_version()}"
 
 def mark_attendance(employee, request):
     """Mark attendance for employee based on login time"""
@@ -34,57 +82,60 @@ def mark_attendance(employee, request):
     today = now.date()
     current_time = now.time()
     
-    print(f"DEBUG: Today = {today}")
-    print(f"DEBUG: Current time = {current_time}")
-    
-    # Check if attendance already marked today
-    existing = AttendanceRecord.objects.filter(employee=employee, date=today).exists()
-    print(f"DEBUG: Attendance already exists? {existing}")
-    
-    if existing:
-        return False
+    logger.debug("Today = %s", today)
+    logger.debug("Current time = %s", current_time)
     
     # Time thresholds
     start_time = dt_time(7, 0)   # 7:00 AM
     late_time = dt_time(8, 0)    # 8:00 AM
     absent_time = dt_time(20, 0) # 8:00 PM
 
-    print(f"DEBUG: start_time = {start_time}, late_time = {late_time}, absent_time = {absent_time}")
-    print(f"DEBUG: Checking time conditions...")
+    logger.debug("start_time = %s, late_time = %s, absent_time = %s", start_time, late_time, absent_time)
+    logger.debug("Checking time conditions...")
 
     # Mark ABSENT after 8:00 PM
     if current_time >= absent_time:
         status = "Absent"
-        print("DEBUG: Status = Absent (after 8 PM)")
+        logger.debug("Status = Absent (after 8 PM)")
 
     # Normal logic
     elif start_time <= current_time < late_time:
         status = "Present"
-        print("DEBUG: Status = Present")
+        logger.debug("Status = Present")
     elif late_time <= current_time < absent_time:
         status = "Late"
-        print("DEBUG: Status = Late")
+        logger.debug("Status = Late")
     else:
         # Before 7 AM → do not mark attendance
-        print("DEBUG: Before 7 AM - not marking")
+        logger.debug("Before 7 AM - not marking")
         return False
     
-    # Create attendance record
+    # Create attendance record; the (employee, date) unique constraint rejects a second one for today
     try:
-        AttendanceRecord.objects.create(
-            employee=employee,
-            date=today,
-            status=status
-        )
-        print(f"Attendance marked for {employee.first_name} {employee.last_name}: {status}")
+        with transaction.atomic():
+            AttendanceRecord.objects.create(
+                employee=employee,
+                date=today,
+                status=status
+            )
+        logger.info("Attendance marked for %s %s: %s", employee.first_name, employee.last_name, status)
         
         # Set session flag for notification
         request.session['attendance_just_marked'] = True
         request.session['attendance_marked_today'] = True
         return True
 
+    except IntegrityError as e:
+        # Already marked today (e.g. by another tab or the nightly absence job), unless the
+        # error came from somewhere else in the block, such as the counters the signals update
+        if not AttendanceRecord.objects.filter(employee=employee, date=today).exists():
+            logger.error("Error marking attendance: %s", e)
+            return False
+        logger.debug("Attendance already exists")
+        request.session['attendance_marked_today'] = True
+        return False
     except Exception as e:
-        print(f"Error marking attendance: {e}")
+        logger.error("Error marking attendance: %s", e)
         return False
 
 @never_cache
@@ -102,9 +153,8 @@ def dashboard_home(request):
     today_attendance = None
     recent_attendance = []
     
-    # Initialize attendance_page and attendance_paginator at the start
+    # Initialize attendance_page at the start
     attendance_page = None
-    attendance_paginator = None
 
     if hasattr(request.user, 'employee'):
         employee = request.user.employee
@@ -112,9 +162,9 @@ def dashboard_home(request):
     else:
         evaluations = None
     # DEBUG: Check user role
-    print(f"DEBUG: User = {request.user}")
+    logger.debug("User = %s", request.user)
     if hasattr(request.user, 'role'):
-        print(f"DEBUG: Role ID = {request.user.role.role_id}")
+        logger.debug("Role ID = %s", request.user.role.role_id)
 
     role = getattr(request.user, 'role', None)
 
@@ -123,8 +173,8 @@ def dashboard_home(request):
         # Manager
         if role.role_id == 302:
             user_is_manager = True
-            team_performance = get_team_performance_data(request.user)
-            print("DEBUG: User is MANAGER")
+            team_performance, kpi_data = get_cached_team_dashboard(request.user)
+            logger.debug("User is MANAGER")
 
             # Department/status filters
             department_filter = request.GET.get('department', '')
@@ -136,23 +186,23 @@ def dashboard_home(request):
         # Admin
         elif role.role_id == 301:
             user_is_admin = True
-            print("DEBUG: User is ADMIN")
+            logger.debug("User is ADMIN")
 
         # Employee
         elif role.role_id == 303:
-            print(f"DEBUG: Employee detected - role_id = {role.role_id}")
+            logger.debug("Employee detected - role_id = %s", role.role_id)
 
             attendance_marked = request.session.get('attendance_marked_today')
-            print(f"DEBUG: attendance_marked_today in session? {attendance_marked}")
+            logger.debug("attendance_marked_today in session? %s", attendance_marked)
 
             if not attendance_marked:
-                print("DEBUG: Calling mark_attendance...")
+                logger.debug("Calling mark_attendance...")
                 marked = mark_attendance(request.user.employee, request)
-                print(f"DEBUG: mark_attendance returned: {marked}")
-                request.session['attendance_marked_today'] = bool(marked)
+                logger.debug("mark_attendance returned: %s", marked)
+                # mark_attendance sets attendance_marked_today once today's record exists
                 request.session['attendance_just_marked'] = bool(marked)
             else:
-                print("DEBUG: Attendance already marked this session")
+                logger.debug("Attendance already marked this session")
                 request.session['attendance_just_marked'] = False
 
             today = timezone.now().date()
@@ -161,24 +211,25 @@ def dashboard_home(request):
                     employee=request.user.employee,
                     date=today
                 )
-                print(f"DEBUG: Found today_attendance: {today_attendance.status}")
+                logger.debug("Found today_attendance: %s", today_attendance.status)
             except AttendanceRecord.DoesNotExist:
                 today_attendance = None
-                print("DEBUG: No attendance record found for today")
+                logger.debug("No attendance record found for today")
 
             recent_attendance = AttendanceRecord.objects.filter(
                 employee=request.user.employee
             ).order_by('-date')[:10]
-            print(f"DEBUG: Found {len(recent_attendance)} recent attendance records")
+            logger.debug("Found %s recent attendance records", len(recent_attendance))
 
             # === Paginated full attendance for UI (employee's entire history) ===
+            # Keyset pages: attendance_after/attendance_before carry the cursor of the
+            # page being left, so the hundredth page costs the same as the first
             try:
                 all_attendance_qs = AttendanceRecord.objects.filter(
                     employee=request.user.employee
-                ).order_by('-date')
+                )
 
-                # page and page_size come from query params; defaults: page 1, 10 items/page
-                page = request.GET.get('attendance_page', 1)
+                # page_size comes from query params; default 10 items/page
                 try:
                     page_size = int(request.GET.get('attendance_page_size', 10))
                     if page_size <= 0:
@@ -186,30 +237,26 @@ def dashboard_home(request):
                 except (ValueError, TypeError):
                     page_size = 10
 
-                paginator = Paginator(all_attendance_qs, page_size)
                 try:
-                    attendance_page = paginator.page(page)
-                except PageNotAnInteger:
-                    attendance_page = paginator.page(1)
-                except EmptyPage:
-                    attendance_page = paginator.page(paginator.num_pages)
-
-                attendance_paginator = paginator
+                    attendance_page = keyset_page(
+                        all_attendance_qs, ['-date', '-attendance_id'], page_size,
+                        after=request.GET.get('attendance_after'), before=request.GET.get('attendance_before')
+                    )
+                except ValueError:
+                    # A mangled cursor just starts over from the newest records
+                    attendance_page = keyset_page(all_attendance_qs, ['-date', '-attendance_id'], page_size)
 
             except Exception as e:
-                print("DEBUG: Error paginating attendance:", e)
+                logger.error("Error paginating attendance: %s", e)
                 attendance_page = None
-                attendance_paginator = None
 
     # Check if supervisor needs password reset
     if user_is_manager and getattr(request.user, 'is_first_login', False):
         show_password_reset = True
         password_reset_form = SupervisorPasswordResetForm(user=request.user)
 
-    # KPI data
-    if user_is_manager:
-        kpi_data = get_team_kpis(request.user)
-    elif getattr(request.user, 'employee', None):
+    # KPI data (a manager's came from the team cache with team_performance)
+    if not user_is_manager and getattr(request.user, 'employee', None):
         employee = request.user.employee
         kpi_data = {
             'attendance_rate': calculate_attendance_rate(employee),
@@ -233,9 +280,7 @@ def dashboard_home(request):
         'selected_status': request.GET.get('status', ''),
         # Paginated attendance context
         'attendance_page': attendance_page,
-        'attendance_paginator': attendance_paginator,
         'attendance_page_size': request.GET.get('attendance_page_size', 10),
-        'attendance_page_number': request.GET.get('attendance_page', 1),
         'employee': getattr(request.user, 'employee', None),
         'evaluations': evaluations,
     }
@@ -268,7 +313,7 @@ def employee_performance_api(request, employee_id):
         # Get recent evaluations
         recent_evaluations = Evaluation.objects.filter(
             employee=employee
-        ).order_by('-evaluation_date')[:5]
+        ).prefetch_related('kpi_scores__kpi').order_by('-evaluation_date')[:5]
         
         for evaluation in recent_evaluations:
             performance_data['recent_evaluations'].append({
@@ -322,7 +367,7 @@ def team_kpi_api(request):
         if request.user.role.role_id != 302:  # Only managers can access
             return JsonResponse({'error': 'Unauthorized'}, status=403)
         
-        team_data = get_team_kpis(request.user)
+        team_data = get_cached_team_kpis(request.user)
         return JsonResponse(team_data)
         
     except Exception as e:
@@ -352,16 +397,8 @@ def search_employees_api(request):
             accounts__role__role_id=301  # exclude other admins
         ).distinct()
         
-        if search_query:
-            employees = employees.filter(
-                Q(first_name__icontains=search_query) |
-                Q(last_name__icontains=search_query) |
-                Q(department__icontains=search_query) |
-                Q(position__icontains=search_query) |
-                Q(email_address__icontains=search_query)
-            )
-        
-        employees = employees[:50]
+        # Ranked prefix/typo matching through the search index (core.search), best match first
+        employees = search_employees(employees, search_query, 50)
         
         employee_data = []
         for employee in employees:
@@ -397,55 +434,60 @@ def add_employees_to_team_api(request):
             added_employees = []
             failed_employees = []
             
+            # Load the selected employees and this manager's existing memberships up front
+            # so the request costs the same few queries however many employees are picked
+            employees = Employee.objects.in_bulk([
+                employee_id for employee_id in employee_ids if str(employee_id).isdigit()
+            ])
+            memberships = {
+                member.employee_id: member
+                for member in TeamMember.objects.filter(manager=request.user, employee_id__in=employees)
+            }
+            
+            to_create = []
+            to_reactivate = []
             for employee_id in employee_ids:
-                try:
-                    employee = Employee.objects.get(id=employee_id)
-                    
-                    # check if employee is already active in team
-                    if TeamMember.objects.filter(manager=request.user, employee=employee, is_active=True).exists():
-                        failed_employees.append({
-                            'id': employee_id,
-                            'name': f"{employee.first_name} {employee.last_name}",
-                            'error': 'Already in team'
-                        })
-                        continue
-                    
-                    # check if inactive record exists, reactivate it
-                    existing_inactive_member = TeamMember.objects.filter(
-                        manager=request.user, 
-                        employee=employee, 
-                        is_active=False
-                    ).first()
-                    
-                    if existing_inactive_member:
-                        # reactivate the existing record
-                        existing_inactive_member.is_active = True
-                        existing_inactive_member.save()
-                        team_member = existing_inactive_member
-                    else:
-                        # create new record
-                        team_member = TeamMember.objects.create(
-                            manager=request.user,
-                            employee=employee
-                        )
-                    
-                    added_employees.append({
-                        'id': employee_id,
-                        'name': f"{employee.first_name} {employee.last_name}"
-                    })
-                    
-                except Employee.DoesNotExist:
+                employee = employees.get(int(employee_id)) if str(employee_id).isdigit() else None
+                if employee is None:
                     failed_employees.append({
                         'id': employee_id,
                         'name': 'Unknown',
                         'error': 'Employee not found'
                     })
-                except Exception as e:
+                    continue
+                
+                member = memberships.get(employee.id)
+                # check if employee is already active in team (or was listed twice)
+                if member is not None and (member.is_active or member in to_reactivate):
                     failed_employees.append({
                         'id': employee_id,
-                        'name': f"{employee.first_name} {employee.last_name}" if 'employee' in locals() else 'Unknown',
-                        'error': str(e)
+                        'name': f"{employee.first_name} {employee.last_name}",
+                        'error': 'Already in team'
                     })
+                    continue
+                
+                if member is not None:
+                    # reactivate the existing record (as a fresh add, so delta syncs send all their tasks)
+                    member.is_active = True
+                    member.added_date = timezone.now()
+                    to_reactivate.append(member)
+                else:
+                    # create new record
+                    member = TeamMember(manager=request.user, employee=employee)
+                    memberships[employee.id] = member
+                    to_create.append(member)
+                
+                added_employees.append({
+                    'id': employee_id,
+                    'name': f"{employee.first_name} {employee.last_name}"
+                })
+            
+            if to_create or to_reactivate:
+                with transaction.atomic():
+                    TeamMember.objects.bulk_create(to_create)
+                    TeamMember.objects.bulk_update(to_reactivate, ['is_active', 'added_date'])
+                    # bulk writes skip the TeamMember signals
+                    invalidate_team(request.user.pk)
             
             return JsonResponse({
                 'success': True,
@@ -460,6 +502,8 @@ def add_employees_to_team_api(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=team_members_etag)
 def get_team_members_api(request):
     """API endpoint to get current team members"""
     try:
@@ -480,7 +524,8 @@ def get_team_members_api(request):
                 'department': employee.department,
                 'position': employee.position,
                 'email': employee.email_address,
-                'added_date': member.added_date
+                'added_date': member.added_date,
+                'last_evaluation_date': employee.last_evaluation_date
             })
         
         return JsonResponse({'team_members': team_data})
@@ -510,7 +555,7 @@ def get_employee_completed_tasks_api(request, employee_id):
             employee=employee,
             status='Completed',  # Only 'Completed' tasks
             review_status='Pending Review'  # Only tasks pending review
-        ).order_by('-completed_date', '-created_date')
+        ).select_related('reviewed_by__employee').order_by('-completed_date', '-created_date')
         
         tasks_data = []
         for task in completed_tasks:
@@ -546,15 +591,13 @@ def employee_performance_modal(request, employee_id):
         if request.user.role.role_id != 302:
             return JsonResponse({'error': 'Unauthorized'}, status=403)
         
-        employee = Employee.objects.get(id=employee_id)
+        employee = Employee.objects.select_related('last_evaluation').get(id=employee_id)
 
         # Use REAL-TIME compliance rate for dashboard display
         real_time_compliance_rate = get_employee_compliance_rate(employee, real_time=True)
         
         # Get last evaluation compliance rate for comparison
-        last_evaluation = Evaluation.objects.filter(
-            employee=employee
-        ).order_by('-evaluation_date').first()
+        last_evaluation = employee.last_evaluation
 
         last_eval_compliance_rate = last_evaluation.compliance_rate if last_evaluation else None
         
@@ -571,15 +614,15 @@ def employee_performance_modal(request, employee_id):
             tasks = BacklogItem.objects.filter(employee=employee)
             period_note = "all time"
         
-        # Calculate current period task statistics
-        task_stats = {
-            'total_tasks': tasks.count(),
-            'accepted_tasks': tasks.filter(Q(status='Accepted') | Q(review_status='Accepted')).distinct().count(),
-            'completed_pending': tasks.filter(status='Completed', review_status='Pending Review').count(),
-            'rejected_tasks': tasks.filter(review_status='Rejected').count(),
-            'in_progress': tasks.filter(status='In Progress').count(),
-            'not_started': tasks.filter(status='Not Started').count(),
-        }
+        # Calculate current period task statistics in one query
+        task_stats = tasks.aggregate(
+            total_tasks=Count('backlog_id'),
+            accepted_tasks=Count('backlog_id', filter=Q(status='Accepted') | Q(review_status='Accepted')),
+            completed_pending=Count('backlog_id', filter=Q(status='Completed', review_status='Pending Review')),
+            rejected_tasks=Count('backlog_id', filter=Q(review_status='Rejected')),
+            in_progress=Count('backlog_id', filter=Q(status='In Progress')),
+            not_started=Count('backlog_id', filter=Q(status='Not Started')),
+        )
         
         # Calculate current period compliance rate
         if task_stats['total_tasks'] > 0:
@@ -608,7 +651,7 @@ def employee_performance_modal(request, employee_id):
         # recent evaluations
         recent_evaluations = Evaluation.objects.filter(
             employee=employee
-        ).order_by('-evaluation_date')[:5]
+        ).prefetch_related('kpi_scores__kpi').order_by('-evaluation_date')[:5]
         
         for evaluation in recent_evaluations:
             performance_data['recent_evaluations'].append({
@@ -645,7 +688,7 @@ def employee_performance_modal(request, employee_id):
         completed_tasks = BacklogItem.objects.filter(
             employee=employee,
             status__in=['Completed', 'Accepted']
-        ).order_by('-completed_date', '-created_date')[:10]
+        ).select_related('reviewed_by__employee').order_by('-completed_date', '-created_date')[:10]
         
         for task in completed_tasks:
             performance_data['completed_tasks'].append({
@@ -684,9 +727,7 @@ def employee_performance_modal(request, employee_id):
     except Employee.DoesNotExist:
         return JsonResponse({'error': 'Employee not found'}, status=404)
     except Exception as e:
-        print(f"Error in employee_performance_modal: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in employee_performance_modal: %s", e)
         return JsonResponse({'error': str(e)}, status=500)
 
 @login_required
@@ -724,7 +765,8 @@ def review_task_api(request, task_id):
             task.reviewed_by = request.user
             task.reviewed_at = timezone.now()
             task.review_notes = review_notes
-            task.save()
+            with transaction.atomic():
+                task.save()
             
             return JsonResponse({
                 'success': True,
@@ -745,7 +787,8 @@ def review_task_api(request, task_id):
             task.reviewed_at = timezone.now()
             task.review_notes = review_notes
             task.completed_date = None  # reset completed date
-            task.save()
+            with transaction.atomic():
+                task.save()
             
             return JsonResponse({
                 'success': True,
@@ -762,7 +805,7 @@ def review_task_api(request, task_id):
     except BacklogItem.DoesNotExist:
         return JsonResponse({'error': 'Task not found'}, status=404)
     except Exception as e:
-        print("Error in review_task_api:", str(e))
+        logger.error("Error in review_task_api: %s", e)
         return JsonResponse({'error': str(e)}, status=500)
 
 @login_required
@@ -807,14 +850,30 @@ def remove_employee_from_team_api(request, employee_id):
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=employee_tasks_etag)
 def get_employee_tasks_api(request):
-    """API endpoint for employee to get their assigned tasks"""
+    """
+    API endpoint for employee to get their assigned tasks.
+
+    Pass the returned `cursor` back as `since` to get only the tasks changed
+    after it plus the ids of deleted ones (`full` is false). Without `since`,
+    or with one too old to sync from, the whole list comes back with `full` true.
+    """
     try:
         employee = request.user.employee
         
+        try:
+            since = parse_sync_cursor(request.GET.get('since'))
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        cursor = make_sync_cursor(timezone.now())
+        
         tasks = BacklogItem.objects.filter(
             employee=employee
         ).order_by('-created_date', 'priority')
+        if since:
+            tasks = tasks.filter(updated_at__gt=since)
         
         task_data = []
         for task in tasks:
@@ -835,7 +894,12 @@ def get_employee_tasks_api(request):
                 'review_notes': task.review_notes if task.review_notes else None,
             })
         
-        return JsonResponse({'tasks': task_data})
+        return JsonResponse({
+            'tasks': task_data,
+            'deleted': get_deleted_task_ids([employee.id], since) if since else [],
+            'full': since is None,
+            'cursor': cursor
+        })
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -877,7 +941,8 @@ def update_task_status_api(request, task_id):
             task.completed_date = None
             task.review_status = 'Pending Review'  # reset review status if not completed
             
-        task.save()
+        with transaction.atomic():
+            task.save()
         
         return JsonResponse({
             'success': True,
@@ -898,14 +963,14 @@ def update_task_status_api(request, task_id):
 def assign_task_api(request):
     """API endpoint for supervisor to assign tasks to employees"""
     try:
-        print("DEBUG: assign_task_api called")
-        print("DEBUG: User role:", request.user.role.role_id)
+        logger.debug("assign_task_api called")
+        logger.debug("User role: %s", request.user.role.role_id)
         
         if request.user.role.role_id != 302:
             return JsonResponse({'error': 'Unauthorized'}, status=403)
         
         if request.method != 'POST':
-            print("DEBUG: Wrong method - got", request.method)
+            logger.debug("Wrong method - got %s", request.method)
             return JsonResponse({'error': 'Invalid request method'}, status=400)
         
         employee_id = request.POST.get('employee_id')
@@ -913,11 +978,11 @@ def assign_task_api(request):
         due_date = request.POST.get('due_date')
         priority = request.POST.get('priority', 'Medium')
         
-        print("DEBUG: Form data - employee_id:", employee_id, "description:", task_description, "due_date:", due_date)
+        logger.debug("Form data - employee_id: %s description: %s due_date: %s", employee_id, task_description, due_date)
         
         # Validate required fields
         if not all([employee_id, task_description, due_date]):
-            print("DEBUG: Missing required fields")
+            logger.debug("Missing required fields")
             return JsonResponse({'error': 'Missing required fields'}, status=400)
         
         # Verify employee is in supervisor's team
@@ -928,19 +993,20 @@ def assign_task_api(request):
                 is_active=True
             )
             employee = team_member.employee
-            print("DEBUG: Employee found:", employee.first_name, employee.last_name)
+            logger.debug("Employee found: %s %s", employee.first_name, employee.last_name)
         except TeamMember.DoesNotExist:
-            print("DEBUG: Employee not in team")
+            logger.debug("Employee not in team")
             return JsonResponse({'error': 'Employee not found in your team'}, status=403)
         
         # Create the task with 'Not Started' status
-        task = BacklogItem.objects.create(
-            employee=employee,
-            task_description=task_description,
-            due_date=due_date,
-            priority=priority,
-            status='Not Started'
-        )
+        with transaction.atomic():
+            task = BacklogItem.objects.create(
+                employee=employee,
+                task_description=task_description,
+                due_date=due_date,
+                priority=priority,
+                status='Not Started'
+            )
         
         
         # Format the due_date for response
@@ -963,7 +1029,7 @@ def assign_task_api(request):
         })
         
     except Exception as e:
-        print("DEBUG: Error in assign_task_api:", str(e))
+        logger.error("Error in assign_task_api: %s", e)
         return JsonResponse({'error': str(e)}, status=500)
 
 @login_required
@@ -993,7 +1059,7 @@ def upload_task_file_api(request, task_id):
                     try:
                         cloudinary.uploader.destroy(task.task_file.public_id)
                     except Exception as e:
-                        print("Error deleting Cloudinary file:", e)
+                        logger.error("Error deleting Cloudinary file: %s", e)
 
                 # Reset database fields
                 task.task_file = None
@@ -1025,7 +1091,7 @@ def upload_task_file_api(request, task_id):
             return JsonResponse({'error': 'Invalid file upload'}, status=400)
             
     except Exception as e:
-        print("Error in upload_task_file_api:", str(e))
+        logger.error("Error in upload_task_file_api: %s", e)
         return JsonResponse({'error': str(e)}, status=500)
 
 @login_required
@@ -1070,52 +1136,146 @@ def get_task_file_info_api(request, task_id):
     except BacklogItem.DoesNotExist:
         return JsonResponse({'error': 'Task not found'}, status=404)
     except Exception as e:
-        print("Error in get_task_file_info_api:", str(e))
+        logger.error("Error in get_task_file_info_api: %s", e)
         return JsonResponse({'error': str(e)}, status=500)
 
+# Sort keys get_team_tasks_api accepts (prefix with '-' for descending). Priority sorts by
+# urgency rather than alphabetically; backlog_id breaks ties so pages never overlap.
+PRIORITY_RANK = Case(
+    When(priority='Low', then=Value(0)),
+    When(priority='Medium', then=Value(1)),
+    When(priority='High', then=Value(2)),
+    When(priority='Critical', then=Value(3)),
+    default=Value(1),
+)
+TEAM_TASK_SORTS = {
+    'created_date': 'created_date',
+    'due_date': 'due_date',
+    'priority': 'priority_rank',
+    'status': 'status',
+    'review_status': 'review_status',
+    'updated_at': 'updated_at',
+}
+TEAM_TASKS_PER_PAGE = 50
+TEAM_TASKS_MAX_PER_PAGE = 200
+
+
+def filter_team_tasks(tasks, params):
+    """Apply the status/review_status/priority/due-date/sort query parameters; raises ValueError on bad input"""
+    for field in ('status', 'review_status', 'priority'):
+        values = [value for value in params.getlist(field) if value]
+        if values:
+            tasks = tasks.filter(**{f'{field}__in': values})
+
+    for param, lookup in (('due_after', 'due_date__gte'), ('due_before', 'due_date__lte')):
+        if params.get(param):
+            day = parse_date(params[param])
+            if day is None:
+                raise ValueError(f"Invalid {param}; expected YYYY-MM-DD")
+            tasks = tasks.filter(**{lookup: day})
+
+    sort = params.get('sort') or '-created_date'
+    field = TEAM_TASK_SORTS.get(sort.lstrip('-'))
+    if field is None:
+        raise ValueError(f"Invalid sort; choose from {', '.join(TEAM_TASK_SORTS)}")
+    if field == 'priority_rank':
+        tasks = tasks.annotate(priority_rank=PRIORITY_RANK)
+    direction = '-' if sort.startswith('-') else ''
+    return tasks.order_by(f'{direction}{field}', f'{direction}backlog_id')
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=team_tasks_etag)
 def get_team_tasks_api(request):
-    """API endpoint for supervisor to get all team tasks"""
+    """
+    API endpoint for supervisor to get all team tasks, a page at a time.
+
+    Filters: status, review_status and priority (repeatable), due_after/due_before
+    (YYYY-MM-DD) and employee (a member's id). `sort` is one of TEAM_TASK_SORTS,
+    '-' for descending; the default is newest first. page and per_page
+    (at most TEAM_TASKS_MAX_PER_PAGE) pick the page.
+
+    Accepts the same `since` cursor as get_employee_tasks_api. Every current
+    member is always listed, so clients drop members (and their tasks) that
+    are missing; in a delta only changed tasks are listed, except for members
+    added after the cursor, who come with all their tasks. Keep the cursor of
+    the first page when paging through a sync.
+    """
     try:
         if request.user.role.role_id != 302:
             return JsonResponse({'error': 'Unauthorized'}, status=403)
         
-        # Get all active team members
-        team_members = TeamMember.objects.filter(
+        try:
+            since = parse_sync_cursor(request.GET.get('since'))
+            page = int(request.GET.get('page', 1))
+            per_page = min(max(int(request.GET.get('per_page', TEAM_TASKS_PER_PAGE)), 1), TEAM_TASKS_MAX_PER_PAGE)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        cursor = make_sync_cursor(timezone.now())
+        
+        team_members = list(TeamMember.objects.filter(
             manager=request.user, 
             is_active=True
-        ).select_related('employee')
+        ).select_related('employee').order_by('employee__first_name', 'employee__last_name', 'employee_id'))
+        member_ids = [member.employee_id for member in team_members]
+        
+        # One query for the whole team's tasks, grouped by employee below
+        tasks = BacklogItem.objects.filter(employee_id__in=member_ids)
+        if since:
+            new_member_ids = [member.employee_id for member in team_members if member.added_date > since]
+            tasks = tasks.filter(Q(updated_at__gt=since) | Q(employee_id__in=new_member_ids))
+        try:
+            if request.GET.get('employee'):
+                tasks = tasks.filter(employee_id=int(request.GET['employee']))
+            tasks = filter_team_tasks(tasks, request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        
+        paginator = Paginator(tasks, per_page)
+        page_obj = paginator.get_page(page)
+        
+        tasks_by_employee = defaultdict(list)
+        for task in page_obj:
+            tasks_by_employee[task.employee_id].append({
+                'id': task.backlog_id,
+                'description': task.task_description,
+                'due_date': task.due_date,
+                'status': task.status,
+                'priority': task.priority,
+                'created_date': task.created_date,
+                'review_status': task.review_status,
+                'completed_date': task.completed_date,
+
+                
+                'has_file': bool(task.task_file),
+                'file_name': task.file_name,
+                'uploaded_at': task.uploaded_at if task.uploaded_at else None
+            })
         
         team_tasks = []
         for member in team_members:
             employee = member.employee
-            tasks = BacklogItem.objects.filter(employee=employee).order_by('-created_date')
-            
-            employee_tasks = []
-            for task in tasks:
-                employee_tasks.append({
-                    'id': task.backlog_id,
-                    'description': task.task_description,
-                    'due_date': task.due_date,
-                    'status': task.status,
-                    'priority': task.priority,
-                    'created_date': task.created_date,
-                    'review_status': task.review_status,
-                    'completed_date': task.completed_date,
-
-                    
-                    'has_file': bool(task.task_file),
-                    'file_name': task.file_name,
-                    'uploaded_at': task.uploaded_at if task.uploaded_at else None
-                })
-            
             team_tasks.append({
                 'employee_id': employee.id,
                 'employee_name': f"{employee.first_name} {employee.last_name}",
-                'tasks': employee_tasks
+                'tasks': tasks_by_employee[employee.id]
             })
         
-        return JsonResponse({'team_tasks': team_tasks})
+        return JsonResponse({
+            'team_tasks': team_tasks,
+            'deleted': get_deleted_task_ids(member_ids, since) if since else [],
+            'full': since is None,
+            'cursor': cursor,
+            'pagination': {
+                'page': page_obj.number,
+                'per_page': per_page,
+                'total_pages': paginator.num_pages,
+                'total_count': paginator.count,
+                'has_next': page_obj.has_next(),
+                'has_previous': page_obj.has_previous()
+            }
+        })
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -1139,7 +1299,8 @@ def create_evaluation_api(request, employee_id):
         ).exists():
             return JsonResponse({'error': 'Unauthorized'}, status=403)
         
-        employee = Employee.objects.get(id=employee_id)
+        # The previous evaluation is joined in for the new one's summary
+        employee = Employee.objects.select_related('last_evaluation').get(id=employee_id)
         
         if request.method == 'POST':
             # Parse evaluation data
@@ -1158,142 +1319,27 @@ def create_evaluation_api(request, employee_id):
             
             period = data.get('period', '')
             
-            # Get last evaluation date
-            last_evaluation = Evaluation.objects.filter(
-                employee=employee
-            ).order_by('-evaluation_date').first()
-            
-            # CALCULATE ATTENDANCE FOR PERIOD
-            if last_evaluation:
-                attendance_records = AttendanceRecord.objects.filter(
-                    employee=employee,
-                    date__gt=last_evaluation.evaluation_date,
-                    date__lte=evaluation_date
-                )
-                attendance_period_note = f"since last evaluation ({last_evaluation.evaluation_date})"
-            else:
-                attendance_records = AttendanceRecord.objects.filter(
-                    employee=employee,
-                    date__lte=evaluation_date
-                )
-                attendance_period_note = "all time (first evaluation)"
-            
-            attendance_stats = {
-                'total_days': attendance_records.count(),
-                'present_days': attendance_records.filter(status='Present').count(),
-                'absent_days': attendance_records.filter(status='Absent').count(),
-                'late_days': attendance_records.filter(status='Late').count(),
-            }
-            
-            attendance_rate = 0.0
-            if attendance_stats['total_days'] > 0:
-                attendance_rate = round((attendance_stats['present_days'] / attendance_stats['total_days']) * 100, 2)
-            
-            # CALCULATE TASK COMPLIANCE FOR PERIOD
-            if last_evaluation:
-                tasks_for_evaluation = BacklogItem.objects.filter(
-                    employee=employee,
-                    created_date__gt=last_evaluation.evaluation_date,
-                    created_date__lte=evaluation_date
-                )
-                task_period_note = f"since last evaluation ({last_evaluation.evaluation_date})"
-            else:
-                tasks_for_evaluation = BacklogItem.objects.filter(
-                    employee=employee,
-                    created_date__lte=evaluation_date
-                )
-                task_period_note = "all time (first evaluation)"
-            
-            task_stats = {
-                'total_tasks': tasks_for_evaluation.count(),
-                'accepted_tasks': tasks_for_evaluation.filter(Q(status='Accepted') | Q(review_status='Accepted')).distinct().count(),
-                'completed_pending': tasks_for_evaluation.filter(status='Completed', review_status='Pending Review').count(),
-                'rejected_tasks': tasks_for_evaluation.filter(review_status='Rejected').count(),
-                'in_progress': tasks_for_evaluation.filter(status='In Progress').count(),
-                'not_started': tasks_for_evaluation.filter(status='Not Started').count(),
-            }
-            
-            compliance_rate = 0.0
-            if task_stats['total_tasks'] > 0:
-                compliance_rate = round((task_stats['accepted_tasks'] / task_stats['total_tasks']) * 100, 2)
-            
-            # CALCULATE OVERALL PERFORMANCE
-            overall_performance = round(
-                (attendance_rate * 0.4) +  # 40% weight for attendance
-                (compliance_rate * 0.6)    # 60% weight for compliance
-            , 2)
-            
-            # Create evaluation with all metrics
-            evaluation = Evaluation.objects.create(
-                employee=employee,
+            # Stats, evaluation row and counted/evaluated marking in one transaction
+            evaluation, stats = create_evaluation(
+                employee,
                 created_by=request.user,
                 evaluation_date=evaluation_date,
                 period=period,
-                compliance_rate=compliance_rate,
-                attendance_rate=attendance_rate,
-                overall_performance=overall_performance,
                 notes=data.get('notes', '')
             )
             
-            # Add comprehensive stats to notes
-            stats_summary = f"\n\nPERFORMANCE EVALUATION SUMMARY\n"
-            stats_summary += f"=========================================\n"
-            stats_summary += f"OVERALL PERFORMANCE: {overall_performance}%\n"
-            stats_summary += f"=========================================\n\n"
-            
-            stats_summary += f"ATTENDANCE ({attendance_period_note}):\n"
-            stats_summary += f"-----------------------------------------\n"
-            stats_summary += f"Attendance Rate: {attendance_rate}%\n"
-            stats_summary += f"Total Days: {attendance_stats['total_days']}\n"
-            stats_summary += f"Present: {attendance_stats['present_days']}\n"
-            stats_summary += f"Absent: {attendance_stats['absent_days']}\n"
-            stats_summary += f"Late: {attendance_stats['late_days']}\n\n"
-            
-            stats_summary += f"TASK COMPLIANCE ({task_period_note}):\n"
-            stats_summary += f"-----------------------------------------\n"
-            stats_summary += f"Compliance Rate: {compliance_rate}%\n"
-            stats_summary += f"Total Tasks: {task_stats['total_tasks']}\n"
-            stats_summary += f"Accepted/Approved: {task_stats['accepted_tasks']}\n"
-            stats_summary += f"Completed (Pending Review): {task_stats['completed_pending']}\n"
-            stats_summary += f"Rejected: {task_stats['rejected_tasks']}\n"
-            stats_summary += f"In Progress: {task_stats['in_progress']}\n"
-            stats_summary += f"Not Started: {task_stats['not_started']}\n\n"
-            
-            if last_evaluation:
-                stats_summary += f"COMPARISON WITH PREVIOUS EVALUATION:\n"
-                stats_summary += f"Previous Date: {last_evaluation.evaluation_date}\n"
-                stats_summary += f"Previous Overall: {last_evaluation.overall_performance}%\n"
-                stats_summary += f"Previous Attendance: {last_evaluation.attendance_rate}%\n"
-                stats_summary += f"Previous Compliance: {last_evaluation.compliance_rate}%\n"
-            
-            stats_summary += f"========================================="
-            
-            if not evaluation.notes:
-                evaluation.notes = ""
-            evaluation.notes += stats_summary
-            evaluation.save()
-            
-            # MARK DATA AS EVALUATED (for resetting dashboard rates)
-            # This prevents evaluated data from being counted again in real-time rates
-            
-            # Mark attendance records as counted
-            attendance_records.update(is_counted=True)
-            
-            # Mark tasks as evaluated
-            tasks_for_evaluation.update(is_evaluated=True)
-            
             return JsonResponse({
                 'success': True,
                 'message': f'Evaluation created for {employee.first_name} {employee.last_name}',
                 'evaluation_id': evaluation.evaluation_id,
                 'evaluation_date': evaluation.evaluation_date.strftime('%Y-%m-%d'),
-                'overall_performance': overall_performance,
-                'attendance_rate': attendance_rate,
-                'compliance_rate': compliance_rate,
-                'attendance_stats': attendance_stats,
-                'task_stats': task_stats,
-                'tasks_evaluated': tasks_for_evaluation.count(),
-                'days_evaluated': attendance_stats['total_days']
+                'overall_performance': stats['overall_performance'],
+                'attendance_rate': stats['attendance_rate'],
+                'compliance_rate': stats['compliance_rate'],
+                'attendance_stats': stats['attendance_stats'],
+                'task_stats': stats['task_stats'],
+                'tasks_evaluated': stats['tasks_evaluated'],
+                'days_evaluated': stats['days_evaluated']
             })
         
         return JsonResponse({'error': 'Invalid request method'}, status=400)
@@ -1301,12 +1347,76 @@ def create_evaluation_api(request, employee_id):
     except Employee.DoesNotExist:
         return JsonResponse({'error': 'Employee not found'}, status=404)
     except Exception as e:
-        print(f"Error creating evaluation: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error creating evaluation: %s", e)
         return JsonResponse({'error': str(e)}, status=500)
 
 @login_required
+@csrf_exempt
+def create_team_evaluations_api(request):
+    """Evaluate several team members (or the whole team) for one period"""
+    try:
+        if request.user.role.role_id != 302:
+            return JsonResponse({'error': 'Unauthorized'}, status=403)
+        
+        if request.method != 'POST':
+            return JsonResponse({'error': 'Invalid request method'}, status=400)
+        
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+        
+        evaluation_date_str = data.get('evaluation_date')
+        try:
+            evaluation_date = datetime.strptime(evaluation_date_str, '%Y-%m-%d').date()
+        except (ValueError, TypeError):
+            evaluation_date = timezone.now().date()
+        
+        team_employee_ids = set(TeamMember.objects.filter(
+            manager=request.user,
+            is_active=True
+        ).values_list('employee_id', flat=True))
+        
+        # No employee_ids means the whole team
+        requested_ids = data.get('employee_ids')
+        if requested_ids is None:
+            requested_ids = sorted(team_employee_ids)
+        
+        employee_ids = []
+        failed_employees = []
+        for employee_id in requested_ids:
+            try:
+                employee_id = int(employee_id)
+            except (ValueError, TypeError):
+                failed_employees.append({'id': employee_id, 'error': 'Invalid employee id'})
+                continue
+            if employee_id not in team_employee_ids:
+                failed_employees.append({'id': employee_id, 'error': 'Employee not found in your team'})
+                continue
+            employee_ids.append(employee_id)
+        
+        evaluated = create_evaluations_batch(
+            employee_ids,
+            created_by=request.user,
+            evaluation_date=evaluation_date,
+            period=data.get('period', ''),
+            notes=data.get('notes', '')
+        )
+        
+        return JsonResponse({
+            'success': True,
+            'evaluated': evaluated,
+            'failed': failed_employees,
+            'message': f'Created {len(evaluated)} evaluations'
+        })
+        
+    except Exception as e:
+        logger.error("Error creating team evaluations: %s", e)
+        return JsonResponse({'error': str(e)}, status=500)
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=kpis_etag)
 def get_available_kpis_api(request):
     """API endpoint to get available KPIs for evaluation"""
     try:
@@ -1318,7 +1428,7 @@ def get_available_kpis_api(request):
         return JsonResponse({'kpis': list(kpis)})
         
     except Exception as e:
-        print(f"Error getting KPIs: {e}")
+        logger.error("Error getting KPIs: %s", e)
         return JsonResponse({'error': str(e)}, status=500)
 
 @login_required
@@ -1356,11 +1466,9 @@ def get_last_evaluation_api(request, employee_id):
         if request.user.role.role_id != 302:
             return JsonResponse({'error': 'Unauthorized'}, status=403)
         
-        employee = Employee.objects.get(id=employee_id)
+        employee = Employee.objects.select_related('last_evaluation').get(id=employee_id)
         
-        last_evaluation = Evaluation.objects.filter(
-            employee=employee
-        ).order_by('-evaluation_date').first()
+        last_evaluation = employee.last_evaluation
         
         response_data = {'last_evaluation': None}
         
@@ -1403,32 +1511,14 @@ def get_employee_attendance_stats_api(request, employee_id):
         ).exists():
             return JsonResponse({'error': 'Unauthorized'}, status=403)
         
-        # Get last evaluation date
-        last_evaluation = Evaluation.objects.filter(
-            employee=employee
-        ).order_by('-evaluation_date').first()
-        
-        # Calculate attendance for period since last evaluation
-        today = timezone.now().date()
-        if last_evaluation:
-            # Attendance since last evaluation
-            attendance_records = AttendanceRecord.objects.filter(
-                employee=employee,
-                date__gt=last_evaluation.evaluation_date,
-                date__lte=today
-            )
-        else:
-            # All attendance records (first evaluation)
-            attendance_records = AttendanceRecord.objects.filter(
-                employee=employee,
-                date__lte=today
-            )
-        
+        # Attendance since last evaluation (or all of it before a first evaluation), from the daily counters
+        start_date, end_date = get_evaluation_window(employee)
+        totals = get_window_totals(employee.id, start_date, end_date)
         attendance_stats = {
-            'total_days': attendance_records.count(),
-            'present_days': attendance_records.filter(status='Present').count(),
-            'absent_days': attendance_records.filter(status='Absent').count(),
-            'late_days': attendance_records.filter(status='Late').count(),
+            'total_days': totals['total_days'],
+            'present_days': totals['present_days'],
+            'absent_days': totals['absent_days'],
+            'late_days': totals['late_days'],
         }
         
         attendance_rate = 0.0
@@ -1438,10 +1528,134 @@ def get_employee_attendance_stats_api(request, employee_id):
         return JsonResponse({
             'attendance_rate': attendance_rate,
             'attendance_stats': attendance_stats,
-            'last_evaluation_date': last_evaluation.evaluation_date if last_evaluation else None
+            'last_evaluation_date': employee.last_evaluation_date
         })
         
     except Employee.DoesNotExist:
         return JsonResponse({'error': 'Employee not found'}, status=404)
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'error': str(e)}, status=500)
+
+def export_response(lines, export_format, name):
+    """Stream an export to the browser as a download"""
+    response = StreamingHttpResponse(lines, content_type=EXPORT_FORMATS[export_format])
+    filename = f"{name}-{timezone.now().date():%Y-%m-%d}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-store'
+    return response
+
+@login_required
+def export_team_performance_api(request):
+    """Download the manager's active team with current rates, as ?format=csv (default) or ndjson"""
+    try:
+        if request.user.role.role_id != 302:
+            return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return JsonResponse({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}, status=400)
+
+        employees = Employee.objects.filter(id__in=TeamMember.objects.filter(
+            manager=request.user,
+            is_active=True
+        ).values('employee_id'))
+        lines = export_lines(export_format, PERFORMANCE_COLUMNS, performance_rows(employees))
+        return export_response(lines, export_format, 'team-performance')
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+@login_required
+def export_team_evaluations_api(request):
+    """Download the evaluation history of the manager's active team with KPI scores, optionally ?since=/&until= dates"""
+    try:
+        if request.user.role.role_id != 302:
+            return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return JsonResponse({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}, status=400)
+
+        dates = {}
+        for param in ('since', 'until'):
+            value = request.GET.get(param)
+            dates[param] = parse_date(value) if value else None
+            if value and not dates[param]:
+                return JsonResponse({'error': f"{param} must be YYYY-MM-DD"}, status=400)
+
+        employee_ids = TeamMember.objects.filter(
+            manager=request.user,
+            is_active=True
+        ).values('employee_id')
+        lines = export_lines(export_format, EVALUATION_COLUMNS, evaluation_rows(employee_ids, **dates))
+        return export_response(lines, export_format, 'team-evaluations')
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+TREND_DEFAULT_DAYS = 365
+TREND_DEFAULT_POINTS = 60
+TREND_MAX_POINTS = 400
+TREND_MAX_DAYS = 3660  # ten years
+
+@login_required
+def performance_trend_api(request):
+    """
+    Attendance, compliance and overall score over time, from PerformanceSnapshot rows.
+
+    ?scope=employee&employee=<id> (a member of the manager's active team),
+    ?scope=team (the whole active team) or ?scope=department&department=<name>
+    (the active team's members in that department); ?start=/&end= dates (default
+    the last year), ?points= budget and an optional ?granularity= of day, week or month.
+    """
+    try:
+        if request.user.role.role_id != 302:
+            return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+        team = TeamMember.objects.filter(manager=request.user, is_active=True)
+        scope = request.GET.get('scope', 'team')
+        if scope == 'employee':
+            try:
+                employee = Employee.objects.get(id=int(request.GET.get('employee', '')))
+            except (ValueError, Employee.DoesNotExist):
+                return JsonResponse({'error': 'Employee not found'}, status=404)
+            if not team.filter(employee=employee).exists():
+                return JsonResponse({'error': 'Employee not found in your team'}, status=403)
+            employee_ids = [employee.id]
+            label = f"{employee.first_name} {employee.last_name}"
+        elif scope == 'team':
+            employee_ids = team.values('employee_id')
+            label = 'My team'
+        elif scope == 'department':
+            label = request.GET.get('department', '')
+            if not label:
+                return JsonResponse({'error': 'department is required'}, status=400)
+            employee_ids = team.filter(employee__department=label).values('employee_id')
+        else:
+            return JsonResponse({'error': 'scope must be employee, team or department'}, status=400)
+
+        end = parse_date(request.GET['end']) if request.GET.get('end') else timezone.now().date()
+        start = parse_date(request.GET['start']) if request.GET.get('start') else end - timedelta(days=TREND_DEFAULT_DAYS)
+        if not start or not end or start > end:
+            return JsonResponse({'error': 'start and end must be YYYY-MM-DD, start first'}, status=400)
+        if (end - start).days > TREND_MAX_DAYS:
+            return JsonResponse({'error': f"start and end must be at most {TREND_MAX_DAYS} days apart"}, status=400)
+
+        points = min(max(int(request.GET.get('points', TREND_DEFAULT_POINTS)), 1), TREND_MAX_POINTS)
+        granularity = request.GET.get('granularity') or None
+        if granularity and granularity not in GRANULARITIES:
+            return JsonResponse({'error': f"granularity must be one of {', '.join(GRANULARITIES)}"}, status=400)
+
+        trend = get_performance_trend(employee_ids, start, end, points, granularity)
+        return JsonResponse({
+            'scope': scope,
+            'label': label,
+            'start': start,
+            'end': end,
+            **trend
+        })
+
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
@@ -64,6 +64,7 @@ DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',  # first, so its total covers the rest
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -72,14 +73,15 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    
+    'core.middleware.ViewTimingMiddleware',  # last, so its span is just the view
 ]
 
 ROOT_URLCONF = 'momentum_performance_evaluation_tracker.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that adds render time to the Server-Timing header (core.middleware)
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -98,14 +100,77 @@ WSGI_APPLICATION = 'momentum_performance_evaluation_tracker.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Falls back to a local SQLite file when DATABASE_URL is not set (tests, seeded benchmarks)
+DATABASE_URL = os.getenv('DATABASE_URL') or f"sqlite:///{BASE_DIR / 'db.sqlite3'}"
+
 DATABASES = {
-    'default': dj_database_url.config(
-        default=os.getenv('DATABASE_URL'),
+    'default': dj_database_url.parse(
+        DATABASE_URL,
         conn_max_age=60,
-        ssl_require=True
+        ssl_require=DATABASE_URL.startswith('postgres')
     )
 }
 
+# Per-request query/template/view timings in a Server-Timing header, optionally logged as JSON
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'True') == 'True'
+SERVER_TIMING_LOG = os.getenv('SERVER_TIMING_LOG', 'False') == 'True'
+
+# Logging
+# App loggers log at LOG_LEVEL (INFO by default); set LOG_LEVEL=DEBUG to see the dashboard debug traces
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {
+            'format': '{levelname} {name}: {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'simple',
+        },
+    },
+    'loggers': {
+        'core': {'handlers': ['console'], 'level': LOG_LEVEL, 'propagate': False},
+        'dashboard': {'handlers': ['console'], 'level': LOG_LEVEL, 'propagate': False},
+        'momentum.request': {'handlers': ['console'], 'level': LOG_LEVEL, 'propagate': False},
+    },
+}
+
+# Cache
+# Cache versions invalidate team data and ETags, so every worker must see the same cache.
+# The default is the database cache (run `python manage.py createcachetable` after migrating),
+# whatever DEBUG says; point CACHE_BACKEND/CACHE_LOCATION at e.g. Redis to use something else.
+# A per-process cache such as LocMemCache is only safe with a single worker (see core.checks).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'momentum_cache'),
+    }
+}
+
+# Seconds cached manager dashboard data lives; writes invalidate it immediately via team versions
+TEAM_CACHE_TIMEOUT = int(os.getenv('TEAM_CACHE_TIMEOUT', 300))
+
+# Count team cache hits/misses for `manage.py team_cache_stats`; costs a cache write per dashboard read
+TEAM_CACHE_STATS = os.getenv('TEAM_CACHE_STATS', 'False') == 'True'
+
+# Seconds a worker may reuse an authenticated user (with role and employee) between requests; 0 disables.
+# Saving or deleting an account, role or employee drops cached users (core.backends.forget_principal)
+# only in the process that made the change; other workers keep serving the old role, or a deleted
+# account, until their copy is this many seconds old, so this timeout is the only cross-worker bound.
+PRINCIPAL_CACHE_TIMEOUT = int(os.getenv('PRINCIPAL_CACHE_TIMEOUT', 0))
+
+# Seconds a worker may answer username/email availability from its in-memory sets before reloading them
+AVAILABILITY_RELOAD_SECONDS = int(os.getenv('AVAILABILITY_RELOAD_SECONDS', 60))
+
+# Days deleted tasks are remembered for delta syncs; an older `since` cursor gets a full task list
+TASK_TOMBSTONE_DAYS = int(os.getenv('TASK_TOMBSTONE_DAYS', 30))
+
 AUTHENTICATION_BACKENDS = [
     'core.backends.CustomUserBackend',
     'django.contrib.auth.backends.ModelBackend',
@@ -1,5 +1,8 @@
 class TaskManager {
     constructor() {
+        // Tasks by id and the cursor of the last sync, so reloads only fetch what changed
+        this.tasksById = new Map();
+        this.taskCursor = null;
         this.initialize();
     }
 
@@ -97,7 +100,10 @@ class TaskManager {
     
 
     loadEmployeeTasks() {
-        fetch('/dashboard/api/tasks/employee/')
+        const url = this.taskCursor
+            ? `/dashboard/api/tasks/employee/?since=${encodeURIComponent(this.taskCursor)}`
+            : '/dashboard/api/tasks/employee/';
+        fetch(url)
             .then(response => response.json())
             .then(data => {
                 const tasksList = document.getElementById('tasksList');
@@ -107,12 +113,25 @@ class TaskManager {
                     return;
                 }
 
-                if (!data.tasks || data.tasks.length === 0) {
+                // A full list replaces what we have; a delta only carries changed and deleted tasks
+                if (data.full) {
+                    this.tasksById.clear();
+                }
+                (data.tasks || []).forEach(task => this.tasksById.set(task.id, task));
+                (data.deleted || []).forEach(taskId => this.tasksById.delete(taskId));
+                this.taskCursor = data.cursor;
+
+                // Same order as the API: newest first, then priority
+                const tasks = Array.from(this.tasksById.values()).sort((a, b) =>
+                    b.created_date.localeCompare(a.created_date) || a.priority.localeCompare(b.priority)
+                );
+
+                if (tasks.length === 0) {
                     tasksList.innerHTML = `<div class="empty-message">No tasks assigned.</div>`;
                     return;
                 }
 
-                tasksList.innerHTML = data.tasks.map(task => `
+                tasksList.innerHTML = tasks.map(task => `
                 <div class="task-item" data-task-id="${task.id}">
                     <div class="task-content">
                         <div class="task-description">${task.description}</div>
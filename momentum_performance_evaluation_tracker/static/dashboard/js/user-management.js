@@ -1,9 +1,19 @@
 // User Management Functions
+
+// The directory columns the tables show, so the API leaves out the rest
+const DIRECTORY_FIELDS = 'id,username,employee_name,email,role_id,is_first_login,last_login';
+
+const DIRECTORY_VIEWS = {
+    admin: { role: 'admin', label: 'admins', tableBody: 'adminTableBody', render: 'renderAdmins', pagination: 'adminPagination', searchInput: 'searchAdminInput' },
+    supervisor: { role: 'supervisor', label: 'supervisors', tableBody: 'supervisorTableBody', render: 'renderSupervisors', pagination: 'supervisorPagination', searchInput: 'searchSupervisorInput' },
+    employee: { role: 'employee', label: 'employees', tableBody: 'employeeTableBody', render: 'renderEmployees', pagination: 'employeePagination', searchInput: 'searchEmployeeInput' },
+    all: { role: 'all', label: 'users', tableBody: 'employeeTableBody', render: 'renderAllUsers', pagination: 'employeePagination', searchInput: 'searchEmployeeInput' },
+};
+
 class UserManager {
     constructor() {
-        this.currentAdminPage = 1;
-        this.currentSupervisorPage = 1;
-        this.currentEmployeePage = 1;
+        // Per list: the page shown, its cursors, and the approximate page count from the first page
+        this.directoryState = {};
         this.adminSearchTimeout = null;
         this.supervisorSearchTimeout = null;
         this.employeeSearchTimeout = null;
@@ -120,79 +130,52 @@ class UserManager {
         }
     }
     
-    async loadAdmins(page = 1, search = '') {
+    // All four lists read the user directory (/core/admin/users/), which pages by cursor:
+    // `cursor` is '' for the first page (which also asks for an approximate total) or an
+    // &after=/&before= from the current page
+    async loadDirectory(userType, page = 1, search = '', cursor = '') {
+        const view = DIRECTORY_VIEWS[userType];
         try {
-            this.showLoading('adminTableBody');
+            this.showLoading(view.tableBody);
             
-            const response = await fetch(`/core/admin/get-admins/?page=${page}&search=${encodeURIComponent(search)}`);
+            const totalParam = cursor ? '' : '&include_total=1';
+            const response = await fetch(`/core/admin/users/?role=${view.role}&fields=${DIRECTORY_FIELDS}&search=${encodeURIComponent(search)}${cursor}${totalParam}`);
             const data = await response.json();
             
             if (data.success) {
-                this.renderAdmins(data.admins);
-                this.currentAdminPage = page;
+                const state = this.directoryState[userType] || {};
+                if (!cursor) {
+                    const total = data.pagination.total_count;
+                    state.totalPages = total !== null ? Math.max(1, Math.ceil(total / data.pagination.per_page)) : null;
+                }
+                state.page = page;
+                state.pagination = data.pagination;
+                this.directoryState[userType] = state;
+                this[view.render](data.users);
+                this.renderPagination(view.pagination, { ...data.pagination, page, total_pages: state.totalPages }, userType);
             } else {
-                this.showError('adminTableBody', data.error || 'Failed to load admins');
+                this.showError(view.tableBody, data.error || `Failed to load ${view.label}`);
             }
         } catch (error) {
-            console.error('Error loading admins:', error);
-            this.showError('adminTableBody', 'Network error loading admins');
+            console.error(`Error loading ${view.label}:`, error);
+            this.showError(view.tableBody, `Network error loading ${view.label}`);
         }
     }
     
-    async loadSupervisors(page = 1, search = '') {
-        try {
-            this.showLoading('supervisorTableBody');
-            
-            const response = await fetch(`/core/admin/get-supervisors/?page=${page}&search=${encodeURIComponent(search)}`);
-            const data = await response.json();
-            
-            if (data.success) {
-                this.renderSupervisors(data.supervisors);
-                this.currentSupervisorPage = page;
-            } else {
-                this.showError('supervisorTableBody', data.error || 'Failed to load supervisors');
-            }
-        } catch (error) {
-            console.error('Error loading supervisors:', error);
-            this.showError('supervisorTableBody', 'Network error loading supervisors');
-        }
+    async loadAdmins(page = 1, search = '', cursor = '') {
+        await this.loadDirectory('admin', page, search, cursor);
     }
     
-    async loadEmployees(page = 1, search = '') {
-        try {
-            this.showLoading('employeeTableBody');
-            
-            const response = await fetch(`/core/admin/get-employees/?page=${page}&search=${encodeURIComponent(search)}`);
-            const data = await response.json();
-            
-            if (data.success) {
-                this.renderEmployees(data.employees);
-                this.currentEmployeePage = page;
-            } else {
-                this.showError('employeeTableBody', data.error || 'Failed to load employees');
-            }
-        } catch (error) {
-            console.error('Error loading employees:', error);
-            this.showError('employeeTableBody', 'Network error loading employees');
-        }
+    async loadSupervisors(page = 1, search = '', cursor = '') {
+        await this.loadDirectory('supervisor', page, search, cursor);
     }
     
-    async loadAllUsers(role = 'all', page = 1, search = '') {
-        try {
-            this.showLoading('employeeTableBody');
-            
-            const response = await fetch(`/core/admin/get-all-users/?role=${role}&page=${page}&search=${encodeURIComponent(search)}`);
-            const data = await response.json();
-            
-            if (data.success) {
-                this.renderAllUsers(data.users, data.pagination);
-            } else {
-                this.showError('employeeTableBody', data.error || 'Failed to load users');
-            }
-        } catch (error) {
-            console.error('Error loading all users:', error);
-            this.showError('employeeTableBody', 'Network error loading users');
-        }
+    async loadEmployees(page = 1, search = '', cursor = '') {
+        await this.loadDirectory('employee', page, search, cursor);
+    }
+    
+    async loadAllUsers(page = 1, search = '', cursor = '') {
+        await this.loadDirectory('all', page, search, cursor);
     }
     
     renderAdmins(admins) {
@@ -320,7 +303,7 @@ class UserManager {
         tbody.innerHTML = html;
     }
     
-    renderAllUsers(users, pagination) {
+    renderAllUsers(users) {
         const tbody = document.getElementById('employeeTableBody');
         if (!tbody) return;
         
@@ -372,9 +355,6 @@ class UserManager {
         });
         
         tbody.innerHTML = html;
-        
-        // Render pagination controls
-        this.renderPagination('employeePagination', pagination, 'all');
     }
     
     renderPagination(containerId, pagination, userType) {
@@ -390,7 +370,7 @@ class UserManager {
                 </button>
                 
                 <div class="pagination-info">
-                    Page ${page} of ${total_pages}
+                    Page ${page}${total_pages ? ` of about ${total_pages}` : ''}
                 </div>
                 
                 <button class="pagination-btn" onclick="userManager.loadPage('${userType}', ${page + 1})" ${!has_next ? 'disabled' : ''}>
@@ -406,20 +386,16 @@ class UserManager {
     async loadPage(userType, page) {
         if (page < 1) return;
         
-        switch(userType) {
-            case 'admin':
-                await this.loadAdmins(page, document.getElementById('searchAdminInput')?.value || '');
-                break;
-            case 'supervisor':
-                await this.loadSupervisors(page, document.getElementById('searchSupervisorInput')?.value || '');
-                break;
-            case 'employee':
-                await this.loadEmployees(page, document.getElementById('searchEmployeeInput')?.value || '');
-                break;
-            case 'all':
-                await this.loadAllUsers('all', page, document.getElementById('searchEmployeeInput')?.value || '');
-                break;
+        const current = (this.directoryState[userType] || {}).pagination || {};
+        const currentPage = (this.directoryState[userType] || {}).page || 1;
+        let cursor = '';
+        if (page > 1 && page > currentPage && current.next_cursor) {
+            cursor = `&after=${encodeURIComponent(current.next_cursor)}`;
+        } else if (page > 1 && page < currentPage && current.previous_cursor) {
+            cursor = `&before=${encodeURIComponent(current.previous_cursor)}`;
         }
+        const searchInput = document.getElementById(DIRECTORY_VIEWS[userType].searchInput);
+        await this.loadDirectory(userType, page, searchInput?.value || '', cursor);
     }
     
     searchAdmins(query) {